@@ -0,0 +1,154 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import c104
+
+# Command burst of the IEC 104 master. A stream of C_SC_NA_1 / C_SE_NC_1
+# select-and-execute commands is sent with at most window commands in flight on
+# one connection. The confirmations are timed from the raw APDUs of the
+# connection: ACT_CON with the S/E bit set confirms the select, ACT_CON without
+# it the execute and ACT_TERM ends the command. The stream is only pulled when a
+# window slot is free, so a stream that stops (engine stopped) ends the burst
+# with at most window commands still in flight. At the end the latency
+# percentiles of every phase and the command rate are reported.
+
+DEFAULT_WINDOW = 8
+TERMINATION_GRACE = 1.0  # seconds to wait for late ACT_TERMs after the last command
+PERCENTILES = (50, 90, 99)
+
+COT_ACTIVATION_CON = 7
+COT_ACTIVATION_TERMINATION = 10
+C_SC_NA_1 = 45
+C_SE_NC_1 = 50
+
+def parse_command_apdu(data):
+    """(type id, cause, negative, ioa, select) of a command I-frame, None for anything else."""
+    if len(data) < 6 or data[0] != 0x68 or data[2] & 0x01:
+        return None
+    asdu = data[6:]
+    if len(asdu) < 10 or asdu[0] not in (C_SC_NA_1, C_SE_NC_1):
+        return None
+    type_id = asdu[0]
+    cause = asdu[2] & 0x3F
+    negative = bool(asdu[2] & 0x40)
+    ioa = asdu[6] | asdu[7] << 8 | asdu[8] << 16
+    qualifier = asdu[9] if type_id == C_SC_NA_1 else (asdu[13] if len(asdu) > 13 else 0)
+    return type_id, cause, negative, ioa, bool(qualifier & 0x80)
+
+class CommandTiming:
+    """Send time and confirmation times (perf_counter) of one command."""
+
+    __slots__ = ('ioa', 'sent', 'select_con', 'execute_con', 'terminated', 'done', 'ok', 'negative')
+
+    def __init__(self, ioa):
+        self.ioa = ioa
+        self.sent = time.perf_counter()
+        self.select_con = None
+        self.execute_con = None
+        self.terminated = None
+        self.done = None
+        self.ok = False
+        self.negative = False
+
+class CommandBurst:
+    """Windowed select-and-execute command stream on one c104 connection."""
+
+    def __init__(self, connection, window=DEFAULT_WINDOW, log=print):
+        self.connection = connection
+        self.window = window
+        self.log = log
+        self.timings = []
+        self.elapsed = 0.0
+        self._pending = {}
+        self._busy = set()
+        self._idle = threading.Condition()
+
+    def on_raw(self, connection: c104.Connection, data: bytes) -> None:
+        # c104 thread: stamp the confirmation of the pending command of the IOA
+        now = time.perf_counter()
+        frame = parse_command_apdu(data)
+        if frame is None:
+            return
+        type_id, cause, negative, ioa, select = frame
+        timing = self._pending.get(ioa)
+        if timing is None:
+            return
+        timing.negative |= negative
+        if cause == COT_ACTIVATION_CON:
+            if select:
+                timing.select_con = timing.select_con or now
+            else:
+                timing.execute_con = timing.execute_con or now
+        elif cause == COT_ACTIVATION_TERMINATION:
+            timing.terminated = timing.terminated or now
+
+    def send(self, point, value):
+        ioa = point.io_address
+        with self._idle:
+            # one command per IOA at a time, confirmations are matched by IOA
+            while ioa in self._busy:
+                self._idle.wait()
+            self._busy.add(ioa)
+        timing = CommandTiming(ioa)
+        self._pending[ioa] = timing
+        try:
+            point.value = value
+            try:
+                timing.ok = bool(point.transmit(cause=c104.Cot.ACTIVATION))
+            except (ValueError, RuntimeError) as e:
+                self.log(f"Error IOA {ioa}: {str(e)}")
+            timing.done = time.perf_counter()
+            self.timings.append(timing)
+        finally:
+            with self._idle:
+                self._busy.discard(ioa)
+                self._idle.notify_all()
+        return timing
+
+    def run(self, commands):
+        """Send (point, value) commands with at most window in flight, return the timings."""
+        self.connection.on_receive_raw(callable=self.on_raw)
+        commands = iter(commands)
+        started = time.perf_counter()
+        slots = threading.Semaphore(max(1, self.window))
+        with ThreadPoolExecutor(max_workers=max(1, self.window)) as executor:
+            while True:
+                slots.acquire()  # take the next command only once one in flight is done
+                command = next(commands, None)
+                if command is None:
+                    break
+                future = executor.submit(self.send, *command)
+                future.add_done_callback(lambda _: slots.release())
+        self.elapsed = time.perf_counter() - started
+        deadline = time.perf_counter() + TERMINATION_GRACE
+        while time.perf_counter() < deadline and any(t.ok and t.terminated is None for t in self.timings):
+            time.sleep(0.01)
+        return self.timings
+
+    def latencies(self):
+        """Milliseconds from the send of each command to its select / execute confirmation and termination."""
+        phases = {'select': [], 'execute': [], 'termination': [], 'command': []}
+        for timing in self.timings:
+            for phase, stamp in (('select', timing.select_con), ('execute', timing.execute_con),
+                                 ('termination', timing.terminated), ('command', timing.done)):
+                if stamp is not None:
+                    phases[phase].append((stamp - timing.sent) * 1000)
+        return {phase: np.array(values) for phase, values in phases.items()}
+
+    def report(self):
+        count = len(self.timings)
+        failed = sum(1 for timing in self.timings if not timing.ok)
+        negative = sum(1 for timing in self.timings if timing.negative)
+        rate = count / self.elapsed if self.elapsed else 0.0
+        lines = [f"Commands: {count}, window: {self.window}, failed: {failed}, negative confirmations: {negative}, "
+                 f"{rate:.1f} commands/s"]
+        for phase, values in self.latencies().items():
+            if len(values):
+                percentiles = ", ".join(f"p{p} {v:.1f}" for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)))
+                lines.append(f"{phase} latency ms ({len(values)}): {percentiles}, max {values.max():.1f}")
+            else:
+                lines.append(f"{phase} latency ms: no confirmations")
+        for line in lines:
+            self.log(line)
+        return lines
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from waveforms import MIN_COLUMN, MAX_COLUMN, DEFAULT_MIN, DEFAULT_MAX
+
+# Report filter of the IEC 104 slaves. The update loop only stores new values;
+# every check the whole table is compared against the last reported values in
+# one NumPy pass and only the points that moved are handed on for spontaneous
+# transmission. Measured values (M_ME_NC_1 / M_ME_TF_1) move when the change
+# exceeds their deadband: 'Deadband' is absolute, 'Deadband %' a share of
+# Max - Min, the larger one wins. Single points (M_SP_*) move on every change.
+
+DEADBAND_COLUMN = 'Deadband'
+DEADBAND_PERCENT_COLUMN = 'Deadband %'
+CHECK_MS = 100
+
+ANALOG_TYPES = (13, 36)
+
+def _column(rows, column, default=0.0):
+    if column not in rows.columns:
+        return np.full(len(rows), default, dtype=np.float64)
+    values = pd.to_numeric(rows[column], errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isnan(values), default, values)
+
+class DeadbandFilter:
+    """Change detection over a list of signals, group holds their sheet rows."""
+
+    def __init__(self, signals, group):
+        self.signals = list(signals)
+        self.index = {signal.row: i for i, signal in enumerate(self.signals)}
+        rows = group.loc[[signal.row for signal in self.signals]]
+        analog = np.array([signal.code in ANALOG_TYPES for signal in self.signals], dtype=bool)
+        span = _column(rows, MAX_COLUMN, DEFAULT_MAX) - _column(rows, MIN_COLUMN, DEFAULT_MIN)
+        band = np.maximum(np.abs(_column(rows, DEADBAND_COLUMN)),
+                          np.abs(_column(rows, DEADBAND_PERCENT_COLUMN)) / 100.0 * np.abs(span))
+        self.band = np.where(analog, band, 0.0)
+        self.values = np.full(len(self.signals), np.nan)
+        self.last = np.full(len(self.signals), np.nan)
+        self.updates = 0
+        self.reported = 0
+
+    def __len__(self):
+        return len(self.signals)
+
+    def set(self, signal, value):
+        """Store the new value of a signal, it is compared on the next check."""
+        self.values[self.index[signal.row]] = float(value)
+        self.updates += 1
+
+    def changed(self):
+        """Signals whose value left the deadband since it was last reported."""
+        values = self.values
+        last = self.last
+        with np.errstate(invalid='ignore'):
+            moved = ~np.isnan(values) & (np.isnan(last) | (np.abs(values - last) > self.band))
+        indices = np.flatnonzero(moved)
+        last[indices] = values[indices]
+        self.reported += len(indices)
+        signals = self.signals
+        return [signals[i] for i in indices]
+
+    def stats(self):
+        share = 100.0 * self.reported / self.updates if self.updates else 0.0
+        return f"Deadband: {self.reported} of {self.updates} updates reported ({share:.1f}%)"
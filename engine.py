@@ -0,0 +1,1058 @@
+import c104
+import sys
+import time
+import collections
+import argparse
+import datetime
+import threading
+from pyModbusTCP.client import ModbusClient
+from pyModbusTCP.server import ModbusServer
+from signal_plan import SignalPlan
+from register_bank import RegisterBank, COILS, DISCRETE_INPUTS, HOLDING_REGISTERS, INPUT_REGISTERS
+from modbus_databank import BankDataBank
+from signal_table import build_table, CYCLE_COLUMN
+from sheet_cache import read_sheet
+from snapshot_writer import SnapshotWriter, SNAPSHOT_INTERVAL
+from timer_wheel import TimerWheel
+from read_planner import plan_reads, READ_CODES, GAP_TOLERANCE
+from modbus_pipeline import PipelinedClient
+from write_batcher import WriteBatcher, FLUSH_DELAY
+from write_events import WriteEventBus
+from waveforms import WaveformGenerator
+from iec104_transmit import SpontaneousTransmitter
+from deadband import DeadbandFilter, CHECK_MS
+from receive_buffer import ReceiveBuffer
+from command_burst import CommandBurst, DEFAULT_WINDOW
+from redundancy import RedundancyGroup, parse_endpoints
+from scan_scheduler import ScanScheduler, SCAN_CLASS_COLUMN, SCAN_CLASSES, DEFAULT_SCAN_CLASS, scan_class_period, scan_class_name
+
+# GUI-free simulation engines. Each engine owns the protocol object (c104
+# Server/Client, pyModbusTCP ModbusServer/ModbusClient) of one IP address of a
+# sheet and runs the continuous All-at-Once update loop. The Tk simulators
+# create an engine, pass their log() method and keep only the dialogs; the
+# command line entry point at the bottom runs the same engines headless:
+#
+#   python engine.py 1.xlsx --mode modbus-slave --ip 10.200.120.12 --pace 0
+#
+# The loops are driven by a timer wheel: every point fires at its own period,
+# the 'Cycle ms' cell of its row or CYCLE_MS, so the cycle time of a point does
+# not grow with the length of the sheet.
+
+CYCLE_MS = 5000  # period of a point without a Cycle ms cell
+SAVE_MS = 5000   # period of the hand-off to the snapshot writer
+RECEIVE_MS = 100 # period of the IEC 104 master receive buffer drain
+MUTED_GRACE = 1.0 # seconds an open IEC 104 master connection may stay muted before STARTDT is sent again
+
+iec104_type_ids = {
+    1: c104.Type.M_SP_NA_1,
+    13: c104.Type.M_ME_NC_1,
+    30: c104.Type.M_SP_TB_1,
+    36: c104.Type.M_ME_TF_1,
+    45: c104.Type.C_SC_NA_1,
+    50: c104.Type.C_SE_NC_1,
+}
+
+def load_sheet(xls, sheet_name=0, value_column='Value'):
+    """Read a sheet and start UpdatedValue from the configured value column."""
+    df = read_sheet(xls, sheet_name=sheet_name)
+    if 'UpdatedValue' in df.columns :
+        df = df.drop(columns=['UpdatedValue'])
+    df['UpdatedValue'] = df[value_column]
+    return df
+
+def sheet_ips(xls, sheet_name=0):
+    """IP addresses configured in a sheet, '-' rows excluded."""
+    df = read_sheet(xls, sheet_name=sheet_name)
+    return [str(ip).strip() for ip in df['IP Address'].dropna().unique() if str(ip).strip() != '-']
+
+class Engine:
+    """Base of the headless simulators, log is any callable taking one message.
+
+    pace scales every point period, 0 fires every point on each wheel tick. Engines
+    serving different IPs of the same sheet share one SnapshotWriter via writer.
+    Simulated values come from a WaveformGenerator, seed makes them reproducible.
+    """
+
+    value_column = 'Value'
+    cycle_ms = CYCLE_MS
+
+    def __init__(self, xls, sheet_name=0, ip_address=None, log=print, pace=1.0,
+                 snapshot_interval=SNAPSHOT_INTERVAL, snapshot_mode="snapshot", writer=None, seed=None):
+        self.xls = xls
+        self.sheet_name = sheet_name
+        self.ip_address = str(ip_address).strip() if ip_address is not None else None
+        self.log = log
+        self.pace = pace
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_mode = snapshot_mode
+        self.running = True
+        self.writer = writer
+        self.shared_writer = writer is not None
+        self.writer_lock = threading.Lock()
+        self.table = None
+        self.wheel = None
+        self.seed = seed
+        self.generator = None
+
+    def stop(self):
+        self.running = False
+        self.close_writer()
+
+    def is_running(self):
+        return self.running
+
+    def load_group(self):
+        """Sheet and the rows of this engine's IP address."""
+        df = load_sheet(self.xls, self.sheet_name, self.value_column)
+        group = df[df['IP Address'].astype(str).str.strip() == self.ip_address]
+        return df, group
+
+    def open_writer(self, df):
+        if self.shared_writer:
+            return self.writer
+        self.writer = SnapshotWriter(self.xls, df, self.sheet_name, interval=self.snapshot_interval,
+                                     mode=self.snapshot_mode, on_error=lambda e: self.log(f"Error {str(e)}"))
+        return self.writer
+
+    def close_writer(self):
+        """Queue the last values and wait for the writer, from stop() or the end of the loop."""
+        if self.shared_writer:
+            return
+        with self.writer_lock:
+            writer, self.writer = self.writer, None
+        if writer is None:
+            return
+        if self.table is not None:
+            writer.update(self.table)
+        writer.close()
+
+    def open_generator(self, signals, group, binary_codes, integer=None):
+        """Waveform generator of the simulated signals, binary_codes give 0/1 values."""
+        self.generator = WaveformGenerator(signals, group, [signal.code in binary_codes for signal in signals],
+                                           integer, seed=self.seed)
+        return self.generator
+
+    def period_ms(self, signal):
+        """Update period of one point, its Cycle ms cell or the engine default, scaled by pace."""
+        return (signal.cycle or self.cycle_ms) * self.pace
+
+    def schedule(self, table, callback):
+        """Put every signal of table on a new wheel, first firings spread over one period."""
+        self.wheel = TimerWheel()
+        count = len(table)
+        for i, signal in enumerate(table):
+            period = self.period_ms(signal)
+            self.wheel.call_every(period, callback, signal, phase_ms=period * i / count)
+        self.log(f"Scheduled {count} points, cycle {self.cycle_ms * self.pace:g} ms unless set in '{CYCLE_COLUMN}'")
+        return self.wheel
+
+    def fire(self, step):
+        """Run the handler of a compiled Modbus step and keep the value it returns."""
+        try:
+            value = step.handler(step, step.value)
+        except (ValueError, TypeError) as e:
+            self.log(f"Error {str(e)}")
+            value = None
+        if value is not None:
+            step.value = value
+
+    def run_wheel(self, table, running):
+        """Fire due points until running() is false, queue changed values every SAVE_MS."""
+        writer = self.writer
+        self.table = table
+        def save():
+            changed = writer.update(table)
+            self.log(f"Queued {changed} changed values for saving to Excel.")
+        self.wheel.call_every(SAVE_MS, save)
+        while running():
+            self.wheel.advance()
+            time.sleep(self.wheel.sleep_time())
+        writer.update(table)
+        if self.wheel.late:
+            self.log(f"{self.wheel.late} point updates were skipped, the wheel could not keep up")
+
+#***************IEC 104***************************************************
+
+WAITING = "waiting"
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+STOPPED = "stopped"
+
+class ConnectionState:
+    """Connection state of an IEC 104 server or client, fed from c104 callbacks.
+
+    feed() is called from the c104 threads, wait_connected() blocks a worker
+    thread until the peer is there and events() hands the transitions to a
+    poller (the Tk after() loop) without blocking.
+    """
+
+    def __init__(self):
+        self.state = WAITING
+        self.peer = None
+        self.changed_at = time.monotonic()
+        self._events = collections.deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def feed(self, state, peer=None):
+        with self._lock:
+            if state == self.state:
+                return
+            self.state = state
+            self.peer = peer if peer is not None else self.peer
+            self.changed_at = time.monotonic()
+            self._events.append((state, self.peer))
+        if state in (CONNECTED, STOPPED):
+            self._wake.set()
+        else:
+            self._wake.clear()
+
+    def events(self):
+        """Transitions since the last call, oldest first."""
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def wait_connected(self, timeout=None):
+        self._wake.wait(timeout)
+        return self.state == CONNECTED
+
+
+class IEC104SlaveEngine(Engine):
+    """IEC 104 server of one IP address.
+
+    Monitoring points that leave their deadband are marked on a
+    SpontaneousTransmitter, servers of the same simulator can share one via
+    transmitter.
+    """
+
+    value_column = 'value'
+
+    def __init__(self, xls, sheet_name=0, ip_address=None, port=2404, asdu=1, transmitter=None, **options):
+        Engine.__init__(self, xls, sheet_name, ip_address, **options)
+        self.port = port
+        self.asdu = asdu
+        self.server = None
+        self.station = None
+        self.connection_state = ConnectionState()
+        self._seen_active = False
+        self._refresh_lock = threading.Lock()
+        self.transmitter = transmitter
+        self.shared_transmitter = transmitter is not None
+        self.deadband = None
+
+    def start(self):
+        self.server = c104.Server(ip=self.ip_address, port=int(self.port))
+        self.station = self.server.add_station(common_address=int(self.asdu))
+        self.server.on_connect(callable=self._on_connect)
+        self.server.start()
+        if self.transmitter is None:
+            self.transmitter = SpontaneousTransmitter(log=self.log)
+        if not self.shared_transmitter:
+            self.transmitter.start()
+        return self.server
+
+    def _on_connect(self, server: c104.Server, ip: str) -> bool:
+        # c104 thread: accept the peer and wake whoever waits for it
+        self.connection_state.feed(CONNECTED, ip)
+        return True
+
+    def stop(self):
+        Engine.stop(self)
+        self.connection_state.feed(STOPPED)
+        if self.transmitter and not self.shared_transmitter:
+            self.transmitter.stop()
+        if self.server:
+            self.server.stop()
+
+    def refresh_state(self):
+        """Feed a disconnect once the peer is gone, c104 has no disconnect callback on the server side."""
+        active = self.server.has_active_connections
+        with self._refresh_lock:  # worker thread and Tk poller
+            if active:
+                self._seen_active = True
+            elif self._seen_active and self.connection_state.state == CONNECTED:
+                self._seen_active = False
+                self.connection_state.feed(DISCONNECTED)
+
+    def connection_events(self):
+        """Non-blocking state update and the transitions since the last call."""
+        self.refresh_state()
+        return self.connection_state.events()
+
+    def is_running(self):
+        self.refresh_state()
+        return self.running and self.server.is_running and self.connection_state.state == CONNECTED
+
+    def wait_for_connection(self, interval=None):
+        if self.connection_state.state != CONNECTED:
+            self.log(f"Waiting for connection to {self.ip_address}")
+        return self.connection_state.wait_connected(interval) and self.running
+
+    def create_points(self, table):
+        for signal in table:
+            if signal.code in [1,13,30,36,45,50]:
+                signal.point = self.station.add_point(io_address=signal.address, type=iec104_type_ids[signal.code], report_ms=0)
+            else:
+                self.log(f"Invalid Type ID {signal.code} for IOA {signal.address}")
+        return table
+
+    def run(self):
+        """All-at-Once mode: create every point, then update them until stopped."""
+        df, group = self.load_group()
+        table = build_table(group, df['UpdatedValue'], 'IOA', 'Type ID', 'Object Text')
+        if not self.is_running():
+            self.log("Processing stopped either server stopped or client disconnected")
+            return
+        self.create_points(table)
+        self.log("All points created, Ready for update ")
+        self.log(f"Starting Continuous Value Updates for {self.ip_address}")
+
+        self.open_writer(df)
+        monitored = [signal for signal in table if signal.code in [1,13,30,36]]
+        self.open_generator(monitored, group, [1,30])
+        self.deadband = DeadbandFilter(monitored, group)
+        self.schedule(table, self.update_signal)
+        self.wheel.call_every(CHECK_MS, self.report_changes)
+        self.run_wheel(table, self.is_running)
+        self.report_changes()
+        self.log(self.deadband.stats())
+        if self.running:
+            self.log("Processing stopped either server stopped or client disconnected")
+        self.close_writer()
+        self.log("Stopped updates for All-at-Once mode.")
+
+    def report_changes(self):
+        # one vectorized deadband check of the whole table, only the moved points are sent
+        for signal in self.deadband.changed():
+            self.transmitter.mark(signal.point)
+
+    def update_signal(self, signal):
+        ioa = signal.address
+        type_id = signal.code
+        name = signal.name
+        point = signal.point
+        value = signal.value
+
+        # Update the value for the point based on its type
+        if type_id == 45 :
+            value = bool(point.value)
+            self.log(f"Received point IOA : {ioa} : {name} : {value}")
+            signal.value = value
+        elif type_id == 50:
+            value = round(point.value,5)
+            self.log(f"Received point IOA : {ioa} : {name} : {value}")
+            signal.value = float(value)
+        elif type_id in [1,30]:
+            value = self.generator.value(signal)
+            point.value = (bool(value))
+            self.deadband.set(signal, value)
+            self.log(f"Set point IOA : {ioa} : {name} : {bool(value)}")
+            signal.value = value
+        elif type_id in [13,36]:
+            value = self.generator.value(signal)
+            point.value = (float(value))
+            self.deadband.set(signal, value)
+            self.log(f"Set point IOA : {ioa} : {name} : {value} ")
+            signal.value = value
+        else:
+            self.log(f"Invalid type id {type_id} for IOA {ioa}")
+
+class IEC104ClientEngine(Engine):
+    """IEC 104 client connected to the server at one IP address.
+
+    Monitoring points push every value c104 receives into received, a
+    ReceiveBuffer, together with the receive time and COT. With backups
+    ('ip[:port], ...') the server and its backups form a RedundancyGroup and
+    the engine stays connected as long as any link of the group is open.
+    """
+
+    value_column = 'value'
+
+    def __init__(self, xls, sheet_name=0, ip_address=None, port=2404, asdu=1, backups=None, **options):
+        Engine.__init__(self, xls, sheet_name, ip_address, **options)
+        self.port = port
+        self.asdu = asdu
+        self.client = None
+        self.connection = None
+        self.station = None
+        self.connection_state = ConnectionState()
+        self.received = ReceiveBuffer()
+        self.backups = parse_endpoints(backups, port) if backups else []
+        self.group = None
+
+    def start(self):
+        self.client = c104.Client()
+        if self.backups:
+            self.group = RedundancyGroup(self.client, [(self.ip_address, int(self.port))] + self.backups, self.asdu,
+                                         log=self.log, on_state=self._on_group_state, on_receive=self._on_receive)
+            self.connection = self.group.connection
+            self.station = self.group.station
+        else:
+            self.connection = self.client.add_connection(ip=self.ip_address, port=int(self.port), init=c104.Init.ALL)
+            self.connection.on_state_change(callable=self._on_state_change)
+            self.station = self.connection.add_station(common_address=int(self.asdu))
+        self.client.start()
+        return self.client
+
+    def _on_state_change(self, connection: c104.Connection, state: c104.ConnectionState) -> None:
+        # c104 thread: only an unmuted connection counts as connected, the server sends nothing before STARTDT
+        self.connection_state.feed(CONNECTED if state == c104.ConnectionState.OPEN else DISCONNECTED, self.ip_address)
+
+    def _on_group_state(self, connected):
+        # c104 thread: a switchover keeps the group connected
+        self.connection_state.feed(CONNECTED if connected else DISCONNECTED, self.ip_address)
+
+    def stop(self):
+        Engine.stop(self)
+        self.connection_state.feed(STOPPED)
+        if self.client:
+            self.client.stop()
+        if self.group:
+            self.group.close()
+            for line in self.group.stats():
+                self.log(line)
+
+    def command_point(self, signal):
+        """Point a command goes out on, the one of the active link in a redundancy group."""
+        return self.group.point(signal.address) if self.group else signal.point
+
+    def unmute_stalled(self):
+        """Send STARTDT again when c104 left the open connection muted, it does not always send it after connect."""
+        connection = self.connection
+        if (self.group is None and connection is not None and connection.state == c104.ConnectionState.OPEN_MUTED
+                and time.monotonic() - self.connection_state.changed_at > MUTED_GRACE):
+            connection.unmute()
+
+    def connection_events(self):
+        self.unmute_stalled()
+        return self.connection_state.events()
+
+    def is_running(self):
+        return self.running and self.client.is_running and self.connection_state.state == CONNECTED
+
+    def wait_for_connection(self, interval=None):
+        if self.connection_state.state != CONNECTED:
+            self.log(f"Waiting for connection to {self.ip_address}")
+        deadline = None if interval is None else time.monotonic() + interval
+        while not self.connection_state.wait_connected(MUTED_GRACE):
+            if not self.running or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            self.unmute_stalled()
+        return self.running
+
+    def create_points(self, table):
+        if self.group:
+            return self.create_group_points(table)
+        for signal in table:
+            if signal.code in [1,13,30,36]:
+                # the client already created the point if the GI answer came first
+                signal.point = (self.station.add_point(io_address=signal.address, type=iec104_type_ids[signal.code])
+                                or self.station.get_point(io_address=signal.address))
+                signal.point.on_receive(callable=self._on_receive)
+            elif signal.code in [45,50] :
+                signal.point = self.station.add_point(io_address=signal.address, type=iec104_type_ids[signal.code], command_mode = c104.CommandMode.SELECT_AND_EXECUTE)
+        return table
+
+    def create_group_points(self, table):
+        # every link of the group gets the point, the group forwards the received values
+        for signal in table:
+            if signal.code in [1,13,30,36]:
+                signal.point = self.group.add_point(signal.address, iec104_type_ids[signal.code])
+            elif signal.code in [45,50] :
+                signal.point = self.group.add_point(signal.address, iec104_type_ids[signal.code], command_mode = c104.CommandMode.SELECT_AND_EXECUTE)
+        return table
+
+    def _on_receive(self, point: c104.Point, previous_info: c104.Information, message: c104.IncomingMessage) -> c104.ResponseState:
+        # c104 thread: only record the value, the consumers read the buffer
+        self.received.push(point.io_address, point.value, message.cot)
+        return c104.ResponseState.SUCCESS
+
+    def run(self):
+        """All-at-Once mode: create every point, then read monitoring and send commands until stopped."""
+        df, group = self.load_group()
+        table = build_table(group, df['UpdatedValue'], 'IOA', 'Type ID', 'Object Text')
+        if not self.is_running():
+            self.log("Processing stopped either client stopped or client disconnected")
+            return
+        cursor = self.received.cursor()
+        self.create_points(table)
+        self.log("All points created, Ready for update ")
+        self.log(f"Starting Continuous Value Updates for {self.ip_address}")
+
+        self.open_writer(df)
+        self.open_generator([signal for signal in table if signal.code in [45,50]], group, [45])
+        # monitoring points arrive through the receive buffer, drained on its own thread
+        # because a select-and-execute command blocks the wheel until it is confirmed
+        monitored = {signal.address: signal for signal in table if signal.code in [1,13,30,36]}
+        self.schedule([signal for signal in table if signal.code not in [1,13,30,36]], self.update_signal)
+        drained = threading.Event()
+        drainer = threading.Thread(target=self.drain_loop, args=(cursor, monitored, drained), daemon=True)
+        drainer.start()
+        self.run_wheel(table, self.is_running)
+        drained.set()
+        drainer.join()
+        self.drain_received(cursor, monitored)
+        if cursor.dropped:
+            self.log(f"{cursor.dropped} received values dropped, the receive buffer overflowed")
+        if self.running:
+            self.log("Processing stopped either client stopped or client disconnected")
+        self.close_writer()
+        self.log("Stopped updates for All-at-Once mode.")
+
+    def burst(self, rounds=1, window=DEFAULT_WINDOW):
+        """Send every command row rounds times, window commands in flight, and report the confirmation latencies."""
+        df, group = self.load_group()
+        table = self.create_points(build_table(group, df['UpdatedValue'], 'IOA', 'Type ID', 'Object Text'))
+        commands = [signal for signal in table if signal.code in [45,50]]
+        if not commands:
+            self.log("No C_SC_NA_1 / C_SE_NC_1 rows for a command burst")
+            return None
+        generator = self.open_generator(commands, group, [45])
+
+        def stream():
+            for _ in range(rounds):
+                for signal in commands:
+                    if not self.is_running():
+                        return
+                    value = generator.value(signal)
+                    yield self.command_point(signal), bool(value) if signal.code == 45 else float(value)
+
+        burst = CommandBurst(self.group.connection if self.group else self.connection, window, log=self.log)
+        self.log(f"Command burst: {rounds} x {len(commands)} commands, window {window}")
+        burst.run(stream())
+        burst.report()
+        return burst
+
+    def drain_loop(self, cursor, monitored, stopped):
+        """Drain the receive buffer every RECEIVE_MS until stopped is set."""
+        while not stopped.wait(RECEIVE_MS / 1000):
+            self.drain_received(cursor, monitored)
+
+    def drain_received(self, cursor, monitored):
+        """Log every value received since the last drain and keep the latest one per point."""
+        for timestamp, ioa, value, cot in cursor.read():
+            signal = monitored.get(ioa)
+            if signal is None:
+                continue
+            if signal.code in [1,30]:
+                value = bool(value)
+            else:
+                value = round(value,5)
+            received_at = datetime.datetime.fromtimestamp(timestamp).strftime('%H:%M:%S.%f')[:-3]
+            self.log(f"Received point IOA : {ioa} : {signal.name} : {value} : {cot} at {received_at}")
+            signal.value = value
+
+    def update_signal(self, signal):
+        ioa = signal.address
+        type_id = signal.code
+        name = signal.name
+        point = self.command_point(signal) if type_id in [45,50] else signal.point
+        value = signal.value
+
+        if type_id == 45 :
+            value = self.generator.value(signal)
+            point.value = (bool(value))
+            point.transmit(cause=c104.Cot.ACTIVATION)
+            self.log(f"Set point IOA : {ioa} : {name} : {bool(value)}")
+            signal.value = value
+        elif type_id == 50:
+            value = self.generator.value(signal)
+            point.value = (float(value))
+            point.transmit(cause=c104.Cot.ACTIVATION)
+            self.log(f"Set point IOA : {ioa} : {name} : {value} ")
+            signal.value = value
+        else:
+            self.log(f"Invalid type id {type_id} for IOA {ioa}")
+
+#***************Modbus****************************************************
+
+MIRROR_COLUMN = 'Mirror IOA'
+
+class IEC104Mirror:
+    """IEC 104 points that follow the Modbus outputs a master writes.
+
+    mirrors are (step, ioa) pairs, coils become M_SP_NA_1 and registers
+    M_ME_NC_1 points of station, sent spontaneously on every write.
+    """
+
+    def __init__(self, station, mirrors):
+        self.points = {}
+        for step, ioa in mirrors:
+            type_id = 1 if step.code == 5 else 13
+            self.points[step.row] = station.add_point(io_address=int(ioa), type=iec104_type_ids[type_id], report_ms=0)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __call__(self, event):
+        for step in event.steps:
+            point = self.points.get(step.row)
+            if point is not None:
+                point.value = bool(step.value) if step.code == 5 else float(step.value)
+                point.transmit(cause=c104.Cot.SPONTANEOUS)
+
+class ModbusSlaveEngine(Engine):
+    """Modbus TCP server of one IP address, its data lives in a RegisterBank.
+
+    Inputs (FC1-4 rows) are updated on the timer wheel, outputs (FC5/6/16 rows)
+    are read back the moment the master writes them. Every master write is
+    published on events; the log and the snapshot writer get it from the bus
+    thread and, with mirror_port, rows with a 'Mirror IOA' cell are sent on to
+    an IEC 104 server from the Modbus server thread.
+    """
+
+    def __init__(self, xls, sheet_name=0, ip_address=None, port=502, mirror_port=None, mirror_asdu=1, **options):
+        Engine.__init__(self, xls, sheet_name, ip_address, **options)
+        self.port = port
+        self.server = None
+        self.bank = RegisterBank(on_write=self.master_write)
+        self.plan = None
+        self.events = WriteEventBus(on_error=lambda e: self.log(f"Error {str(e)}"))
+        self.mirror_port = mirror_port
+        self.mirror_asdu = mirror_asdu
+        self.mirror_server = None
+        self.mirror_station = None
+
+    def start(self):
+        self.server = ModbusServer(self.ip_address, int(self.port), no_block=True, data_bank=BankDataBank(self.bank))
+        self.server.start()
+        if self.mirror_port:
+            self.mirror_server = c104.Server(ip=self.ip_address, port=int(self.mirror_port))
+            self.mirror_station = self.mirror_server.add_station(common_address=int(self.mirror_asdu))
+            self.mirror_server.start()
+        return self.server
+
+    def stop(self):
+        self.running = False
+        if self.server:
+            self.server.stop()
+        if self.mirror_server:
+            self.mirror_server.stop()
+        self.events.close()
+        for line in self.events.stats():
+            self.log(line)
+        # after the event bus, the writes it still dispatched reach the writer
+        Engine.stop(self)
+
+    def subscribe_writes(self, group, plan):
+        """Log, snapshot writer and IEC 104 mirror subscribers of the master writes."""
+        writer = self.writer
+        self.events.subscribe(lambda event: self.log(str(event)))
+        self.events.subscribe(lambda event: writer.update(event.steps))
+        if self.mirror_station is not None and MIRROR_COLUMN in group.columns:
+            ioas = group[MIRROR_COLUMN].dropna()
+            mirrors = [(step, ioas[step.row]) for step in plan if step.code in (5, 6, 16) and step.row in ioas.index]
+            mirror = IEC104Mirror(self.mirror_station, mirrors)
+            self.events.subscribe(mirror, inline=True)
+            self.log(f"Mirroring {len(mirror)} outputs to IEC 104 port {self.mirror_port}")
+
+    def run(self):
+        """All-at-Once mode: update inputs and read outputs of every signal until stopped."""
+        df, group = self.load_group()
+        handlers = {
+            1: self.update_coil_signal,
+            2: self.update_discrete_signal,
+            3: self.update_register_signal,
+            4: self.update_register_signal,
+            5: self.read_coil_signal,
+            6: self.read_register_signal,
+            16: self.read_register_signal,
+        }
+        # Compile the sheet once, the update loop only runs the plan
+        plan = SignalPlan(group, handlers, default=self.invalid_signal, values=df['UpdatedValue'])
+        for step in plan.invalid:
+            self.log(f"Invalid Type/Endian {step.mtype}/{step.endian} for Index {step.address}")
+
+        self.open_writer(df)
+        self.subscribe_writes(group, plan)
+        inputs = [step for step in plan if step.code in (1, 2, 3, 4)]
+        self.open_generator(inputs, group, (1, 2), [step.codec is not None and not step.codec.is_float for step in inputs])
+        self.plan = plan
+        self.schedule([step for step in plan if step.code not in (5, 6, 16)], self.fire)
+        self.run_wheel(plan.steps, self.is_running)
+        self.plan = None
+        self.log("Processing stopped by user.")
+        self.close_writer()
+
+    def master_write(self, unit, function, table, address, values):
+        # server thread: refresh the output rows the master just wrote and publish them
+        plan = self.plan
+        steps = plan.written(table, address, len(values)) if plan is not None else ()
+        for step in steps:
+            self.fire(step)
+        self.events.publish(unit, function, address, values, steps)
+
+    def update_coil_signal(self, step, value): # Coil Input
+        value = self.generator.value(step)
+        value_DI = [bool(value)]
+        self.bank.set_bits(COILS, step.address - 1, value_DI)
+        self.log(f"Updated Coil input {step.address} with value {value_DI}")
+        return value
+
+    def update_discrete_signal(self, step, value): # Binary Input signal
+        value = self.generator.value(step)
+        value_DI = [bool(value)]
+        self.bank.set_bits(DISCRETE_INPUTS, step.address - 1, value_DI)
+        self.log(f"Updated Discrete input {step.address} with value {value_DI}")
+        return value
+
+    def read_coil_signal(self, step, value): # Binary Output signal
+        value = self.bank.get_bits(COILS, step.address - 1)
+        return int(value[0])
+
+    def update_register_signal(self, step, value): # Holding / Input Register
+        value = self.generator.value(step)
+        registers = step.codec.encode(value)
+        self.bank.set_words(HOLDING_REGISTERS if step.code == 3 else INPUT_REGISTERS, step.address - 1, registers)
+        self.log(f"Updated Holding input {step.address} with {step.mtype} value {value}")
+        return value
+
+    def read_register_signal(self, step, value): # Analog Output signal
+        registers = self.bank.get_words(HOLDING_REGISTERS, step.address - 1, step.count)
+        value = step.codec.decode(registers)
+        if step.codec.is_float:
+            value = round(value,4)
+        return value
+
+    def invalid_signal(self, step, value):
+        self.log(" Invalid Function code ")
+
+class ModbusMasterEngine(Engine):
+    """Modbus TCP client polling the slave at one IP address / unit id."""
+
+    def __init__(self, xls, sheet_name=0, ip_address=None, port=502, unit=1, timeout=30, gap=GAP_TOLERANCE, depth=1, **options):
+        Engine.__init__(self, xls, sheet_name, ip_address, **options)
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+        self.gap = gap
+        self.depth = depth
+        self.client = None
+        self.writes = None
+        self.polling = False
+        self.scheduler = None
+        self.requests = 0
+        self.signals_read = 0
+        self.failures = 0
+
+    @property
+    def name(self):
+        return f"{self.ip_address}:{self.port}/{self.unit}"
+
+    def start(self):
+        """Open the client, depth > 1 pipelines that many requests with a per-request timeout."""
+        if self.depth > 1:
+            self.client = PipelinedClient(self.ip_address, int(self.port), int(self.unit), timeout=self.timeout, depth=self.depth)
+        else:
+            self.client = ModbusClient(self.ip_address, int(self.port), int(self.unit), timeout=self.timeout, auto_open=True, auto_close=False)
+        # pyModbusTCP is not thread-safe, without pipelining the loops flush the writes themselves
+        self.writes = WriteBatcher(self.client, delay=FLUSH_DELAY if self.depth > 1 else None, log=self.log)
+        return self.client
+
+    def stop(self):
+        Engine.stop(self)
+        if self.writes:
+            self.writes.close()
+        if self.client:
+            self.client.close()
+
+    def load_group(self):
+        """Rows of this engine's IP address, and of its port / unit id when the sheet has those columns."""
+        df, group = Engine.load_group(self)
+        if 'Port' in group.columns:
+            group = group[group['Port'].fillna(self.port).astype(int) == int(self.port)]
+        if 'Unit ID' in group.columns:
+            group = group[group['Unit ID'].fillna(1).astype(int) == int(self.unit)]
+        return df, group
+
+    def wait_for_connection(self, address=0, interval=2):
+        while self.running:
+            try:
+                if self.client.read_holding_registers(address, 1) is not None:
+                    return True
+            except Exception as e:
+                self.log(f"Connection error: {e}")
+            self.log(f"Waiting for connection to IP: {self.ip_address}")
+            time.sleep(interval)
+        return False
+
+    def compile(self):
+        """Sheet, signal plan and the coalesced read blocks of this engine's rows."""
+        df, group = self.load_group()
+        handlers = {
+            1: self.read_coil_signal,
+            2: self.read_discrete_signal,
+            3: self.read_register_signal,
+            4: self.read_register_signal,
+            5: self.write_coil_signal,
+            6: self.write_register_signal,
+            16: self.write_register_signal,
+        }
+        plan = SignalPlan(group, handlers, default=self.invalid_signal, values=df['UpdatedValue'])
+        for step in plan.invalid:
+            self.log(f"Invalid Type/Endian {step.mtype}/{step.endian} for Index {step.address}")
+        if SCAN_CLASS_COLUMN in group.columns:
+            # a Scan Class cell is a named cycle, an explicit Cycle ms wins
+            for step in plan.steps:
+                if step.cycle is None:
+                    step.cycle = scan_class_period(group.at[step.row, SCAN_CLASS_COLUMN])
+        blocks = plan_reads(plan.steps, gap=self.gap)
+        for block in blocks:
+            block.handler = self.read_block
+        reads = sum(len(block.steps) for block in blocks)
+        self.log(f"Coalesced {reads} read signals into {len(blocks)} requests")
+        return df, plan, blocks
+
+    def read_all(self):
+        """One coalesced scan of every read signal, returns the steps read."""
+        df, plan, blocks = self.compile()
+        started = time.perf_counter()
+        self.scan(blocks)
+        self.log(f"Read {sum(len(block.steps) for block in blocks)} signals with {len(blocks)} requests "
+                 f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return [step for block in blocks for step in block.steps]
+
+    def write_all(self):
+        """Download the value of every output row in as few FC15 / FC16 frames as possible."""
+        df, plan, blocks = self.compile()
+        writes, frames = self.writes.writes, self.writes.frames
+        for step in plan:
+            if step.code not in READ_CODES:
+                self.fire(step)
+        self.writes.flush()
+        self.log(f"Wrote {self.writes.writes - writes} outputs in {self.writes.frames - frames} frames")
+
+    def run(self):
+        """All-at-Once mode: read every input and write every output of the sheet until stopped."""
+        df, plan, blocks = self.compile()
+        writes = [step for step in plan if step.code not in READ_CODES]
+
+        self.open_writer(df)
+        self.schedule(blocks + writes, self.fire)
+        self.wheel.call_every(FLUSH_DELAY * 1000, self.writes.flush)
+        self.run_wheel(plan.steps, self.is_running)
+        self.log("Processing stopped by user.")
+        self.close_writer()
+
+    def poll(self, blocks=None):
+        """Polling mode: scan the read blocks continuously, one deadline per scan class, until stopped.
+
+        blocks come from compile(), rows without a scan class or cycle are scanned
+        with the medium class. Only the values are updated, nothing is logged per scan.
+        """
+        self.scheduler = ScanScheduler(on_overrun=self.scan_overrun)
+        for name, period, task in self.scan_classes(blocks):
+            self.scheduler.add(name, period, task)
+
+        self.polling = True
+        self.scheduler.run(lambda: self.running and self.polling)
+        self.polling = False
+        for line in self.scheduler.stats():
+            self.log(line)
+        self.log("Polling stopped.")
+
+    def scan_classes(self, blocks=None):
+        """(name, period ms, task) of every scan class of the read blocks."""
+        if blocks is None:
+            df, plan, blocks = self.compile()
+        classes = {}
+        for block in blocks:
+            classes.setdefault(block.cycle or SCAN_CLASSES[DEFAULT_SCAN_CLASS], []).append(block)
+        scans = []
+        for period, group in sorted(classes.items()):
+            self.log(f"Scan class {scan_class_name(period)}: {len(group)} requests every {period:g} ms")
+            scans.append((scan_class_name(period), period * self.pace, lambda group=group: self.scan(group)))
+        return scans
+
+    def stop_polling(self):
+        self.polling = False
+
+    def scan(self, blocks):
+        if isinstance(self.client, PipelinedClient):
+            # put the whole scan on the wire, then collect the answers in order
+            futures = [(block, self.client.submit_read(block.code, block.address, block.count)) for block in blocks]
+            for block, future in futures:
+                self.store_block(block, self.client.result(future))
+            return
+        for block in blocks:
+            if not self.running:
+                break
+            self.fetch_block(block)
+
+    def scan_overrun(self, scan_class):
+        self.log(f"Scan class {scan_class.name} overrun: scan took {scan_class.last_ms:.1f} ms, "
+                 f"period {scan_class.period * 1000:g} ms, {scan_class.skipped} scans skipped so far")
+
+    def fetch_block(self, block):
+        """Read one block and slice the values into its steps, False if the slave did not answer."""
+        if block.code == 1:
+            data = self.client.read_coils(block.address, block.count)
+        elif block.code == 2:
+            data = self.client.read_discrete_inputs(block.address, block.count)
+        elif block.code == 3:
+            data = self.client.read_holding_registers(block.address, block.count)
+        else:
+            data = self.client.read_input_registers(block.address, block.count)
+        return self.store_block(block, data)
+
+    def store_block(self, block, data):
+        self.requests += 1
+        if not data:
+            self.failures += 1
+            self.log(f"No response reading {block.count} of FC{block.code} at Index {block.address}")
+            return False
+        for step, value in zip(block.steps, block.decode(data)):
+            step.value = value
+        self.signals_read += len(block.steps)
+        return True
+
+    def read_block(self, block, value=None):
+        if self.fetch_block(block):
+            self.log(f"Read FC{block.code} Index {block.address}..{block.end - 1}: {len(block.steps)} signals in one request")
+
+    def read_coil_signal(self, step, value):
+        bits = self.client.read_coils(step.address, 1)
+        if bits:
+            self.log(f"Read Coil status at  Index : {step.address}, value {bits}")
+            return int(bits[0])
+
+    def read_discrete_signal(self, step, value):
+        bits = self.client.read_discrete_inputs(step.address, 1)
+        if bits:
+            self.log(f"Read Input status at  Index : {step.address}, value {bits}")
+            return int(bits[0])
+
+    def read_register_signal(self, step, value):
+        if step.code == 3:
+            registers = self.client.read_holding_registers(step.address, step.count)
+        else:
+            registers = self.client.read_input_registers(step.address, step.count)
+        if registers:
+            value = step.codec.decode(registers)
+            if step.codec.is_float:
+                value = round(value,4)
+            self.log(f"Read {'holding' if step.code == 3 else 'input'} register {step.address}: {step.mtype} value {value}")
+            return value
+
+    def write_coil_signal(self, step, value):
+        value_di = [bool(int(value))]
+        self.writes.write_coil(step.address, value_di[0])
+        self.log(f"Set Coil status at  Index : {step.address} , with value {value_di}")
+
+    def write_register_signal(self, step, value):
+        # every register of the value, a 32-bit FC6 row used to lose its second word
+        registers = step.codec.encode(value)
+        self.writes.write_registers(step.address, registers)
+        self.log(f"Set holding register {step.address}: {step.mtype} value {value}")
+
+    def invalid_signal(self, step, value):
+        self.log(" Invalid Function code ")
+
+#***************Command line**********************************************
+
+ENGINES = {
+    "iec104-slave": IEC104SlaveEngine,
+    "iec104-master": IEC104ClientEngine,
+    "modbus-slave": ModbusSlaveEngine,
+    "modbus-master": ModbusMasterEngine,
+}
+
+DEFAULT_PORTS = {"iec104-slave": 2404, "iec104-master": 2404, "modbus-slave": 502, "modbus-master": 502}
+
+def console_log(ip_address):
+    lock = threading.Lock()
+    def log(message):
+        with lock:
+            print(f"{datetime.datetime.now()} [{ip_address}] {message}", flush=True)
+    return log
+
+def run_engine(engine, poll=False, burst=0, window=DEFAULT_WINDOW):
+    engine.start()
+    if hasattr(engine, "wait_for_connection") and not engine.wait_for_connection():
+        return
+    if poll:
+        engine.poll()
+    elif burst:
+        engine.burst(burst, window)
+    else:
+        engine.run()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Modbus / IEC 104 simulator (All-at-Once mode).")
+    parser.add_argument("workbook", help="Excel workbook with the signal list")
+    parser.add_argument("--mode", required=True, choices=sorted(ENGINES), help="simulator to run")
+    parser.add_argument("--sheet", default=0, help="sheet name, first sheet by default")
+    parser.add_argument("--ip", action="append", help="IP address to simulate, repeatable, every IP of the sheet by default")
+    parser.add_argument("--port", type=int, help="TCP port, 2404 for IEC 104 and 502 for Modbus by default")
+    parser.add_argument("--asdu", type=int, default=1, help="IEC 104 common address")
+    parser.add_argument("--unit", type=int, default=1, help="Modbus unit id (master)")
+    parser.add_argument("--timeout", type=float, default=30, help="Modbus master request timeout in seconds")
+    parser.add_argument("--depth", type=int, default=1, help="Modbus master requests in flight per connection, 1 for pyModbusTCP")
+    parser.add_argument("--gap", type=int, default=GAP_TOLERANCE, help="unused addresses a master read may span to join two ranges")
+    parser.add_argument("--backup", help="iec104-master: backup servers 'ip[:port], ...' forming a redundancy group with --ip")
+    parser.add_argument("--burst", type=int, default=0, metavar="ROUNDS", help="iec104-master: send every command row ROUNDS times as a burst and report ack latencies")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="iec104-master: commands in flight during --burst")
+    parser.add_argument("--mirror-port", type=int, help="modbus-slave: IEC 104 port that mirrors the written outputs with a 'Mirror IOA' cell")
+    parser.add_argument("--poll", action="store_true", help="modbus-master: scan the read rows by 'Scan Class' instead of the All-at-Once loop")
+    parser.add_argument("--seed", type=int, help="seed of the simulated values, random by default")
+    parser.add_argument("--pace", type=float, default=1.0, help="scale of the point periods, 0 fires every point on each wheel tick")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL, help="seconds between saves of UpdatedValue")
+    parser.add_argument("--snapshot-mode", choices=["snapshot", "journal"], default="snapshot")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    port = args.port or DEFAULT_PORTS[args.mode]
+    options = {"pace": args.pace}
+    if args.mode == "modbus-master":
+        options["unit"] = args.unit
+        options["gap"] = args.gap
+        options["depth"] = args.depth
+        options["timeout"] = args.timeout
+    elif args.mode == "modbus-slave" and args.mirror_port:
+        options["mirror_port"] = args.mirror_port
+        options["mirror_asdu"] = args.asdu
+    elif args.mode.startswith("iec104"):
+        options["asdu"] = args.asdu
+        if args.mode == "iec104-master" and args.backup:
+            options["backups"] = args.backup
+
+    # one writer for the whole sheet, the engines only fill in their own rows
+    engine_class = ENGINES[args.mode]
+    df = load_sheet(args.workbook, args.sheet, engine_class.value_column)
+    writer = SnapshotWriter(args.workbook, df, args.sheet, interval=args.snapshot_interval, mode=args.snapshot_mode,
+                            on_error=lambda e: print(f"Error {str(e)}", flush=True))
+
+    engines = []
+    threads = []
+    for i, ip_address in enumerate(args.ip or sheet_ips(args.workbook, args.sheet)):
+        seed = None if args.seed is None else [args.seed, i]
+        engine = engine_class(args.workbook, args.sheet, ip_address, port=port, log=console_log(ip_address), writer=writer,
+                              seed=seed, **options)
+        engines.append(engine)
+        burst = args.burst if args.mode == "iec104-master" else 0
+        thread = threading.Thread(target=run_engine, args=(engine, args.poll and args.mode == "modbus-master", burst, args.window),
+                                  daemon=True)
+        threads.append(thread)
+        thread.start()
+
+    started = time.monotonic()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            if args.duration and time.monotonic() - started >= args.duration:
+                break
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    for engine in engines:
+        engine.stop()
+    for thread in threads:
+        thread.join(10)
+    writer.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+import sys
+import time
+import struct
+import asyncio
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from sheet_cache import read_sheet
+
+# IEC 104 station at substation scale. The points of a sheet (or a synthetic
+# set) are held as NumPy columns instead of one c104 point per row, so 100k
+# points load in milliseconds. The asyncio server answers STARTDT / STOPDT /
+# TESTFR and a general interrogation (C_IC_NA_1): ACT_CON, the whole station
+# as densely packed ASDUs, ACT_TERM. Runs of consecutive IOAs go out as
+# sequence ASDUs (SQ=1, one IOA for up to 127 elements), the remaining IOAs as
+# multi-object ASDUs, always within the 249 byte ASDU and the k / w window of
+# the link layer. GI answers use the types without time tag, M_SP_TB_1 rows
+# are sent as M_SP_NA_1 and M_ME_TF_1 rows as M_ME_NC_1. One GI runs per
+# connection at a time, a deactivation stops it; group interrogations (QOI
+# 21-36, the station has no groups), other commands, causes and common
+# addresses get a negative confirmation.
+#
+#   python iec104_scale.py --points 50000 --port 2404
+#   python iec104_scale.py 1.xlsx --sheet Sheet1
+#   python iec104_scale.py --bench 1000,10000,50000,100000
+
+START = 0x68
+STARTDT_ACT, STARTDT_CON = 0x07, 0x0B
+STOPDT_ACT, STOPDT_CON = 0x13, 0x23
+TESTFR_ACT, TESTFR_CON = 0x43, 0x83
+
+K = 12  # unacknowledged I-frames the sender may have outstanding
+W = 8   # I-frames the receiver acknowledges at the latest
+
+M_SP_NA_1 = 1
+M_ME_NC_1 = 13
+C_IC_NA_1 = 100
+GI_TYPES = {1: M_SP_NA_1, 30: M_SP_NA_1, 13: M_ME_NC_1, 36: M_ME_NC_1}
+
+COT_ACTIVATION = 6
+COT_ACTIVATION_CON = 7
+COT_DEACTIVATION = 8
+COT_DEACTIVATION_CON = 9
+COT_ACTIVATION_TERMINATION = 10
+COT_INTERROGATED = 20
+QOI_STATION = 20
+COT_UNKNOWN_TYPE = 44
+COT_UNKNOWN_CAUSE = 45
+COT_UNKNOWN_COMMON_ADDRESS = 46
+NEGATIVE = 0x40
+BROADCAST_ADDRESS = 0xFFFF
+
+ASDU_SIZE = 249
+ASDU_HEADER = struct.Struct("<BBBBH")
+MAX_OBJECTS = 127
+
+ELEMENTS = {
+    M_SP_NA_1: np.dtype([('siq', 'u1')]),
+    M_ME_NC_1: np.dtype([('value', '<f4'), ('qds', 'u1')]),
+}
+
+def _ioa_bytes(ioa):
+    return int(ioa).to_bytes(3, 'little')
+
+def _u_frame(control):
+    return bytes((START, 4, control, 0, 0, 0))
+
+class PointSet:
+    """IOAs, GI type ids and values of one station as NumPy columns."""
+
+    def __init__(self, ioas, type_ids, values, common_address=1):
+        ioas = np.asarray(ioas, dtype=np.int64)
+        type_ids = np.asarray(type_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        known = np.isin(type_ids, list(GI_TYPES))
+        mapped = np.zeros(len(type_ids), dtype=np.int64)
+        for type_id, gi_type in GI_TYPES.items():
+            mapped[type_ids == type_id] = gi_type
+        order = np.lexsort((ioas[known], mapped[known]))
+        self.ioas = ioas[known][order]
+        self.types = mapped[known][order]
+        self.values = values[known][order]
+        self.common_address = int(common_address)
+        self.skipped = int((~known).sum())
+
+    def __len__(self):
+        return len(self.ioas)
+
+    @classmethod
+    def from_sheet(cls, xls, sheet_name=0, ip_address=None, common_address=1):
+        """Monitoring rows of an IEC 104 sheet, optionally of one IP address."""
+        df = read_sheet(xls, sheet_name=sheet_name)
+        if ip_address is not None:
+            df = df[df['IP Address'].astype(str).str.strip() == str(ip_address).strip()]
+        df = df.dropna(subset=['IOA', 'Type ID'])
+        if 'value' in df.columns:
+            values = np.nan_to_num(pd.to_numeric(df['value'], errors='coerce').to_numpy(dtype=np.float64))
+        else:
+            values = np.zeros(len(df))
+        return cls(df['IOA'].to_numpy(dtype=np.int64), df['Type ID'].to_numpy(dtype=np.int64), values, common_address)
+
+    @classmethod
+    def synthetic(cls, count, start_ioa=1, analog_share=0.5, common_address=1, seed=None):
+        """count points on consecutive IOAs, the first analog_share of them M_ME_NC_1."""
+        rng = np.random.default_rng(seed)
+        analog = int(count * analog_share)
+        type_ids = np.where(np.arange(count) < analog, M_ME_NC_1, M_SP_NA_1)
+        values = np.where(type_ids == M_ME_NC_1, rng.uniform(0, 100, count), rng.integers(0, 2, count))
+        return cls(np.arange(start_ioa, start_ioa + count), type_ids, values, common_address)
+
+    def interrogation_asdus(self, qoi=20):
+        """Every ASDU of a GI answer, runs of consecutive IOAs as sequence ASDUs."""
+        asdus = []
+        for gi_type in np.unique(self.types):
+            selected = self.types == gi_type
+            ioas = self.ioas[selected]
+            values = self.values[selected]
+            element = ELEMENTS[int(gi_type)]
+            elements = np.zeros(len(ioas), dtype=element)
+            if gi_type == M_SP_NA_1:
+                elements['siq'] = values != 0
+            else:
+                elements['value'] = values
+            element_bytes = elements.tobytes()
+            size = element.itemsize
+            per_sequence = min(MAX_OBJECTS, (ASDU_SIZE - ASDU_HEADER.size - 3) // size)
+            per_single = min(MAX_OBJECTS, (ASDU_SIZE - ASDU_HEADER.size) // (size + 3))
+
+            # runs of consecutive IOAs, a run of one joins the multi-object ASDUs
+            breaks = np.flatnonzero(np.diff(ioas) != 1) + 1
+            starts = np.concatenate(([0], breaks))
+            ends = np.concatenate((breaks, [len(ioas)]))
+            singles = []
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end - start == 1:
+                    singles.append(start)
+                    continue
+                for first in range(start, end, per_sequence):
+                    last = min(end, first + per_sequence)
+                    header = ASDU_HEADER.pack(int(gi_type), 0x80 | (last - first), COT_INTERROGATED, 0, self.common_address)
+                    asdus.append(header + _ioa_bytes(ioas[first]) + element_bytes[first * size:last * size])
+            for first in range(0, len(singles), per_single):
+                chunk = singles[first:first + per_single]
+                header = ASDU_HEADER.pack(int(gi_type), len(chunk), COT_INTERROGATED, 0, self.common_address)
+                asdus.append(header + b"".join(_ioa_bytes(ioas[i]) + element_bytes[i * size:(i + 1) * size] for i in chunk))
+        return asdus
+
+class IEC104ScaleProtocol(asyncio.Protocol):
+    """One master connection: link layer, k window and the GI answer."""
+
+    def __init__(self, station):
+        self.station = station
+        self.buffer = bytearray()
+        self.transport = None
+        self.started = False
+        self.send_seq = 0
+        self.recv_seq = 0
+        self.acked = 0
+        self.unacked_received = 0
+        self.window = asyncio.Event()
+        self.window.set()
+        self.task = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.station.connections += 1
+
+    def connection_lost(self, exc):
+        self.station.connections -= 1
+        if self.task:
+            self.task.cancel()
+
+    def data_received(self, data):
+        buffer = self.buffer
+        buffer += data
+        offset = 0
+        while len(buffer) - offset >= 2:
+            if buffer[offset] != START or buffer[offset + 1] < 4:
+                self.transport.close()  # not IEC 104, drop the connection
+                return
+            end = offset + 2 + buffer[offset + 1]
+            if end > len(buffer):
+                break
+            self.frame(bytes(buffer[offset:end]))
+            offset = end
+        del buffer[:offset]
+
+    def frame(self, apdu):
+        control = apdu[2]
+        if control & 0x01 == 0:
+            self.recv_seq = (self.recv_seq + 1) & 0x7FFF
+            self.acknowledge(int.from_bytes(apdu[4:6], 'little') >> 1)
+            self.asdu(apdu[6:])
+        elif control & 0x03 == 0x01:
+            self.acknowledge(int.from_bytes(apdu[4:6], 'little') >> 1)
+        elif control == STARTDT_ACT:
+            self.started = True
+            self.transport.write(_u_frame(STARTDT_CON))
+        elif control == STOPDT_ACT:
+            self.started = False
+            self.transport.write(_u_frame(STOPDT_CON))
+        elif control == TESTFR_ACT:
+            self.transport.write(_u_frame(TESTFR_CON))
+
+    def acknowledge(self, sequence):
+        self.acked = sequence
+        if self.outstanding() < K:
+            self.window.set()
+
+    def outstanding(self):
+        return (self.send_seq - self.acked) & 0x7FFF
+
+    def asdu(self, asdu):
+        if not self.started or len(asdu) < ASDU_HEADER.size:
+            return
+        type_id, vsq, cause, originator, common_address = ASDU_HEADER.unpack_from(asdu)
+        cause &= 0x3F
+        station_address = self.station.points.common_address
+        running = self.task is not None and not self.task.done()
+        if common_address not in (station_address, BROADCAST_ADDRESS):
+            self.reply(asdu, NEGATIVE | COT_UNKNOWN_COMMON_ADDRESS)
+        elif type_id != C_IC_NA_1:
+            self.reply(asdu, NEGATIVE | COT_UNKNOWN_TYPE)
+        elif cause == COT_ACTIVATION and (len(asdu) <= 9 or asdu[9] != QOI_STATION):
+            self.reply(asdu, NEGATIVE | COT_ACTIVATION_CON)  # group interrogation
+        elif cause == COT_ACTIVATION and running:
+            self.reply(asdu, NEGATIVE | COT_ACTIVATION_CON)  # one GI at a time
+        elif cause == COT_ACTIVATION:
+            # a broadcast GI is answered with the address of the station
+            command = asdu[:4] + station_address.to_bytes(2, 'little') + asdu[6:]
+            self.reply(command, COT_ACTIVATION_CON)
+            self.task = asyncio.ensure_future(self.interrogation(command))
+        elif cause == COT_DEACTIVATION:
+            if running:
+                self.task.cancel()
+            self.reply(asdu, COT_DEACTIVATION_CON if running else NEGATIVE | COT_DEACTIVATION_CON)
+        else:
+            self.reply(asdu, NEGATIVE | COT_UNKNOWN_CAUSE)
+
+        self.unacked_received += 1
+        if self.unacked_received >= W:
+            self.transport.write(bytes((START, 4, 0x01, 0)) + (self.recv_seq << 1).to_bytes(2, 'little'))
+            self.unacked_received = 0
+
+    def reply(self, asdu, cause):
+        """Mirror a command ASDU back with another cause of transmission."""
+        reply = bytearray(asdu)
+        reply[2] = cause
+        self.send(bytes(reply))
+
+    def send(self, asdu):
+        header = bytes((START, len(asdu) + 4)) + (self.send_seq << 1).to_bytes(2, 'little') + (self.recv_seq << 1).to_bytes(2, 'little')
+        self.transport.write(header + asdu)
+        self.send_seq = (self.send_seq + 1) & 0x7FFF
+        self.unacked_received = 0
+        if self.outstanding() >= K:
+            self.window.clear()
+
+    async def interrogation(self, command):
+        station = self.station
+        started = time.perf_counter()
+        for asdu in station.asdus():
+            await self.window.wait()
+            if self.transport.is_closing():
+                return
+            self.send(asdu)
+        await self.window.wait()
+        self.reply(command, COT_ACTIVATION_TERMINATION)
+        station.interrogations += 1
+        station.last_gi_ms = (time.perf_counter() - started) * 1000
+
+class ScaleStation:
+    """PointSet served on one port, the GI answer is built once per value change."""
+
+    def __init__(self, points, ip_address="0.0.0.0", port=2404):
+        self.points = points
+        self.ip_address = ip_address
+        self.port = port
+        self.connections = 0
+        self.interrogations = 0
+        self.last_gi_ms = None
+        self.server = None
+        self._asdus = None
+
+    def asdus(self):
+        if self._asdus is None:
+            self._asdus = self.points.interrogation_asdus()
+        return self._asdus
+
+    def set_values(self, values):
+        self.points.values = np.asarray(values, dtype=np.float64)
+        self._asdus = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(lambda: IEC104ScaleProtocol(self), self.ip_address, self.port, reuse_address=True)
+        return self.server
+
+    def close(self):
+        if self.server:
+            self.server.close()
+
+#***************GI benchmark**********************************************
+
+async def interrogate(host, port, common_address=1, timeout=60.0):
+    """STARTDT and one GI as a master, return (objects, asdus, confirm ms, complete ms)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_u_frame(STARTDT_ACT))
+        await asyncio.wait_for(reader.readexactly(6), timeout)
+        command = ASDU_HEADER.pack(C_IC_NA_1, 1, COT_ACTIVATION, 0, common_address) + _ioa_bytes(0) + bytes((20,))
+        started = time.perf_counter()
+        writer.write(bytes((START, len(command) + 4, 0, 0, 0, 0)) + command)
+        objects = asdus = received = 0
+        confirmed = None
+        while True:
+            header = await asyncio.wait_for(reader.readexactly(2), timeout)
+            apdu = header + await asyncio.wait_for(reader.readexactly(header[1]), timeout)
+            if apdu[2] & 0x01:
+                continue
+            received = (received + 1) & 0x7FFF
+            if received % W == 0:
+                writer.write(bytes((START, 4, 0x01, 0)) + (received << 1).to_bytes(2, 'little'))
+            type_id, vsq, cause = apdu[6], apdu[7], apdu[8] & 0x3F
+            if type_id == C_IC_NA_1:
+                if cause == COT_ACTIVATION_CON:
+                    confirmed = (time.perf_counter() - started) * 1000
+                elif cause == COT_ACTIVATION_TERMINATION:
+                    return objects, asdus, confirmed, (time.perf_counter() - started) * 1000
+            elif cause == COT_INTERROGATED:
+                objects += vsq & 0x7F
+                asdus += 1
+    finally:
+        writer.close()
+
+def bench(counts=(1000, 10000, 50000, 100000), host="127.0.0.1", port=12404, log=print):
+    """GI completion time of a local scale station against its point count."""
+    results = []
+
+    async def run():
+        for count in counts:
+            started = time.perf_counter()
+            points = PointSet.synthetic(count, seed=count)
+            station = ScaleStation(points, host, port)
+            load_ms = (time.perf_counter() - started) * 1000
+            await station.start()
+            try:
+                objects, asdus, confirm_ms, gi_ms = await interrogate(host, port)
+            finally:
+                station.close()
+                await station.server.wait_closed()
+            results.append((count, objects, asdus, load_ms, gi_ms))
+            log(f"Points: {count}, load {load_ms:.1f} ms, GI {gi_ms:.1f} ms (ACT_CON {confirm_ms:.1f} ms), "
+                f"{objects} objects in {asdus} ASDUs, {objects / gi_ms * 1000:.0f} objects/s")
+
+    asyncio.run(run())
+    return results
+
+#***************Command line**********************************************
+
+def console_log(message):
+    print(f"{datetime.datetime.now()} {message}", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IEC 104 station with tens of thousands of points and a packed GI answer")
+    parser.add_argument("workbook", nargs="?", help="Excel workbook with the IEC 104 signal list")
+    parser.add_argument("--sheet", default=0, help="sheet name, first sheet by default")
+    parser.add_argument("--ip", help="serve only the rows of this IP address")
+    parser.add_argument("--bind", default="0.0.0.0", help="local address to listen on")
+    parser.add_argument("--port", type=int, default=2404)
+    parser.add_argument("--asdu", type=int, default=1, help="common address")
+    parser.add_argument("--points", type=int, help="serve this many synthetic points instead of a workbook")
+    parser.add_argument("--bench", help="comma separated point counts to benchmark the GI completion time")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        bench([int(count) for count in args.bench.split(',')], log=console_log)
+        return 0
+    started = time.perf_counter()
+    if args.points:
+        points = PointSet.synthetic(args.points, common_address=args.asdu)
+    elif args.workbook:
+        points = PointSet.from_sheet(args.workbook, args.sheet, args.ip, args.asdu)
+    else:
+        parser.error("a workbook, --points or --bench is required")
+    station = ScaleStation(points, args.bind, args.port)
+    station.asdus()
+    console_log(f"{len(points)} points loaded in {(time.perf_counter() - started) * 1000:.1f} ms, "
+                f"GI answer {len(station.asdus())} ASDUs" + (f", {points.skipped} rows skipped" if points.skipped else ""))
+
+    async def serve():
+        await station.start()
+        console_log(f"Serving on {args.bind}:{args.port}")
+        last = 0
+        while True:
+            await asyncio.sleep(1)
+            if station.interrogations != last:
+                last = station.interrogations
+                console_log(f"GI {last} answered in {station.last_gi_ms:.1f} ms, {station.connections} connections")
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import time
+import threading
+import c104
+
+# Spontaneous transmission of the IEC 104 slaves. A value change only marks its
+# point; every interval the marked points are grouped by server, station and
+# type and sent with COT 3 (spontaneous), as many information objects per ASDU
+# as the type fits into the 249 byte ASDU, instead of letting every point report
+# on its own report_ms cycle for a while after the change. The changed points per
+# second are logged every report_interval seconds.
+
+TRANSMIT_INTERVAL = 0.1
+REPORT_INTERVAL = 10.0
+
+ASDU_PAYLOAD = 249 - 6  # ASDU length minus type id, VSQ, COT and common address
+MAX_OBJECTS = 127       # number field of the VSQ
+
+# information object size including the 3 byte IOA
+OBJECT_SIZES = {
+    c104.Type.M_SP_NA_1: 3 + 1,
+    c104.Type.M_ME_NC_1: 3 + 5,
+    c104.Type.M_SP_TB_1: 3 + 1 + 7,
+    c104.Type.M_ME_TF_1: 3 + 5 + 7,
+}
+
+def objects_per_asdu(point_type):
+    """Information objects of one type that fit into one ASDU, 1 for unknown types."""
+    size = OBJECT_SIZES.get(point_type)
+    return min(MAX_OBJECTS, ASDU_PAYLOAD // size) if size else 1
+
+class SpontaneousTransmitter:
+    """Batched COT 3 transmission of changed points, shared by any number of servers."""
+
+    def __init__(self, interval=TRANSMIT_INTERVAL, report_interval=REPORT_INTERVAL, log=None):
+        self.interval = interval
+        self.report_interval = report_interval
+        self.log = log
+        self.points = 0
+        self.asdus = 0
+        self.failures = 0
+        self._changed = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark(self, point):
+        """Queue a changed point, a point marked twice before the flush is sent once."""
+        with self._lock:
+            self._changed[id(point)] = point
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Send every marked point, return the number of ASDUs."""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+        groups = {}
+        for point in changed.values():
+            station = point.station
+            groups.setdefault((id(station.server), station.common_address, point.type), []).append(point)
+
+        asdus = 0
+        for points in groups.values():
+            size = objects_per_asdu(points[0].type)
+            for start in range(0, len(points), size):
+                self._send(points[start:start + size])
+                asdus += 1
+        self.points += len(changed)
+        self.asdus += asdus
+        return asdus
+
+    def _send(self, points):
+        try:
+            if len(points) > 1 and hasattr(c104, 'Batch'):
+                sent = points[0].station.server.transmit_batch(c104.Batch(cause=c104.Cot.SPONTANEOUS, points=points))
+            else:
+                sent = all([point.transmit(cause=c104.Cot.SPONTANEOUS) for point in points])
+        except (ValueError, RuntimeError) as e:
+            sent = False
+            if self.log:
+                self.log(f"Error {str(e)}")
+        if not sent:
+            self.failures += 1
+
+    def _run(self):
+        last_points, last_asdus = self.points, self.asdus
+        last_time = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            self.flush()
+            now = time.perf_counter()
+            if now - last_time >= self.report_interval:
+                if self.log and self.points != last_points:
+                    elapsed = now - last_time
+                    self.log(f"Spontaneous: {(self.points - last_points) / elapsed:.0f} changed points/s "
+                             f"in {(self.asdus - last_asdus) / elapsed:.0f} ASDUs/s")
+                last_points, last_asdus, last_time = self.points, self.asdus, now
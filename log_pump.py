@@ -0,0 +1,67 @@
+import time
+import threading
+import collections
+import tkinter as tk
+
+# Batched writer for the Tk log panes. log() only appends the message to a
+# deque (safe from any thread), a Tk after() callback drains the deque at a fixed
+# frame rate with one Text insert per frame, and the pane is trimmed to
+# max_lines. Loops that still run on the Tk thread get one master.update() per
+# frame instead of one per message, so the window and the STOP button stay alive.
+
+LOG_FPS = 30
+LOG_MAX_LINES = 5000
+
+class LogPump:
+    """Thread-safe message queue drained into a Tk Text widget."""
+
+    def __init__(self, master, text, fps=LOG_FPS, max_lines=LOG_MAX_LINES):
+        self.master = master
+        self.text = text
+        self.interval = 1.0 / fps
+        self.max_lines = max_lines
+        self._queue = collections.deque()
+        self._lines = 0
+        self._last_frame = 0.0
+        self._tk_thread = threading.get_ident()
+        self._tick()
+
+    def put(self, message):
+        """Queue one message, callable from any thread."""
+        self._queue.append(message)
+        if threading.get_ident() == self._tk_thread:
+            now = time.monotonic()
+            if now - self._last_frame >= self.interval:
+                self._last_frame = now
+                self.drain()
+                self.master.update()
+
+    def drain(self):
+        """Insert all queued messages in one go, Tk thread only."""
+        count = len(self._queue)
+        if not count:
+            return
+        lines = [self._queue.popleft() for _ in range(count)]
+        self.text.config(state='normal')
+        self.text.insert(tk.END, "\n".join(map(str, lines)) + "\n")
+        self._lines += count
+        if self._lines > self.max_lines:
+            self.text.delete('1.0', f"{self._lines - self.max_lines + 1}.0")
+            self._lines = self.max_lines
+        self.text.config(state='disabled')
+        self.text.see(tk.END)
+
+    def clear(self):
+        """Drop the queued messages and empty the pane."""
+        self._queue.clear()
+        self.text.config(state='normal')
+        self.text.delete('1.0', tk.END)
+        self.text.config(state='disabled')
+        self._lines = 0
+
+    def _tick(self):
+        try:
+            self.drain()
+            self.master.after(int(self.interval * 1000), self._tick)
+        except tk.TclError:
+            pass  # the pane was destroyed, stop pumping
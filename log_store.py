@@ -0,0 +1,177 @@
+import os
+import re
+import sys
+import time
+import datetime
+import tempfile
+import threading
+from array import array
+
+# Bounded log of the simulators. The newest `capacity` entries are kept in a
+# ring of compact columns: epoch-ns timestamps, the id of an interned message
+# template (the message with its numbers cut out) and the tuple of numbers.
+# The template table is capped at `max_templates`: once it is full, a message
+# with a new template (names, exception texts) is kept as raw text instead.
+# Entries pushed out of the ring are appended to a spill file on disk, so a
+# report streams the spill file followed by the ring and never needs the
+# whole log in memory.
+
+LOG_CAPACITY = 100000
+SPILL_CHUNK = 1024
+MAX_TEMPLATES = 4096
+RAW = -1  # template id of a message kept as raw text, its args are (message,)
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_MARK = "\x1f"
+_NEWLINE = "\x1e"  # stands in for line breaks inside a spilled message
+
+def split_message(message):
+    """Split a message into (template, args), the numbers become the args."""
+    args = tuple(_NUMBER.findall(message))
+    if not args:
+        return message, ()
+    return _NUMBER.sub(_MARK, message), args
+
+def join_message(template, args):
+    """Inverse of split_message."""
+    if not args:
+        return template
+    parts = template.split(_MARK)
+    out = [parts[0]]
+    for arg, part in zip(args, parts[1:]):
+        out.append(arg)
+        out.append(part)
+    return "".join(out)
+
+class LogStore:
+    """Fixed-size ring of log entries with an append-only spill file."""
+
+    def __init__(self, capacity=LOG_CAPACITY, spill_path=None, max_templates=MAX_TEMPLATES):
+        self.capacity = capacity
+        self.max_templates = max_templates
+        self.spill_path = spill_path
+        self.spilled = 0
+        self._temporary = spill_path is None
+        self._stamps = array('q', bytes(8 * capacity))
+        self._template_ids = array('l', bytes(array('l').itemsize * capacity))
+        self._args = [()] * capacity
+        self._templates = []
+        self._template_index = {}
+        self._next = 0
+        self._count = 0
+        self._spill_buffer = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.spilled + self._count
+
+    def append(self, message, stamp=None):
+        """Add one message, stamp is epoch ns (now when omitted)."""
+        template, args = split_message(str(message))
+        if stamp is None:
+            stamp = time.time_ns()
+        with self._lock:
+            template_id = self._template_index.get(template)
+            if template_id is None:
+                if len(self._templates) < self.max_templates:
+                    template_id = self._template_index[template] = len(self._templates)
+                    self._templates.append(sys.intern(template))
+                else:
+                    template_id, args = RAW, (str(message),)
+
+            i = self._next
+            if self._count == self.capacity:
+                self._spill_buffer.append(self._entry(i))
+                if len(self._spill_buffer) >= SPILL_CHUNK:
+                    self._spill()
+            else:
+                self._count += 1
+            self._stamps[i] = stamp
+            self._template_ids[i] = template_id
+            self._args[i] = args
+            self._next = (i + 1) % self.capacity
+
+    def entries(self):
+        """Yield (epoch_ns, message) from the oldest entry to the newest."""
+        with self._lock:
+            self._spill()
+            start = (self._next - self._count) % self.capacity
+            ring = [self._entry((start + k) % self.capacity) for k in range(self._count)]
+            path = self.spill_path if self.spilled else None
+
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    stamp, _, message = line.rstrip("\n").partition("\t")
+                    yield int(stamp), message.replace(_NEWLINE, "\n")
+        yield from ring
+
+    def __iter__(self):
+        return self.entries()
+
+    def close(self):
+        """Forget the ring and delete a temporary spill file."""
+        with self._lock:
+            self._spill_buffer.clear()
+            self._count = 0
+            self._next = 0
+            if self._temporary and self.spill_path:
+                try:
+                    os.remove(self.spill_path)
+                except OSError:
+                    pass
+                self.spill_path = None
+            self.spilled = 0
+
+    def _entry(self, i):
+        template_id = self._template_ids[i]
+        if template_id == RAW:
+            return self._stamps[i], self._args[i][0]
+        return self._stamps[i], join_message(self._templates[template_id], self._args[i])
+
+    def _spill(self):
+        if not self._spill_buffer:
+            return
+        if self.spill_path is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix="simulator_log_", suffix=".log")
+            os.close(fd)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{stamp}\t{message.replace(chr(10), _NEWLINE)}\n" for stamp, message in self._spill_buffer)
+        self.spilled += len(self._spill_buffer)
+        self._spill_buffer.clear()
+
+#***************Reports streamed from a LogStore**************************
+
+def _local_time(stamp):
+    return datetime.datetime.fromtimestamp(stamp / 1e9)
+
+def write_report_txt(store, filename, title="IEC 104 Simulator Report"):
+    """Write the messages of store to a text report."""
+    with open(filename, "w") as report_file:
+        report_file.write(f"{title}\n")
+        report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
+        for _, message in store.entries():
+            report_file.write(f"{message}\n")
+
+def write_report_xlsx(store, filename, sheet_name="Log"):
+    """Write Timestamp/Message rows of store to an xlsx report, row by row."""
+    import xlsxwriter
+
+    max_rows = 1048575  # xlsx row limit minus the header
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss.000'})
+    try:
+        worksheet = None
+        for n, (stamp, message) in enumerate(store.entries()):
+            row = n % max_rows
+            if row == 0:
+                worksheet = workbook.add_worksheet(sheet_name if n == 0 else f"{sheet_name}{n // max_rows + 1}")
+                worksheet.set_column('A:B', 20)
+                worksheet.write_row(0, 0, ["Timestamp", "Message"])
+            worksheet.write_datetime(row + 1, 0, _local_time(stamp), date_format)
+            worksheet.write_string(row + 1, 1, message)
+        if worksheet is None:
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, ["Timestamp", "Message"])
+    finally:
+        workbook.close()
@@ -0,0 +1,144 @@
+import sys
+import time
+import argparse
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sheet_cache import read_sheet
+from engine import ModbusMasterEngine
+from scan_scheduler import ScanScheduler
+from modbus_pipeline import PIPELINE_DEPTH
+
+# Modbus master for every slave of a workbook. The sheet is split by IP Address
+# and the optional 'Port' / 'Unit ID' columns, each slave gets its own
+# ModbusMasterEngine (one connection) in the pool, and the scan classes of all of
+# them are dispatched by one deadline scheduler onto a bounded thread pool, so a
+# slow or dead RTU only delays its own scans. Aggregate throughput is logged
+# every report_interval seconds:
+#
+#   python master_pool.py sample_mbus_master.xlsx --workers 16
+
+DEFAULT_WORKERS = 16
+
+def slave_targets(xls, sheet_name=0, port=502, unit=1):
+    """Distinct (ip, port, unit id) of a sheet, '-' rows excluded."""
+    df = read_sheet(xls, sheet_name=sheet_name)
+    df = df[df['IP Address'].notna() & (df['IP Address'].astype(str).str.strip() != '-')]
+    ips = df['IP Address'].astype(str).str.strip()
+    ports = df['Port'].fillna(port).astype(int) if 'Port' in df.columns else [port] * len(df)
+    units = df['Unit ID'].fillna(unit).astype(int) if 'Unit ID' in df.columns else [unit] * len(df)
+    return sorted(set(zip(ips, ports, units)))
+
+class MasterPool:
+    """One Modbus master connection per slave of a workbook, polled concurrently."""
+
+    def __init__(self, xls, sheet_name=0, port=502, unit=1, timeout=5, workers=DEFAULT_WORKERS,
+                 report_interval=10.0, pace=1.0, log=print, **options):
+        self.log = log
+        self.workers = workers
+        self.report_interval = report_interval
+        self.engines = []
+        self.scheduler = None
+        self.running = True
+        self._stop = threading.Event()
+        for ip_address, slave_port, slave_unit in slave_targets(xls, sheet_name, port, unit):
+            engine = ModbusMasterEngine(xls, sheet_name, ip_address, port=slave_port, unit=slave_unit,
+                                        timeout=timeout, pace=pace, log=self.engine_log(ip_address, slave_port, slave_unit), **options)
+            self.engines.append(engine)
+
+    def engine_log(self, ip_address, port, unit):
+        def log(message):
+            self.log(f"[{ip_address}:{port}/{unit}] {message}")
+        return log
+
+    def start(self):
+        for engine in self.engines:
+            engine.start()
+        self.log(f"Opened {len(self.engines)} slave connections, {min(self.workers, len(self.engines))} workers")
+
+    def stop(self):
+        self.running = False
+        self._stop.set()
+        for engine in self.engines:
+            engine.stop()
+
+    def run(self):
+        """Poll every slave until stop() is called."""
+        self.scheduler = ScanScheduler(on_overrun=self.scan_overrun)
+        for engine in self.engines:
+            try:
+                scans = engine.scan_classes()
+            except Exception as e:
+                self.log(f"Error {engine.name} {str(e)}")
+                continue
+            engine.polling = True
+            for name, period, task in scans:
+                self.scheduler.add(f"{engine.name} {name}", period, task)
+
+        reporter = threading.Thread(target=self._reports, daemon=True)
+        reporter.start()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(self.engines)))) as executor:
+            self.scheduler.run(lambda: self.running, executor=executor)
+            for engine in self.engines:
+                engine.stop_polling()
+        self._stop.set()
+        self.report()
+        for line in self.scheduler.stats():
+            self.log(line)
+        self.log("Master pool stopped.")
+
+    def scan_overrun(self, scan_class):
+        self.log(f"Scan {scan_class.name} overrun: last scan {scan_class.last_ms:.1f} ms, "
+                 f"period {scan_class.period * 1000:g} ms, {scan_class.skipped} scans skipped so far")
+
+    def totals(self):
+        return (sum(engine.requests for engine in self.engines),
+                sum(engine.signals_read for engine in self.engines),
+                sum(engine.failures for engine in self.engines))
+
+    def report(self, last=None, elapsed=None):
+        requests, signals, failures = self.totals()
+        if last is None:
+            self.log(f"Slaves: {len(self.engines)}, requests: {requests}, signals read: {signals}, failures: {failures}")
+        else:
+            self.log(f"Slaves: {len(self.engines)}, requests/s: {(requests - last[0]) / elapsed:.0f}, "
+                     f"signals/s: {(signals - last[1]) / elapsed:.0f}, failures: {failures - last[2]}")
+        return requests, signals, failures
+
+    def _reports(self):
+        last = self.totals()
+        last_time = time.perf_counter()
+        while not self._stop.wait(self.report_interval):
+            now = time.perf_counter()
+            last = self.report(last, now - last_time)
+            last_time = now
+
+def console_log(message):
+    print(f"{datetime.datetime.now()} {message}", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll every Modbus slave of a workbook from one connection pool.")
+    parser.add_argument("workbook", help="Excel workbook with the signal list")
+    parser.add_argument("--sheet", default=0, help="sheet name, first sheet by default")
+    parser.add_argument("--port", type=int, default=502, help="port of rows without a Port cell")
+    parser.add_argument("--unit", type=int, default=1, help="unit id of rows without a Unit ID cell")
+    parser.add_argument("--timeout", type=float, default=5, help="request timeout in seconds")
+    parser.add_argument("--depth", type=int, default=PIPELINE_DEPTH, help="requests in flight per connection, 1 for pyModbusTCP")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="size of the polling thread pool")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="seconds between throughput reports")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+
+    pool = MasterPool(args.workbook, args.sheet, args.port, args.unit, args.timeout, args.workers,
+                      args.report_interval, depth=args.depth, log=console_log)
+    pool.start()
+    if args.duration:
+        threading.Timer(args.duration, pool.stop).start()
+    try:
+        pool.run()
+    except KeyboardInterrupt:
+        pool.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+from pyModbusTCP.server import DataBank
+from register_bank import RegisterBank, COILS, DISCRETE_INPUTS, HOLDING_REGISTERS, INPUT_REGISTERS
+
+# pyModbusTCP DataBank served from a RegisterBank. The server hands every
+# request to these methods; srv_info is only set for requests of a master, so
+# those writes go on to RegisterBank.notify() and the bank's on_write callback
+# instead of being found later by polling get_coils / get_holding_registers.
+# Addresses are protocol addresses, as in pyModbusTCP.
+
+def _unit_id(srv_info):
+    try:
+        return srv_info.recv_frame.mbap.unit_id
+    except AttributeError:
+        return None
+
+class BankDataBank(DataBank):
+    """DataBank on top of the preallocated tables of a RegisterBank."""
+
+    def __init__(self, bank=None):
+        DataBank.__init__(self, virtual_mode=True)
+        self.bank = bank if bank is not None else RegisterBank()
+
+    def _get(self, table, address, number, bits):
+        if not self.bank.in_range(address, number):
+            return None
+        if bits:
+            return self.bank.get_bits(table, address, number)
+        return self.bank.get_words(table, address, number)
+
+    def _set(self, table, address, values, srv_info, bits):
+        values = list(values)
+        if not self.bank.in_range(address, len(values)):
+            return False
+        if bits:
+            self.bank.set_bits(table, address, values)
+        else:
+            self.bank.set_words(table, address, [int(value) & 0xFFFF for value in values])
+        if srv_info is not None:
+            self.bank.notify(srv_info.recv_frame.pdu.func_code, table, address, len(values), _unit_id(srv_info))
+        return True
+
+    def get_coils(self, address, number=1, srv_info=None):
+        return self._get(COILS, address, number, True)
+
+    def set_coils(self, address, bit_list, srv_info=None):
+        return self._set(COILS, address, bit_list, srv_info, True)
+
+    def get_discrete_inputs(self, address, number=1, srv_info=None):
+        return self._get(DISCRETE_INPUTS, address, number, True)
+
+    def set_discrete_inputs(self, address, bit_list):
+        return self._set(DISCRETE_INPUTS, address, bit_list, None, True)
+
+    def get_holding_registers(self, address, number=1, srv_info=None):
+        return self._get(HOLDING_REGISTERS, address, number, False)
+
+    def set_holding_registers(self, address, word_list, srv_info=None):
+        return self._set(HOLDING_REGISTERS, address, word_list, srv_info, False)
+
+    def get_input_registers(self, address, number=1, srv_info=None):
+        return self._get(INPUT_REGISTERS, address, number, False)
+
+    def set_input_registers(self, address, word_list):
+        return self._set(INPUT_REGISTERS, address, word_list, None, False)
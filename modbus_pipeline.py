@@ -0,0 +1,251 @@
+import struct
+import asyncio
+import threading
+
+# Pipelined Modbus TCP client of the master. Up to depth requests are in flight
+# on one connection at a time, each with its own MBAP transaction id; a reader
+# task matches the responses back by transaction id, so the link latency is paid
+# once per window instead of once per request. Every request has its own
+# timeout: a lost response only fails that request, a late one is dropped when
+# it arrives. A response is only accepted with the unit id and function code of
+# its request and, for reads, the expected byte count. PipelinedClient wraps
+# the asyncio client in the blocking pyModbusTCP ModbusClient API (None on
+# error) for the engines and dialogs.
+
+MBAP = struct.Struct(">HHHB")
+READ_REQUEST = struct.Struct(">BHH")
+WRITE_MULTIPLE = struct.Struct(">BHHB")
+
+PIPELINE_DEPTH = 8
+REQUEST_TIMEOUT = 3.0
+
+class ModbusError(Exception):
+    """Exception response of the slave, code is the Modbus exception code."""
+
+    def __init__(self, function_code, code):
+        Exception.__init__(self, f"Modbus exception {code} for function code {function_code}")
+        self.function_code = function_code
+        self.code = code
+
+class InvalidResponse(Exception):
+    """Response that does not answer its request: other unit, function code or size."""
+
+def _pack_bits(values):
+    data = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value:
+            data[i // 8] |= 1 << (i % 8)
+    return bytes(data)
+
+def _unpack_bits(data, count):
+    return [bool(data[i // 8] >> (i % 8) & 1) for i in range(count)]
+
+class AsyncModbusClient:
+    """asyncio Modbus TCP client with depth outstanding transactions."""
+
+    def __init__(self, host, port=502, unit_id=1, timeout=REQUEST_TIMEOUT, depth=PIPELINE_DEPTH):
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.timeout = timeout
+        self.depth = depth
+        self.requests = 0
+        self.timeouts = 0
+        self.late = 0
+        self._reader = None
+        self._writer = None
+        self._receiver = None
+        self._pending = {}
+        self._transaction = 0
+        self._slots = None
+        self._connect_lock = None
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        if self._connect_lock is None:
+            self._slots = asyncio.Semaphore(self.depth)
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return
+            self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            self._receiver = asyncio.create_task(self._receive(self._reader))
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self._receiver:
+            self._receiver.cancel()
+            self._receiver = None
+        self._fail_pending(ConnectionError("connection closed"))
+
+    def _next_transaction(self):
+        for _ in range(0x10000):
+            self._transaction = (self._transaction + 1) & 0xFFFF
+            if self._transaction not in self._pending:
+                return self._transaction
+        raise ConnectionError("no free transaction id")
+
+    def _fail_pending(self, error):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _receive(self, reader):
+        try:
+            while True:
+                transaction, _, length, unit_id = MBAP.unpack(await reader.readexactly(MBAP.size))
+                if length < 2:
+                    raise ConnectionError(f"invalid MBAP length {length}")
+                pdu = await reader.readexactly(length - 1)
+                future = self._pending.pop(transaction, None)
+                if future is None or future.done():
+                    self.late += 1  # answer to a request that already timed out
+                else:
+                    future.set_result((unit_id, pdu))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            if self._reader is reader:
+                self._writer = None
+            self._fail_pending(ConnectionError(f"connection lost: {e}"))
+
+    async def request(self, pdu):
+        """Send one PDU and wait for its response PDU, at most timeout seconds."""
+        if self._slots is None:
+            await self.connect()
+        async with self._slots:
+            if not self.connected:
+                await self.connect()
+            transaction = self._next_transaction()
+            future = asyncio.get_running_loop().create_future()
+            self._pending[transaction] = future
+            self._writer.write(MBAP.pack(transaction, 0, len(pdu) + 1, self.unit_id) + pdu)
+            self.requests += 1
+            try:
+                unit_id, response = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self._pending.pop(transaction, None)
+        if unit_id != self.unit_id or response[0] & 0x7F != pdu[0]:
+            raise InvalidResponse(f"Response of unit {unit_id} function code {response[0]} to function code {pdu[0]}")
+        if response[0] & 0x80:
+            if len(response) < 2:
+                raise InvalidResponse(f"Short exception response to function code {pdu[0]}")
+            raise ModbusError(pdu[0], response[1])
+        return response
+
+    async def read_data(self, function_code, address, count, size):
+        """Data bytes of a FC1-4 read, size is the byte count the request asks for."""
+        response = await self.request(READ_REQUEST.pack(function_code, address, count))
+        if len(response) != 2 + size or response[1] != size:
+            raise InvalidResponse(f"Read of {count} values from {address} answered with {len(response) - 1} bytes")
+        return response[2:]
+
+    async def read_bits(self, function_code, address, count):
+        return _unpack_bits(await self.read_data(function_code, address, count, (count + 7) // 8), count)
+
+    async def read_words(self, function_code, address, count):
+        return list(struct.unpack(f">{count}H", await self.read_data(function_code, address, count, 2 * count)))
+
+    async def read(self, function_code, address, count):
+        """FC1-4 read, bits as bools and registers as ints."""
+        if function_code in (1, 2):
+            return await self.read_bits(function_code, address, count)
+        return await self.read_words(function_code, address, count)
+
+    async def write_single_coil(self, address, value):
+        await self.request(READ_REQUEST.pack(5, address, 0xFF00 if value else 0))
+        return True
+
+    async def write_single_register(self, address, value):
+        await self.request(READ_REQUEST.pack(6, address, value))
+        return True
+
+    async def write_multiple_coils(self, address, values):
+        data = _pack_bits(values)
+        await self.request(WRITE_MULTIPLE.pack(15, address, len(values), len(data)) + data)
+        return True
+
+    async def write_multiple_registers(self, address, values):
+        data = struct.pack(f">{len(values)}H", *values)
+        await self.request(WRITE_MULTIPLE.pack(16, address, len(values), len(data)) + data)
+        return True
+
+class PipelinedClient:
+    """Blocking pyModbusTCP-style front end of AsyncModbusClient, the loop runs in its own thread.
+
+    The read/write methods return None when the request fails and keep the error
+    in last_error; submit_read() returns a concurrent future so a caller can
+    put a whole scan on the wire before it waits for the first answer.
+    """
+
+    def __init__(self, host, port=502, unit_id=1, timeout=REQUEST_TIMEOUT, depth=PIPELINE_DEPTH):
+        self.client = AsyncModbusClient(host, port, unit_id, timeout, depth)
+        self.last_error = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def is_open(self):
+        return self.client.connected
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def submit_read(self, function_code, address, count):
+        return self.submit(self.client.read(function_code, address, count))
+
+    def result(self, future):
+        """Result of a submitted request, None if it failed."""
+        try:
+            return future.result()
+        except (ModbusError, InvalidResponse, asyncio.TimeoutError, ConnectionError, OSError) as e:
+            self.last_error = e
+            return None
+
+    def _call(self, coroutine):
+        return self.result(self.submit(coroutine))
+
+    def open(self):
+        self._call(self.client.connect())
+        return self.is_open
+
+    def close(self, timeout=None):
+        """Close the connection, stop the loop and wait for its thread."""
+        if self.loop.is_running():
+            self._call(self.client.close())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        if not self.thread.is_alive() and not self.loop.is_closed():
+            self.loop.close()
+
+    def read_coils(self, bit_addr, bit_nb=1):
+        return self._call(self.client.read_bits(1, bit_addr, bit_nb))
+
+    def read_discrete_inputs(self, bit_addr, bit_nb=1):
+        return self._call(self.client.read_bits(2, bit_addr, bit_nb))
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._call(self.client.read_words(3, reg_addr, reg_nb))
+
+    def read_input_registers(self, reg_addr, reg_nb=1):
+        return self._call(self.client.read_words(4, reg_addr, reg_nb))
+
+    def write_single_coil(self, bit_addr, bit_value):
+        return self._call(self.client.write_single_coil(bit_addr, bit_value))
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._call(self.client.write_single_register(reg_addr, reg_value))
+
+    def write_multiple_coils(self, bits_addr, bits_value):
+        return self._call(self.client.write_multiple_coils(bits_addr, bits_value))
+
+    def write_multiple_registers(self, regs_addr, regs_value):
+        return self._call(self.client.write_multiple_registers(regs_addr, regs_value))
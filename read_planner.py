@@ -0,0 +1,78 @@
+# Read request planner of the Modbus master. The read rows of a sheet are grouped
+# by function code and merged into the fewest legal requests: ranges closer than
+# gap addresses are joined (the gap is read and thrown away) as long as a block
+# stays within MAX_REGISTERS / MAX_BITS. Every signal then takes its value out of
+# the block response, so a dense map costs one round trip per block, not per row.
+
+MAX_REGISTERS = 125
+MAX_BITS = 2000
+GAP_TOLERANCE = 8
+
+BIT_CODES = (1, 2)
+REGISTER_CODES = (3, 4)
+READ_CODES = BIT_CODES + REGISTER_CODES
+
+class ReadBlock:
+    """One read request and the signals served by it.
+
+    A block quacks like a SignalStep (cycle, value, handler), so it can be put
+    on the engine's timer wheel next to the write steps.
+    """
+
+    __slots__ = ('code', 'address', 'count', 'steps', 'offsets', 'cycle', 'value', 'handler')
+
+    def __init__(self, code, address, cycle=None):
+        self.code = code
+        self.address = address
+        self.count = 0
+        self.steps = []
+        self.offsets = []
+        self.cycle = cycle
+        self.value = None
+        self.handler = None
+
+    @property
+    def end(self):
+        return self.address + self.count
+
+    def add(self, step, width):
+        self.steps.append(step)
+        self.offsets.append(step.address - self.address)
+        self.count = max(self.count, step.address + width - self.address)
+
+    def decode(self, data):
+        """Values of the block signals out of the bits / registers of the response."""
+        values = []
+        if self.code in BIT_CODES:
+            for offset in self.offsets:
+                values.append(int(data[offset]))
+            return values
+        for step, offset in zip(self.steps, self.offsets):
+            value = step.codec.decode(data[offset:offset + step.count])
+            if step.codec.is_float:
+                value = round(value,4)
+            values.append(value)
+        return values
+
+def _width(step):
+    return 1 if step.code in BIT_CODES else step.count
+
+def plan_reads(steps, gap=GAP_TOLERANCE, max_registers=MAX_REGISTERS, max_bits=MAX_BITS):
+    """Merge the read steps (FC1-4) into blocks, one list per function code and cycle."""
+    groups = {}
+    for step in steps:
+        if step.code in BIT_CODES or (step.code in REGISTER_CODES and step.codec is not None):
+            groups.setdefault((step.code, step.cycle), []).append(step)
+
+    blocks = []
+    for (code, cycle), group in sorted(groups.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        limit = max_bits if code in BIT_CODES else max_registers
+        block = None
+        for step in sorted(group, key=lambda step: step.address):
+            width = _width(step)
+            if (block is None or step.address - block.end > gap
+                    or step.address + width - block.address > limit):
+                block = ReadBlock(code, step.address, cycle)
+                blocks.append(block)
+            block.add(step, width)
+    return blocks
@@ -0,0 +1,63 @@
+import time
+import threading
+
+# Receive path of the IEC 104 master. The c104 on_receive callbacks only push
+# (timestamp, IOA, value, COT) into a preallocated ring; every consumer (engine
+# log and snapshot writer, GUI) has its own ReceiveCursor and reads at its own
+# pace. Writers (one c104 thread per connection of a redundancy group) take a
+# lock around the push; readers take none: the slot is filled before the head
+# moves on, and list item / int assignments are atomic under the GIL. A
+# consumer that falls more than capacity records behind skips the overwritten
+# ones and counts them as dropped, it never blocks the c104 thread.
+
+RECEIVE_CAPACITY = 65536
+
+class ReceiveBuffer:
+    """Ring of received values, read through cursors."""
+
+    def __init__(self, capacity=RECEIVE_CAPACITY):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0  # records pushed so far, the next slot is head % capacity
+        self._lock = threading.Lock()
+
+    def push(self, ioa, value, cot):
+        record = (time.time(), ioa, value, cot)
+        with self._lock:
+            self.slots[self.head % self.capacity] = record
+            self.head += 1
+
+    def cursor(self, from_start=False):
+        """New reader, by default it only sees records pushed from now on."""
+        return ReceiveCursor(self, 0 if from_start else self.head)
+
+class ReceiveCursor:
+    """Read position of one consumer of a ReceiveBuffer."""
+
+    def __init__(self, buffer, position):
+        self.buffer = buffer
+        self.position = position
+        self.dropped = 0
+
+    def __len__(self):
+        return self.buffer.head - self.position
+
+    def read(self, limit=None):
+        """Records since the last read, oldest first, at most limit of them."""
+        buffer = self.buffer
+        head = buffer.head
+        if head - self.position > buffer.capacity:
+            self.dropped += head - self.position - buffer.capacity
+            self.position = head - buffer.capacity
+        end = head if limit is None else min(head, self.position + limit)
+        slots = buffer.slots
+        capacity = buffer.capacity
+        start = self.position
+        records = [slots[i % capacity] for i in range(start, end)]
+        # the writer may have lapped the oldest slots while they were copied
+        overwritten = buffer.head - capacity - start
+        if overwritten > 0:
+            records = records[overwritten:]
+            self.dropped += overwritten
+        self.position = end
+        return records
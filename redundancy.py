@@ -0,0 +1,203 @@
+import time
+import threading
+import c104
+
+# Redundant IEC 104 connections of the master. Every server of a group gets its
+# own connection opened muted (STOPDT): the active one is unmuted (STARTDT) and
+# interrogated, the standby ones stay muted and only exchange TESTFR. When the
+# active link drops, the first open standby link is unmuted right away and a
+# general interrogation brings the master back in sync. Every switchover is
+# measured: switchover is failure detection to STARTDT on the new link, resync
+# to its first object. Objects are compared with the last ones of the old link:
+# a GI value that differs means a change was lost in between, a spontaneous
+# object that repeats the last value (and time tag) is a duplicate.
+
+def parse_endpoints(text, port=2404):
+    """'ip[:port], ...' to a list of (ip, port)."""
+    endpoints = []
+    for item in str(text).replace(';', ',').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        ip, _, item_port = item.partition(':')
+        endpoints.append((ip.strip(), int(item_port) if item_port else int(port)))
+    return endpoints
+
+class Switchover:
+    """One failover of a redundancy group."""
+
+    __slots__ = ('failed', 'to', 'failed_at', 'switchover_ms', 'resync_ms', 'lost', 'duplicates', 'interrogated')
+
+    def __init__(self, failed, failed_at):
+        self.failed = failed
+        self.to = None
+        self.failed_at = failed_at
+        self.switchover_ms = None
+        self.resync_ms = None
+        self.lost = 0
+        self.duplicates = 0
+        self.interrogated = set()
+
+    def __str__(self):
+        switchover = f"{self.switchover_ms:.1f} ms" if self.switchover_ms is not None else "no standby link"
+        resync = f"{self.resync_ms:.1f} ms" if self.resync_ms is not None else "-"
+        return (f"Switchover from {self.failed} to {self.to}: switchover {switchover}, first object {resync}, "
+                f"lost objects {self.lost}, duplicated objects {self.duplicates}")
+
+class RedundancyGroup:
+    """Primary and backup connections of one c104 client, one of them active."""
+
+    def __init__(self, client, endpoints, asdu=1, log=print, on_state=None, on_receive=None):
+        self.asdu = int(asdu)
+        self.log = log
+        self.on_state = on_state
+        self.on_receive = on_receive
+        self.links = []
+        self.names = []
+        for ip, port in endpoints:
+            connection = client.add_connection(ip=ip, port=int(port), init=c104.Init.MUTED)
+            connection.on_state_change(callable=self._on_state_change)
+            self.links.append((connection, connection.add_station(common_address=self.asdu)))
+            self.names.append(f"{ip}:{port}")
+        self.active = None
+        self.points = {}
+        self.monitored = 0
+        self.switchovers = []
+        self.current = None
+        self._last = {}
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self):
+        return self.links[self.active if self.active is not None else 0][0]
+
+    @property
+    def station(self):
+        return self.links[self.active if self.active is not None else 0][1]
+
+    @property
+    def connected(self):
+        """True while any link of the group is open."""
+        return any(connection.is_connected for connection, _ in self.links)
+
+    def add_point(self, io_address, type, **options):
+        """Add the point to the station of every link, return the primary one."""
+        # the client already created the point on the active link if the GI answer came first
+        points = [station.add_point(io_address=io_address, type=type, **options) or station.get_point(io_address=io_address)
+                  for _, station in self.links]
+        if not options.get('command_mode'):
+            for point in points:
+                point.on_receive(callable=self._on_receive)
+            self.monitored += 1
+        self.points[io_address] = points
+        return points[0]
+
+    def point(self, io_address):
+        """Point of the active link."""
+        return self.points[io_address][self.active if self.active is not None else 0]
+
+    def _index(self, connection):
+        for i, (link, _) in enumerate(self.links):
+            if link is connection:
+                return i
+        return None
+
+    def _on_state_change(self, connection: c104.Connection, state: c104.ConnectionState) -> None:
+        # c104 thread: switch over when the active link drops, activate the first link that opens
+        activate = None
+        mute = False
+        with self._lock:
+            index = self._index(connection)
+            if index == self.active and not connection.is_connected:
+                activate = self._failover(index)
+            elif self.active is None and connection.is_connected:
+                activate = self._select(index)
+            elif index != self.active and state == c104.ConnectionState.OPEN:
+                mute = True  # a standby link never sends monitoring objects
+        # mute, unmute and interrogation wait for the server, the GI answer needs the lock in _on_receive
+        if activate is not None:
+            self._activate(activate)
+        elif mute:
+            connection.mute()
+        if self.on_state:
+            self.on_state(self.connected)
+
+    def _failover(self, failed):
+        """Start measuring a switchover, return the standby link to activate or None."""
+        now = time.perf_counter()
+        self._finish()
+        self.active = None
+        self.current = Switchover(self.names[failed], now)
+        self.log(f"Active link {self.names[failed]} lost")
+        for step in range(1, len(self.links)):
+            index = (failed + step) % len(self.links)
+            if self.links[index][0].is_connected:
+                return self._select(index)
+        self.log("No standby link open, waiting for any link of the group")
+        return None
+
+    def _select(self, index):
+        self.active = index
+        current = self.current
+        if current is not None:
+            current.to = self.names[index]
+        return index
+
+    def _activate(self, index):
+        connection, _ = self.links[index]
+        # on a switchback the old active link may still be unmuted, only one link sends objects
+        for i, (link, _) in enumerate(self.links):
+            if i != index and link.state == c104.ConnectionState.OPEN:
+                link.mute()
+        connection.unmute()
+        with self._lock:
+            current = self.current
+            if current is not None and current.to == self.names[index] and current.switchover_ms is None:
+                current.switchover_ms = (time.perf_counter() - current.failed_at) * 1000
+        self.log(f"Active link {self.names[index]}, {len(self.links) - 1} standby")
+        connection.interrogation(common_address=self.asdu, wait_for_response=False)
+
+    def _finish(self):
+        """Close the measurement of the last switchover."""
+        current, self.current = self.current, None
+        if current is not None:
+            self.switchovers.append(current)
+            self.log(str(current))
+
+    def _on_receive(self, point: c104.Point, previous_info: c104.Information, message: c104.IncomingMessage) -> c104.ResponseState:
+        # c104 thread: compare with the last object of the IOA, then pass the value on
+        ioa = point.io_address
+        key = (point.value, getattr(point, 'recorded_at', None))
+        with self._lock:
+            current = self.current
+            if current is not None and current.to is not None:
+                if current.resync_ms is None:
+                    current.resync_ms = (time.perf_counter() - current.failed_at) * 1000
+                last = self._last.get(ioa)
+                if message.cot == c104.Cot.INTERROGATED_BY_STATION:
+                    if last is not None and last[0] != key[0]:
+                        current.lost += 1
+                    current.interrogated.add(ioa)
+                    if len(current.interrogated) >= self.monitored:
+                        self._finish()
+                elif last == key:
+                    current.duplicates += 1
+            self._last[ioa] = key
+        if self.on_receive:
+            return self.on_receive(point, previous_info, message)
+        return c104.ResponseState.SUCCESS
+
+    def close(self):
+        with self._lock:
+            self._finish()
+
+    def stats(self):
+        if not self.switchovers:
+            return [f"Redundancy group {', '.join(self.names)}: no switchover"]
+        times = sorted(s.switchover_ms for s in self.switchovers if s.switchover_ms is not None)
+        lines = [f"Redundancy group {', '.join(self.names)}: {len(self.switchovers)} switchovers"]
+        if times:
+            lines.append(f"Switchover ms: min {times[0]:.1f}, max {times[-1]:.1f}, "
+                         f"lost objects {sum(s.lost for s in self.switchovers)}, "
+                         f"duplicated objects {sum(s.duplicates for s in self.switchovers)}")
+        return lines
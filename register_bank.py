@@ -0,0 +1,104 @@
+import sys
+import threading
+from array import array
+import numpy as np
+
+# Flat Modbus data model of one device: two bit tables (one byte per bit) and
+# two register tables (array('H')) covering the whole 0..65535 address range.
+# Addresses are protocol addresses (sheet Index - 1). The *_bytes helpers work
+# on the wire format, so a request is served with one slice per table.
+#
+# Every access takes the bank lock, update() applies a whole batch of slices
+# under it, and notify() hands master writes to the on_write callback as
+# on_write(unit, function, table, address, values) right after they are stored.
+
+TABLE_SIZE = 0x10000
+
+COILS = "coils"
+DISCRETE_INPUTS = "discrete_inputs"
+HOLDING_REGISTERS = "holding_registers"
+INPUT_REGISTERS = "input_registers"
+
+_SWAP = sys.byteorder == "little"
+
+class RegisterBank:
+    """Coils, discrete inputs, holding and input registers of one Modbus device."""
+
+    def __init__(self, size=TABLE_SIZE, on_write=None):
+        self.size = size
+        self.coils = bytearray(size)
+        self.discrete_inputs = bytearray(size)
+        self.holding_registers = array('H', bytes(2 * size))
+        self.input_registers = array('H', bytes(2 * size))
+        self.lock = threading.RLock()
+        self.on_write = on_write
+
+    def in_range(self, address, count):
+        return 0 <= address and count >= 0 and address + count <= self.size
+
+    # Python values
+    def get_bits(self, table, address, count=1):
+        with self.lock:
+            return [bool(bit) for bit in getattr(self, table)[address:address + count]]
+
+    def set_bits(self, table, address, values):
+        data = bytes(1 if value else 0 for value in values)
+        with self.lock:
+            getattr(self, table)[address:address + len(data)] = data
+
+    def get_words(self, table, address, count=1):
+        with self.lock:
+            return getattr(self, table)[address:address + count].tolist()
+
+    def set_words(self, table, address, values):
+        words = array('H', values)
+        with self.lock:
+            getattr(self, table)[address:address + len(words)] = words
+
+    def update(self, changes):
+        """Apply (table, address, values) slices as one atomic batch."""
+        with self.lock:
+            for table, address, values in changes:
+                if table in (COILS, DISCRETE_INPUTS):
+                    self.set_bits(table, address, values)
+                else:
+                    self.set_words(table, address, values)
+
+    def notify(self, function, table, address, count, unit=None):
+        """Report a master write of count bits / registers to on_write."""
+        if self.on_write:
+            if table in (COILS, DISCRETE_INPUTS):
+                values = self.get_bits(table, address, count)
+            else:
+                values = self.get_words(table, address, count)
+            self.on_write(unit, function, table, address, values)
+
+    # Wire format
+    def get_bits_bytes(self, table, address, count):
+        """count bits packed LSB first, as in a FC1/FC2 response."""
+        with self.lock:
+            bits = np.frombuffer(getattr(self, table), dtype=np.uint8, count=count, offset=address).copy()
+        return np.packbits(bits, bitorder='little').tobytes()
+
+    def set_bits_bytes(self, table, address, count, data):
+        """Unpack count bits of a FC15 request."""
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count, bitorder='little')
+        with self.lock:
+            getattr(self, table)[address:address + count] = bits.tobytes()
+
+    def get_words_bytes(self, table, address, count):
+        """count registers as big-endian bytes, as in a FC3/FC4 response."""
+        with self.lock:
+            words = getattr(self, table)[address:address + count]
+        if _SWAP:
+            words.byteswap()
+        return words.tobytes()
+
+    def set_words_bytes(self, table, address, data):
+        """Store the big-endian registers of a FC6/FC16 request."""
+        words = array('H')
+        words.frombytes(data)
+        if _SWAP:
+            words.byteswap()
+        with self.lock:
+            getattr(self, table)[address:address + len(words)] = words
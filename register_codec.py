@@ -0,0 +1,226 @@
+import struct
+import numpy as np
+
+# Batch register codec for the six Modbus data types used in the sheets.
+# Values are packed into one uint16 register array laid out in sheet order,
+# 2 registers for the 32bit types and 1 register for the 16bit types.
+
+DATA_TYPES = ["Float","Swapped Float","16bit signed Integer","16bit unsigned Integer","32bit signed Integer","32bit unsigned Integer"]
+
+FLOAT = 0
+UINT32 = 1
+INT32 = 2
+UINT16 = 3
+INT16 = 4
+
+TYPE_CODES = {
+    "Float": FLOAT,
+    "Swapped Float": FLOAT,
+    "32bit unsigned Integer": UINT32,
+    "32bit signed Integer": INT32,
+    "16bit unsigned Integer": UINT16,
+    "16bit signed Integer": INT16,
+}
+
+_RANGES = {
+    UINT32: (0, 0xFFFFFFFF, "Value must be an unsigned 32-bit integer (0 to 4294967295)."),
+    INT32: (-0x80000000, 0x7FFFFFFF, "Value must be a signed 32-bit integer (-2147483648 to 2147483647)."),
+    UINT16: (0, 0xFFFF, "Value must be an unsigned 16-bit integer (0 to 65535)."),
+    INT16: (-0x8000, 0x7FFF, "Value must be a signed 16-bit integer (-32768 to 32767)."),
+}
+
+def _broadcast(column, n):
+    if isinstance(column, (str, bool)) or np.ndim(column) == 0:
+        return [column] * n
+    column = list(column)
+    if len(column) != n:
+        raise ValueError(f"Column length {len(column)} does not match {n} values")
+    return column
+
+def type_codes(types, n=None):
+    """Map the sheet 'Type' column to integer type codes."""
+    if n is None:
+        n = 1 if isinstance(types, str) else len(types)
+    codes = np.empty(n, dtype=np.int8)
+    for i, mtype in enumerate(_broadcast(types, n)):
+        try:
+            codes[i] = TYPE_CODES[mtype]
+        except KeyError:
+            raise ValueError(f"Invalid data type {mtype}") from None
+    return codes
+
+def big_endian_mask(endians, n):
+    """Map the sheet 'Endian' column ('Big'/'Little' or bool) to a bool mask."""
+    mask = np.empty(n, dtype=bool)
+    for i, endian in enumerate(_broadcast(endians, n)):
+        if endian is True or endian == 'Big':
+            mask[i] = True
+        elif endian is False or endian == 'Little':
+            mask[i] = False
+        else:
+            raise ValueError("Invalid Endian Format")
+    return mask
+
+def is_swapped(value):
+    """Parse a 'Swapped' cell: yes / true / 1 (or TRUE, 1.0) set the word swap, anything else or an empty cell does not."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('yes', 'true', '1')
+    return bool(value == 1)  # NaN and None compare unequal
+
+def word_swap_mask(types, swapped, n):
+    """Word swap applies to 'Swapped Float' rows and rows flagged in the optional 'Swapped' column."""
+    mask = np.array([mtype == "Swapped Float" for mtype in _broadcast(types, n)], dtype=bool)
+    if swapped is not None:
+        mask |= np.array([is_swapped(s) for s in _broadcast(swapped, n)], dtype=bool)
+    return mask
+
+def register_counts(codes):
+    """Number of registers used by each type code."""
+    codes = np.asarray(codes)
+    return np.where(codes <= INT32, 2, 1)
+
+def register_offsets(codes):
+    """Start offset of each value inside the packed register array."""
+    counts = register_counts(codes)
+    return np.cumsum(counts) - counts
+
+class RegisterLayout:
+    """Type codes, word order and register offsets of a column of signals, compiled once."""
+
+    def __init__(self, types, endians, swapped=None):
+        n = 1 if isinstance(types, str) else len(types)
+        self.codes = type_codes(types, n)
+        self.counts = register_counts(self.codes)
+        self.offsets = np.cumsum(self.counts) - self.counts
+        self.is_32bit = self.counts == 2
+        self.high_first = (big_endian_mask(endians, n) ^ word_swap_mask(types, swapped, n)) & self.is_32bit
+        self.size = int(self.counts.sum())
+
+    def __len__(self):
+        return len(self.codes)
+
+    def span(self, i):
+        """Slice of signal i inside the packed register array."""
+        start = int(self.offsets[i])
+        return slice(start, start + int(self.counts[i]))
+
+    def encode(self, values):
+        """Encode an array of values into one uint16 register array."""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        codes = self.codes
+        words = np.zeros(len(codes), dtype=np.uint32)
+
+        is_float = codes == FLOAT
+        words[is_float] = values[is_float].astype(np.float32).view(np.uint32)
+
+        for code, (low, high, message) in _RANGES.items():
+            selected = codes == code
+            if not selected.any():
+                continue
+            ints = np.trunc(values[selected])
+            if not ((ints >= low) & (ints <= high)).all():
+                raise ValueError(message)
+            ints = ints.astype(np.int64)
+            if code == INT32:
+                words[selected] = ints.astype(np.int32).view(np.uint32)
+            elif code == INT16:
+                words[selected] = ints.astype(np.int16).view(np.uint16)
+            else:
+                words[selected] = ints
+
+        hi = (words >> 16).astype(np.uint16)
+        lo = (words & 0xFFFF).astype(np.uint16)
+
+        registers = np.empty(self.size, dtype=np.uint16)
+        registers[self.offsets] = np.where(self.high_first, hi, lo)
+        registers[self.offsets[self.is_32bit] + 1] = np.where(self.high_first, lo, hi)[self.is_32bit]
+        return registers
+
+    def decode(self, registers):
+        """Decode a packed register array back into a float64 value array."""
+        registers = np.asarray(registers, dtype=np.uint32)
+        if len(registers) < self.size:
+            raise ValueError(f"Expected {self.size} registers, got {len(registers)}")
+
+        first = registers[self.offsets]
+        second = np.zeros(len(self.codes), dtype=np.uint32)
+        second[self.is_32bit] = registers[self.offsets[self.is_32bit] + 1]
+
+        words = np.where(self.is_32bit,
+                         np.where(self.high_first, (first << 16) | second, (second << 16) | first),
+                         first).astype(np.uint32)
+
+        codes = self.codes
+        values = words.astype(np.float64)
+        is_float = codes == FLOAT
+        values[is_float] = words[is_float].view(np.float32)
+        is_int32 = codes == INT32
+        values[is_int32] = words[is_int32].view(np.int32)
+        is_int16 = codes == INT16
+        values[is_int16] = words[is_int16].astype(np.uint16).view(np.int16)
+        return values
+
+def encode_registers(values, types, endians, swapped=None):
+    """Encode an array of values into one uint16 register array."""
+    return RegisterLayout(types, endians, swapped).encode(values)
+
+def decode_registers(registers, types, endians, swapped=None):
+    """Decode a packed register array back into a float64 value array."""
+    return RegisterLayout(types, endians, swapped).decode(registers)
+
+#***************Precompiled single value codecs**************************
+
+_VALUE_FORMATS = {FLOAT: 'f', UINT32: 'I', INT32: 'i', UINT16: 'H', INT16: 'h'}
+
+class ScalarCodec:
+    """struct based codec for one Type/Endian/Swapped combination."""
+
+    __slots__ = ('mtype', 'code', 'count', 'swap', 'is_float', 'value_struct', 'register_struct')
+
+    def __init__(self, mtype, big_endian, swap):
+        self.mtype = mtype
+        self.code = int(type_codes(mtype)[0])
+        self.count = int(register_counts(self.code))
+        self.swap = swap and self.count == 2
+        self.is_float = self.code == FLOAT
+        order = '>' if big_endian else '<'
+        self.value_struct = struct.Struct(order + _VALUE_FORMATS[self.code])
+        self.register_struct = struct.Struct(order + 'H' * self.count)
+
+    def encode(self, value):
+        """Encode one value (number or entry text) into a register list."""
+        value = float(value) if self.is_float else int(float(value))
+        try:
+            registers = list(self.register_struct.unpack(self.value_struct.pack(value)))
+        except struct.error:
+            raise ValueError(_RANGES[self.code][2]) from None
+        if self.swap:
+            registers.reverse()
+        return registers
+
+    def decode(self, registers):
+        """Decode a register list into one value."""
+        registers = list(registers[:self.count])
+        if len(registers) < self.count:
+            raise ValueError(f"Expected {self.count} registers, got {len(registers)}")
+        if self.swap:
+            registers.reverse()
+        return self.value_struct.unpack(self.register_struct.pack(*registers))[0]
+
+_SCALAR_CODECS = {}
+
+def scalar_codec(mtype, endian, swapped=False):
+    """Cached ScalarCodec for a Type, Endian ('Big'/'Little' or bool) and Swapped flag."""
+    key = (mtype, endian, is_swapped(swapped))
+    codec = _SCALAR_CODECS.get(key)
+    if codec is None:
+        big_endian = big_endian_mask(endian, 1)[0]
+        swap = bool(word_swap_mask(mtype, swapped, 1)[0])
+        codec = _SCALAR_CODECS[key] = ScalarCodec(mtype, big_endian, swap)
+    return codec
+
+def to_python(value, mtype):
+    """Convert one decoded value to the Python type the logs display."""
+    if TYPE_CODES.get(mtype) == FLOAT:
+        return float(value)
+    return int(value)
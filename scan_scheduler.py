@@ -0,0 +1,107 @@
+import time
+
+# Deadline scheduler of the Modbus master polling mode. Every scan class has a
+# fixed period and an absolute deadline; the scheduler always runs the class with
+# the earliest deadline and moves that deadline on by exactly one period, so the
+# scan rate does not drift with the scan time. A scan still running at its next
+# deadline is an overrun: it is counted and the missed scans are skipped.
+# With an executor the scans run on a bounded thread pool and the scheduler only
+# dispatches them, so a slow class delays nothing but its own next scan.
+
+SCAN_CLASS_COLUMN = 'Scan Class'
+SCAN_CLASSES = {"fast": 250, "medium": 1000, "slow": 5000}
+DEFAULT_SCAN_CLASS = "medium"
+
+def scan_class_period(name):
+    """Period in ms of a sheet 'Scan Class' cell, None if it is empty or unknown."""
+    return SCAN_CLASSES.get(str(name).strip().lower())
+
+def scan_class_name(period):
+    for name, class_period in SCAN_CLASSES.items():
+        if class_period == period:
+            return name
+    return f"{period:g} ms"
+
+class ScanClass:
+    __slots__ = ('name', 'period', 'task', 'deadline', 'scans', 'overruns', 'skipped', 'last_ms', 'max_ms', 'future')
+
+    def __init__(self, name, period, task):
+        self.name = name
+        self.period = period
+        self.task = task
+        self.deadline = 0.0
+        self.scans = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.future = None
+
+    def __str__(self):
+        return (f"{self.name}: {self.scans} scans, {self.overruns} overruns, "
+                f"last {self.last_ms:.1f} ms, max {self.max_ms:.1f} ms")
+
+class ScanScheduler:
+    """Earliest-deadline-first runner of periodic scan classes."""
+
+    def __init__(self, clock=time.monotonic, on_overrun=None):
+        self.clock = clock
+        self.on_overrun = on_overrun
+        self.classes = []
+
+    def add(self, name, period_ms, task):
+        scan_class = ScanClass(name, period_ms / 1000, task)
+        self.classes.append(scan_class)
+        return scan_class
+
+    def run(self, running, resolution=0.1, executor=None):
+        """Run the scan classes until running() is false, sleeping at most resolution at a time."""
+        start = self.clock()
+        for scan_class in self.classes:
+            scan_class.deadline = start
+        while self.classes and running():
+            scan_class = min(self.classes, key=lambda scan_class: scan_class.deadline)
+            delay = scan_class.deadline - self.clock()
+            if delay > 0:
+                time.sleep(min(delay, resolution))
+                continue
+
+            if executor is None:
+                self._scan(scan_class)
+            elif scan_class.future is None or scan_class.future.done():
+                scan_class.future = executor.submit(self._scan, scan_class)
+            elif scan_class.period:
+                # the previous scan of this class is still running on the pool
+                self._overrun(scan_class, self.clock())
+                continue
+            else:
+                scan_class.deadline = self.clock()
+                continue
+
+            now = self.clock()
+            if not scan_class.period:
+                # flat out, go to the back of the queue
+                scan_class.deadline = now
+                continue
+            scan_class.deadline += scan_class.period
+            if now > scan_class.deadline:
+                self._overrun(scan_class, now)
+
+    def _scan(self, scan_class):
+        started = self.clock()
+        scan_class.task()
+        scan_class.last_ms = (self.clock() - started) * 1000
+        scan_class.max_ms = max(scan_class.max_ms, scan_class.last_ms)
+        scan_class.scans += 1
+
+    def _overrun(self, scan_class, now):
+        # skip the missed scans, realign on the next deadline still ahead
+        missed = int((now - scan_class.deadline) / scan_class.period) + 1
+        scan_class.overruns += 1
+        scan_class.skipped += missed
+        scan_class.deadline += missed * scan_class.period
+        if self.on_overrun:
+            self.on_overrun(scan_class)
+
+    def stats(self):
+        return [str(scan_class) for scan_class in self.classes]
@@ -0,0 +1,118 @@
+import os
+import pickle
+import hashlib
+import threading
+import pandas as pd
+
+# Compiled on-disk cache of parsed workbook sheets. Each sheet is stored as one
+# pickled dict of column arrays in a per-user cache folder only the user can
+# write to (pickle files run code when loaded, so never next to a workbook that
+# may come from anyone), named after the workbook path, sheet and content hash,
+# so a re-read of an unchanged sheet skips pd.read_excel entirely. Path + mtime
+# + size are remembered in memory to avoid re-hashing the file on every load;
+# memory keeps only the latest version of each path and sheet, the snapshot
+# writer rewrites the workbook every few seconds.
+
+CACHE_DIR = os.path.join(os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+                         or os.path.join(os.path.expanduser("~"), ".cache"), "signal_cache")
+CACHE_VERSION = 1
+
+_memory = {}  # (path, sheet) -> (path, mtime, size), DataFrame
+_hashes = {}  # path -> (path, mtime, size), sha1
+_lock = threading.Lock()
+
+def workbook_path(xls):
+    """Absolute path of a workbook given as a path or a pd.ExcelFile."""
+    if isinstance(xls, pd.ExcelFile):
+        xls = getattr(xls, "io", None) or getattr(xls, "_io")
+    return os.path.abspath(os.fspath(xls))
+
+def file_hash(path):
+    """sha1 of the workbook content."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        known = _hashes.get(path)
+    if known is not None and known[0] == key:
+        return key, known[1]
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    with _lock:
+        _hashes[path] = (key, digest)
+    return key, digest
+
+def cache_prefix(path, sheet_name):
+    """Cache file prefix for one sheet of one workbook."""
+    name = hashlib.sha1(f"{path}|{sheet_name}".encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, name)
+
+def _prune(prefix, keep):
+    folder = os.path.dirname(prefix)
+    stem = os.path.basename(prefix)
+    for entry in os.listdir(folder):
+        candidate = os.path.join(folder, entry)
+        if entry.startswith(stem) and candidate != keep:
+            try:
+                os.remove(candidate)
+            except OSError:
+                pass
+
+def _to_columns(df):
+    return {
+        "version": CACHE_VERSION,
+        "columns": list(df.columns),
+        "data": [df[column].to_numpy() for column in df.columns],
+    }
+
+def _from_columns(payload):
+    df = pd.DataFrame(dict(zip(range(len(payload["columns"])), payload["data"])))
+    df.columns = payload["columns"]
+    return df
+
+def read_sheet(xls, sheet_name=0):
+    """Drop-in for pd.read_excel(xls, sheet_name=...) served from the compiled cache."""
+    path = workbook_path(xls)
+    key, digest = file_hash(path)
+    memory_key = (path, sheet_name)
+
+    with _lock:
+        known = _memory.get(memory_key)
+    if known is not None and known[0] == key:
+        return known[1].copy()
+
+    prefix = cache_prefix(path, sheet_name)
+    target = f"{prefix}_{digest}.pkl"
+    df = None
+    if os.path.exists(target):
+        try:
+            with open(target, "rb") as f:
+                payload = pickle.load(f)
+            if payload.get("version") == CACHE_VERSION:
+                df = _from_columns(payload)
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, ValueError):
+            df = None
+
+    if df is None:
+        df = pd.read_excel(xls, sheet_name=sheet_name)
+        try:
+            os.makedirs(os.path.dirname(target), mode=0o700, exist_ok=True)
+            tmp = target + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(_to_columns(df), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+            _prune(prefix, target)  # drop the caches of older workbook versions
+        except OSError:
+            pass  # read-only folder, keep the in-memory copy only
+
+    with _lock:
+        _memory[memory_key] = (key, df)  # replaces the sheet of an older workbook version
+    return df.copy()
+
+def clear_cache():
+    """Forget the in-memory sheets, the files on disk stay valid until the workbook changes."""
+    with _lock:
+        _memory.clear()
+        _hashes.clear()
@@ -0,0 +1,87 @@
+import pandas as pd
+from register_codec import TYPE_CODES, RegisterLayout, scalar_codec, is_swapped
+from signal_table import Signal, build_table
+from register_bank import COILS, HOLDING_REGISTERS
+
+# A sheet compiled once at load time into a list of steps. Each step carries the
+# precomputed codec (struct.Struct pair, word swap flag, register count) and the
+# handler for its function code, so the update loop never dispatches on strings.
+
+class SignalStep(Signal):
+    __slots__ = ('codec', 'count', 'swap', 'span', 'handler')
+
+    def __init__(self, row, address, code, name, mtype=None, endian=None, value=0, point=None, cycle=None):
+        Signal.__init__(self, row, address, code, name, mtype, endian, value, point, cycle)
+        self.codec = None
+        self.count = 0
+        self.swap = False
+        self.span = None
+        self.handler = None
+
+class SignalPlan:
+    """Compiled signal plan of one IP group of a Modbus sheet."""
+
+    def __init__(self, group, handlers, default=None, values=None, batch_codes=(3, 4), register_codes=(3, 4, 6, 16)):
+        self.steps = []
+        self.invalid = []
+        self.outputs = None
+        batch_steps = []
+        if values is None:
+            values = group['Value'] if 'Value' in group.columns else pd.Series(0, index=group.index)
+        if 'Swapped' in group.columns:
+            swapped_column = group['Swapped'].map(is_swapped)
+        else:
+            swapped_column = pd.Series(False, index=group.index)
+
+        for step in build_table(group, values, 'Index', 'Function Code', 'Name', record=SignalStep):
+            swapped = bool(swapped_column[step.row])
+            if step.code in register_codes:
+                if step.mtype in TYPE_CODES and step.endian in ('Big', 'Little'):
+                    step.codec = scalar_codec(step.mtype, step.endian, swapped)
+                    step.count = step.codec.count
+                    step.swap = step.codec.swap
+                else:
+                    self.invalid.append(step)
+                    continue
+
+            step.handler = handlers.get(step.code, default)
+            self.steps.append(step)
+            if step.code in batch_codes:
+                batch_steps.append((step, swapped))
+
+        # Batched register rows share one packed register array
+        self.batch_steps = [step for step, _ in batch_steps]
+        self.layout = RegisterLayout([step.mtype for step, _ in batch_steps],
+                                     [step.endian for step, _ in batch_steps],
+                                     [swapped for _, swapped in batch_steps])
+        for i, step in enumerate(self.batch_steps):
+            step.span = self.layout.span(i)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def written(self, table, address, count, coil_codes=(5,), register_codes=(6, 16)):
+        """Output steps covering any of count bits / registers of a master write at a protocol address."""
+        if self.outputs is None:
+            self.outputs = {}
+            for step in self.steps:
+                if step.code in coil_codes:
+                    key, width = COILS, 1
+                elif step.code in register_codes:
+                    key, width = HOLDING_REGISTERS, step.count
+                else:
+                    continue
+                for register in range(step.address - 1, step.address - 1 + width):
+                    self.outputs.setdefault((key, register), []).append(step)
+        steps = {}
+        for register in range(address, address + count):
+            for step in self.outputs.get((table, register), ()):
+                steps[id(step)] = step
+        return list(steps.values())
+
+    def batch_values(self):
+        """Current values of the batched register rows, in layout order."""
+        return [step.value for step in self.batch_steps]
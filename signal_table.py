@@ -0,0 +1,68 @@
+import pandas as pd
+
+# Compact point table used by the cyclic update loops. The sheet is turned into
+# a list of __slots__ records once, the loops read and write Signal.value and the
+# values go back into the DataFrame in one column assignment when it is saved.
+# An optional 'Cycle ms' column gives a row its own update period.
+
+CYCLE_COLUMN = 'Cycle ms'
+
+class Signal:
+    """One sheet row, code is the IEC 104 Type ID or the Modbus Function Code."""
+
+    __slots__ = ('row', 'address', 'code', 'name', 'mtype', 'endian', 'value', 'point', 'cycle')
+
+    def __init__(self, row, address, code, name, mtype=None, endian=None, value=0, point=None, cycle=None):
+        self.row = row
+        self.address = address
+        self.code = code
+        self.name = name
+        self.mtype = mtype
+        self.endian = endian
+        self.value = value
+        self.point = point
+        self.cycle = cycle
+
+def _scalar(value, default=None):
+    if pd.isna(value):
+        return default
+    return value.item() if hasattr(value, 'item') else value
+
+def _as_int(value):
+    value = _scalar(value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+def _cycle(value):
+    value = _scalar(value)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+def build_table(group, values, address_column, code_column, name_column, record=Signal):
+    """Build Signal records for the rows of a sheet group, values is the current value column."""
+    table = []
+    columns = list(group.columns)
+    has_type = 'Type' in columns and 'Endian' in columns
+    rows = zip(group.index,
+               group[address_column].to_numpy(),
+               group[code_column].to_numpy(),
+               group[name_column].to_numpy(),
+               values.loc[group.index].to_numpy())
+    types = group['Type'].to_numpy() if has_type else [None] * len(group)
+    endians = group['Endian'].to_numpy() if has_type else [None] * len(group)
+    cycles = group[CYCLE_COLUMN].to_numpy() if CYCLE_COLUMN in columns else [None] * len(group)
+
+    for (row, address, code, name, value), mtype, endian, cycle in zip(rows, types, endians, cycles):
+        table.append(record(row, _as_int(address), _as_int(code), name, mtype, endian, _scalar(value, 0), cycle=_cycle(cycle)))
+    return table
+
+def store_values(df, table, column='UpdatedValue'):
+    """Write the table values back into df in one assignment."""
+    if table:
+        df[column] = df[column].astype(object)
+        df.loc[[signal.row for signal in table], column] = [signal.value for signal in table]
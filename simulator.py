@@ -1,131 +1,28 @@
 
 import c104
 import time
-import random
 import pandas as pd
 import datetime
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk, filedialog
 import threading 
 import subprocess
-from pyModbusTCP.client import ModbusClient
-from pyModbusTCP.server import ModbusServer
-import struct
-
-iec104_type_ids = {
-    1: c104.Type.M_SP_NA_1,
-    13: c104.Type.M_ME_NC_1,
-    30: c104.Type.M_SP_TB_1,
-    36: c104.Type.M_ME_TF_1,
-    45: c104.Type.C_SC_NA_1,
-    50: c104.Type.C_SE_NC_1,
-}
-
-def float_to_registers(value):
-    packed = struct.pack('<f', value)
-    return list(struct.unpack('<HH', packed))
-
-def unsigned_integer_to_register(value): 
-    if value < 0 or value > 0xFFFFFFFF:
-        raise ValueError("Value must be an unsigned 32-bit integer (0 to 4294967295).")
-    packed = struct.pack('<I', value)
-    return list(struct.unpack('<HH', packed))
-
-def signed_integer_to_register(value):
-    if value < -0x80000000 or value > 0x7FFFFFFF:
-        raise ValueError("Value must be a signed 32-bit integer (-2147483648 to 2147483647).")
-    packed = struct.pack('<i', value)
-    return list(struct.unpack('<HH', packed))
-
-def unsigned_16bit_to_register(value):
-    if value < 0 or value > 0xFFFF:
-        raise ValueError("Value must be an unsigned 16-bit integer (0 to 65535).")
-    packed = struct.pack('<H', value)
-    return list(struct.unpack('<H', packed))
-
-def signed_16bit_to_register(value):
-    if value < -0x8000 or value > 0x7FFF:
-        raise ValueError("Value must be a signed 16-bit integer (-32768 to 32767).")
-    packed = struct.pack('<h', value)
-    return list(struct.unpack('<H', packed))
-
-def swap(my_list):
-    my_list[0],my_list[1] = my_list[1], my_list[0]
-    return my_list
-
-#***************Functions for big endian float to register************************** 
-
-def float_to_registers_be(value):
-    packed = struct.pack('>f', value)
-    return list(struct.unpack('>HH', packed))
-
-def unsigned_integer_to_register_be(value):
-    if value < 0 or value > 0xFFFFFFFF:
-        raise ValueError("Value must be an unsigned 32-bit integer (0 to 4294967295).")
-    packed = struct.pack('>I', value)
-    return list(struct.unpack('>HH', packed))
-
-def signed_integer_to_register_be(value):
-    if value < -0x80000000 or value > 0x7FFFFFFF:
-        raise ValueError("Value must be a signed 32-bit integer (-2147483648 to 2147483647).")
-    packed = struct.pack('>i', value)
-    return list(struct.unpack('>HH', packed))
-
-def unsigned_16bit_to_register_be(value):
-    if value < 0 or value > 0xFFFF:
-        raise ValueError("Value must be an unsigned 16-bit integer (0 to 65535).")
-    packed = struct.pack('>H', value)
-    return list(struct.unpack('>H', packed))
-
-def signed_16bit_to_register_be(value):
-    if value < -0x8000 or value > 0x7FFF:
-        raise ValueError("Value must be a signed 16-bit integer (-32768 to 32767).")
-    packed = struct.pack('>h', value)
-    return list(struct.unpack('>H', packed))
-
-#***************Functions for little endian register to float**************************
-
-def registers_to_float(registers):
-    packed = struct.pack('<HH', *registers)
-    return struct.unpack('<f', packed)[0]
-
-def registers_to_unsigned_integer(registers):
-    packed = struct.pack('<HH', *registers)
-    return struct.unpack('<I', packed)[0]
-
-def registers_to_signed_integer(registers):
-    packed = struct.pack('<HH', *registers)
-    return struct.unpack('<i', packed)[0]
-
-def registers_to_unsigned_16bit(registers):
-    packed = struct.pack('<H', registers[0])
-    return struct.unpack('<H', packed)[0]
-
-def registers_to_signed_16bit(registers):
-    packed = struct.pack('<H', registers[0])
-    return struct.unpack('<h', packed)[0]
-
-#***************Functions for big endian register to float**************************
-
-def registers_to_float_be(registers):
-    packed = struct.pack('>HH', *registers)
-    return struct.unpack('>f', packed)[0]
-
-def registers_to_unsigned_integer_be(registers):
-    packed = struct.pack('>HH', *registers)
-    return struct.unpack('>I', packed)[0]
-
-def registers_to_signed_integer_be(registers):
-    packed = struct.pack('>HH', *registers)
-    return struct.unpack('>i', packed)[0]
-
-def registers_to_unsigned_16bit_be(registers):
-    packed = struct.pack('>H', registers[0])
-    return struct.unpack('>H', packed)[0]
-
-def registers_to_signed_16bit_be(registers):
-    packed = struct.pack('>H', registers[0])
-    return struct.unpack('>h', packed)[0]
+from register_codec import TYPE_CODES, scalar_codec
+from signal_table import build_table
+from sheet_cache import read_sheet
+from snapshot_writer import SNAPSHOT_INTERVAL
+from slave_farm import SlaveFarm
+from iec104_transmit import SpontaneousTransmitter
+from command_burst import DEFAULT_WINDOW
+from engine import iec104_type_ids, sheet_ips, CONNECTED, DISCONNECTED, IEC104SlaveEngine, IEC104ClientEngine, ModbusSlaveEngine, ModbusMasterEngine
+from scan_scheduler import SCAN_CLASSES, DEFAULT_SCAN_CLASS, scan_class_name
+from master_pool import MasterPool
+from modbus_pipeline import PIPELINE_DEPTH, REQUEST_TIMEOUT
+from log_pump import LogPump
+from log_store import LogStore, write_report_txt, write_report_xlsx
+
+CONNECTION_POLL_MS = 20  # Tk poll period of the connection events
+LIVE_TABLE_MS = 250  # refresh period of the Modbus master polling table
 
 class IEC104SlaveSingle:
     def __init__(self, master):
@@ -136,8 +33,11 @@ class IEC104SlaveSingle:
         master.geometry("700x720+20+20")
 
         self.server = None
+        self.engine = None
         self.xls = None
-        self.log_data = []
+        self.log_data = LogStore()  # bounded ring, older entries spill to disk
+        self.snapshot_interval = SNAPSHOT_INTERVAL  # seconds between background saves of UpdatedValue
+        self.snapshot_mode = "snapshot"  # or "journal"
         self.signal_data = {}
         self.current_signal_index = 0
 
@@ -154,6 +54,7 @@ class IEC104SlaveSingle:
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.scrollbar.config(command=self.log_text.yview)
+        self.log_pump = LogPump(self.master, self.log_text)  # batched, thread-safe log pane updates
 
         self.upload_button = tk.Button(master, text="Upload Excel File", command=self.upload_excel)
         self.upload_button.pack(pady=10)
@@ -218,33 +119,19 @@ class IEC104SlaveSingle:
 
     def log(self, message):
         """Logs a message to the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.config(state='disabled')
-        self.log_text.see(tk.END)
-        self.master.update()
+        self.log_pump.put(message)
 
-        self.log_data.append({"Timestamp": datetime.datetime.now(), "Message": message})
+        self.log_data.append(message)
 
     def generate_report_txt(self):
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(report_filename, "w") as report_file:
-            report_file.write(f"IEC 104 Simulator Report\n")
-            report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
-            report_file.write(self.log_text.get("1.0", tk.END))
+        write_report_txt(self.log_data, report_filename)
 
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def generate_report_csv(self):
-        df = pd.DataFrame(self.log_data)
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        with pd.ExcelWriter(report_filename, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name="Log", index=False)
-
-            # Customize Excel sheet appearance (optional)
-            workbook = writer.book
-            worksheet = writer.sheets["Log"]
-            worksheet.set_column('A:B', 20)  # Adjust column width as needed
+        write_report_xlsx(self.log_data, report_filename)
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def upload_excel(self):
@@ -264,7 +151,7 @@ class IEC104SlaveSingle:
             messagebox.showwarning("Warning", "Please select a sheet first.")
             return
 
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         unique_ips = df['IP Address'].dropna().unique()
         ip_list = [str(ip).strip() for ip in unique_ips]
 
@@ -282,28 +169,26 @@ class IEC104SlaveSingle:
             return
         self.reset_server()
         self.log(f"Setting up server for {ip_address}")
-        self.server = c104.Server(ip=ip_address, port=int(port))
-        self.station = self.server.add_station(common_address=int(asdu))
-        self.server.start()
+        self.engine = IEC104SlaveEngine(self.xls, selected_sheet, ip_address, port=int(port), asdu=int(asdu), log=self.log,
+                                        snapshot_interval=self.snapshot_interval, snapshot_mode=self.snapshot_mode)
+        self.server = self.engine.start()
+        self.station = self.engine.station
 
-        self.waiting_dots = 0
         self.log(f"Waiting for connection to {ip_address} ")
         self.check_connection()
 
-    def check_connection(self):
-        ip_address = self.ip_combo.get()
-        if self.server.has_active_connections:
-            self.log(f"{self.ip_combo.get()} Connected ")
-            self.choose_processing_mode()
-        else:
-            '''self.waiting_dots = (self.waiting_dots + 1) % 4
-            dots = "." * self.waiting_dots
-            self.log(f"Waiting for connection{dots}")
-            self.master.after(500, self.check_connection)
-            '''
-            self.log(f"Waiting for connection to {ip_address}")
-            time.sleep(2)
-            self.check_connection()
+    def check_connection(self, engine=None):
+        """Follow the connection state fed by the c104 callbacks, never blocks the Tk loop."""
+        engine = engine or self.engine
+        if engine is not self.engine or not engine.running:
+            return  # stopped or replaced by a new connect
+        for state, peer in engine.connection_events():
+            if state == CONNECTED:
+                self.log(f"{self.ip_combo.get()} Connected ")
+                self.choose_processing_mode()
+            elif state == DISCONNECTED:
+                self.log(f"Waiting for connection to {self.ip_combo.get()}")
+        self.master.after(CONNECTION_POLL_MS, self.check_connection, engine)
 
     # To display something in label
     def update_status(self, message):
@@ -347,7 +232,7 @@ class IEC104SlaveSingle:
 
     def process_signals_one_by_one(self):
         selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         grouped = df.groupby('IP Address')
 
         for ip_address, group in grouped:
@@ -384,88 +269,8 @@ class IEC104SlaveSingle:
         self.stop_server()
 
     def process_signals_all_at_once(self):
-        selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
-
-        if 'UpdatedValue' in df.columns :
-            df = df.drop(columns=['UpdatedValue'])
-            df['UpdatedValue'] = df['value']
-        else:
-            df['UpdatedValue'] = df['value']
-
-        grouped = df.groupby('IP Address')
-        
-        for ip_address, group in grouped:
-            if not self.server.is_running or not self.server.has_active_connections :  # Check if stop button was pressed or client disconnects
-                self.log("Processing stopped either server stopped or client disconnected")
-                break
-
-            points={}
-
-            if str(ip_address).strip() == self.ip_combo.get().strip():
-                for _, row in group.iterrows():
-                    if not self.server.is_running or not self.server.has_active_connections :  # Check if stop button was pressed or client disconnects
-                        self.log("Processing stopped either server stopped or client disconnected")
-                        break
-                    if row['Type ID'] in [1,13,30,36,45,50]:
-                        point_type = iec104_type_ids[row['Type ID']]
-                        point = self.station.add_point(io_address=int(row['IOA']), type=point_type, report_ms=0)
-
-                self.log("All points created, Ready for update ")
-
-                self.log(f"Starting Continuous Value Updates for {ip_address}")
-
-                while self.server.is_running:
-                    for _, row in group.iterrows():
-                        if not self.server.is_running or not self.server.has_active_connections :  # Check if stop button was pressed or client disconnects
-                            self.log("Processing stopped either server stopped or client disconnected")
-                            break
-                        ioa = int(row['IOA'])
-                        type_id = row['Type ID']
-                        name = row['Object Text']
-                        point = self.station.get_point(io_address = ioa)
-                        value = df.loc[row.name, 'UpdatedValue'] if pd.notna(df.loc[row.name, 'UpdatedValue']) else 0
-
-                        # Update the value for the point based on its type
-                        if type_id == 45 :
-                            val = point.value
-                            value = bool(val)
-                            self.log(f"Received point IOA : {ioa} : {name} : {value}")
-                            df.loc[row.name, 'UpdatedValue'] = value
-                        elif type_id == 50:
-                            val = point.value
-                            value = round(val,5)
-                            self.log(f"Received point IOA : {ioa} : {name} : {value}")
-                            df.loc[row.name, 'UpdatedValue'] = float(value)
-                        elif type_id in [1,30]:
-                            point.report_ms = 1000
-                            point.value = (bool(value))
-                            self.log(f"Set point IOA : {ioa} : {name} : {bool(value)}")
-                            value = not bool(value)
-                            df.loc[row.name, 'UpdatedValue'] = int(value)
-                        elif type_id in [13,36]:
-                            point.report_ms = 1000
-                            point.value = (float(value))
-                            self.log(f"Set point IOA : {ioa} : {name} : {value} ")
-                            value = random.randint(10,100)
-                            df.loc[row.name, 'UpdatedValue'] = value
-                        else:
-                            self.log(f"Invalid type id {type_id} for IOA {ioa}")
-                        
-                        time.sleep(1.2)
-                        if type_id in [1,13,30,36]:
-                            point.report_ms = 0
-
-                    if not self.server.is_running or not self.server.has_active_connections:
-                        break
-                    df.to_excel(self.xls, sheet_name=selected_sheet, index=False)
-                    self.log("Saved updated values to Excel.")
-                    self.log ("Next set of Update is starting........")
-                    time.sleep(5)  # Sleep for 4 seconds before the next update loop
-
-                if not self.server.is_running or not self.server.has_active_connections :
-                    self.log("Stopped updates for All-at-Once mode.")
-                    break
+        """All-at-Once mode runs the engine's timer wheel in a worker thread, the GUI only shows its log."""
+        threading.Thread(target=self.engine.run, daemon=True).start()
 
     def update_signals(self, ip_address):
         for _, row in self.signal_data[ip_address]:
@@ -502,7 +307,7 @@ class IEC104SlaveSingle:
             messagebox.showwarning("Warning", "Please select a valid IP address.")
             return
 
-        df = pd.read_excel(self.xls, sheet_name=self.sheet_combo.get())
+        df = read_sheet(self.xls, sheet_name=self.sheet_combo.get())
         group = df[df['IP Address'].astype(str).str.strip() == selected_ip]
         if group.empty:
             messagebox.showinfo("Info", f"No signals found for IP : {selected_ip}. and IOA : {ioa_input}")
@@ -698,19 +503,15 @@ class IEC104SlaveSingle:
         numeric_dialog.wait_window()
 
     def set_numeric_value(self, point, name, value_entry):
-        point.report_ms = 1000
         value = float(value_entry.get())
         point.value = value
+        self.engine.transmitter.mark(point)
         self.log(f"Set point IOA : {point.io_address} : {name} : {value}")
-        time.sleep(0.8)
-        point.report_ms = 0
 
     def set_point_value(self, point, name, value):
-        point.report_ms = 1000
         point.value = value
+        self.engine.transmitter.mark(point)
         self.log(f"Set point IOA : {point.io_address} : {name} : {value}")
-        time.sleep(0.8)
-        point.report_ms = 0
    
     def dialog_closed(self):
         """Clear the dialog reference when it is manually closed."""
@@ -722,6 +523,7 @@ class IEC104SlaveSingle:
         """Stop all servers and close the main window."""
         if messagebox.askokcancel("Quit", "Do you want to stop all servers and close the simulator?"):
             self.stop_server()
+            self.log_data.close()
             self.master.destroy()
 
     def stop_server(self):
@@ -731,7 +533,7 @@ class IEC104SlaveSingle:
             self.current_dialog = None  # Clear the reference
 
         if self.server:
-            self.server.stop()
+            self.engine.stop()
             self.log("Server stopped .")
             print("Server stopped.")
             self.report_button_csv['state'] = "normal"
@@ -751,9 +553,10 @@ class IEC104SlaveMultiple:
         self.master.title("IEC 104 Slave Simulator")
         self.master.geometry("700x720+20+20")
 
-        self.servers = []
+        self.engines = []
+        self.transmitter = SpontaneousTransmitter(log=self.log)
         self.file_paths = []
-        self.log_data = []
+        self.log_data = LogStore()
         self.all_points = {}
 
         self.label = tk.Label(master, text=" 104 Mutliple Device Simulator ", font=("Arial", 14))
@@ -773,6 +576,7 @@ class IEC104SlaveMultiple:
 
         # Configure the scrollbar to scroll the Text widget
         self.log_scrollbar.config(command=self.log_text.yview)
+        self.log_pump = LogPump(self.master, self.log_text)
 
         self.upload_button = tk.Button(master, text="Upload Excel File", command=self.upload_excel)
         self.upload_button.pack(pady=10)
@@ -823,33 +627,19 @@ class IEC104SlaveMultiple:
 
     def log(self, message):
         """Logs a message to the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.config(state='disabled')
-        self.log_text.see(tk.END)
-        self.master.update()
+        self.log_pump.put(message)
 
-        self.log_data.append({"Timestamp": datetime.datetime.now(), "Message": message})
+        self.log_data.append(message)
 
     def generate_report_txt(self):
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(report_filename, "w") as report_file:
-            report_file.write(f"IEC 104 Simulator Report\n")
-            report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
-            report_file.write(self.log_text.get("1.0", tk.END))
+        write_report_txt(self.log_data, report_filename)
 
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def generate_report_csv(self):
-        df = pd.DataFrame(self.log_data)
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        with pd.ExcelWriter(report_filename, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name="Log", index=False)
-
-            # Customize Excel sheet appearance (optional)
-            workbook = writer.book
-            worksheet = writer.sheets["Log"]
-            worksheet.set_column('A:B', 20)  # Adjust column width as needed
+        write_report_xlsx(self.log_data, report_filename)
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     # To display something in label
@@ -868,23 +658,20 @@ class IEC104SlaveMultiple:
         threads = []
         port = self.port_entry.get()
         asdu = self.asdu_entry.get()
+        # one transmitter packs the changes of every server
+        self.transmitter.start()
         for file_path in self.file_paths:
-            xls = pd.ExcelFile(file_path)
-            df = pd.read_excel(xls)
-            df = df[df['IP Address'] != '-']
-            grouped = df.groupby('IP Address')
-
-            for ip_address, group in grouped:
+            for ip_address in sheet_ips(file_path):
                 self.log(f"Setting up server for IP: {ip_address}")
-                server = c104.Server(ip=ip_address, port=int(port))
-                station = server.add_station(common_address=int(asdu))
-                server.start()
+                engine = IEC104SlaveEngine(file_path, 0, ip_address, port=int(port), asdu=int(asdu), log=self.log,
+                                           transmitter=self.transmitter)
+                engine.start()
                 time.sleep(1)
 
-                self.servers.append(server)
+                self.engines.append(engine)
 
                 # Create a thread to handle connection and data processing for this server
-                thread = threading.Thread(target=self.handle_server_connection, args=(server, station, group))
+                thread = threading.Thread(target=self.handle_server_connection, args=(engine,))
                 threads.append(thread)
                 thread.start()
 
@@ -900,27 +687,20 @@ class IEC104SlaveMultiple:
         elif mode == "specific_ioa":
             self.process_specific_ioa()
 
-    def handle_server_connection(self, server, station, group):
-        while not server.has_active_connections:
-            self.log(f"Waiting for connection to IP: {server.ip}")
-            time.sleep(3)
-
-        self.log(f"Connected to IP: {server.ip}")
-        points = {}
+    def handle_server_connection(self, engine):
+        if not engine.wait_for_connection():
+            return
 
-        for _, row in group.iterrows():
-            if row['Type ID'] in [1, 13, 30, 36, 45, 50]:
-                point_type = iec104_type_ids[row['Type ID']]
-                point = station.add_point(io_address=int(row['IOA']), type=point_type, report_ms=0)
-                points[row['IOA']] = (point, row['Object Text'])
-            else:
-                self.log(f"Invalid Type ID {row['Type ID']} for IOA {row['IOA']}")
+        self.log(f"Connected to IP: {engine.ip_address}")
+        df, group = engine.load_group()
+        table = engine.create_points(build_table(group, df['UpdatedValue'], 'IOA', 'Type ID', 'Object Text'))
 
         # Collect all points across servers
-        for ioa, (point, name) in points.items():
-            if ioa not in self.all_points:
-                self.all_points[ioa] = []
-            self.all_points[ioa].append((point, name))
+        for signal in table:
+            if signal.point is not None:
+                if signal.address not in self.all_points:
+                    self.all_points[signal.address] = []
+                self.all_points[signal.address].append((signal.point, signal.name))
 
     def update_signals(self):
         mode_dialog = tk.Toplevel(self.master)
@@ -1008,9 +788,6 @@ class IEC104SlaveMultiple:
         label = tk.Label(binary_dialog, text=f"Signal: {name}\nIOA: {ioa}", font=("Arial", 12))
         label.pack(pady=10)
 
-        for point,name in points:
-            point.report_ms = 1000
-
         on_button = tk.Button(binary_dialog, text="  On  ", fg="green", font=("Arial", 10),command=lambda: self.set_point_value(points, bool(1)))
         on_button.pack(side=tk.LEFT, padx=20, pady=10)
 
@@ -1036,9 +813,6 @@ class IEC104SlaveMultiple:
         label = tk.Label(numeric_dialog, text=f"Signal: {name}\nIOA: {ioa}", font=("Arial", 12))
         label.pack(pady=10)
 
-        for point,name in points:
-            point.report_ms = 1000
-
         value_entry = tk.Entry(numeric_dialog, font=("Arial", 12))
         value_entry.pack(pady=5)
 
@@ -1066,6 +840,7 @@ class IEC104SlaveMultiple:
         """Set binary point values for all devices and close dialog."""
         for point, name in points:
             point.value = value
+            self.transmitter.mark(point)
             ip = point.station.server.ip
             self.log(f"IP:{ip} : Set point IOA : {point.io_address} : {name} : {value}")
 
@@ -1073,17 +848,14 @@ class IEC104SlaveMultiple:
         value = float(value_entry.get())
         for point, name in points:
             point.value = value
+            self.transmitter.mark(point)
             ip = point.station.server.ip
             self.log(f"IP:{ip} : Set point IOA : {point.io_address} : {name} : {value}")
 
     def break_loop_b(self, points, binary_dialog):
-        for point, name in points:
-            point.report_ms = 0
         binary_dialog.destroy()
 
     def break_loop_n(self, points, numeric_dialog):
-        for point,name in points:
-            point.report_ms = 0
         numeric_dialog.destroy()
 
     def break_loop_c(self, points, command_dialog):
@@ -1191,6 +963,7 @@ class IEC104SlaveMultiple:
         """Stop all servers and close the main window."""
         if messagebox.askokcancel("Quit", "Do you want to stop all servers and close the simulator?"):
             self.stop_servers()
+            self.log_data.close()
             self.master.destroy()
 
     def stop_servers(self):
@@ -1200,12 +973,13 @@ class IEC104SlaveMultiple:
             self.current_dialog.destroy()
             self.current_dialog = None
 
-        for server in self.servers:
-            server.stop()
+        for engine in self.engines:
+            engine.stop()
             self.log("Server stopped.")
+        self.transmitter.stop()
 
         self.all_points.clear()
-        self.servers.clear()
+        self.engines.clear()
         self.report_button_csv['state'] = "normal"
         self.report_button_text['state'] = "normal"
 
@@ -1213,7 +987,7 @@ class IEC104SlaveMultiple:
         self.stop_servers()
         self.server_running = True
         self.all_points = {}  # Reset points dictionary
-        self.servers = []
+        self.engines = []
 
 class IEC104client:
     def __init__(self, master):
@@ -1224,8 +998,11 @@ class IEC104client:
         master.geometry("700x720+20+20")
 
         self.client = None
+        self.engine = None
         self.xls = None
-        self.log_data = []
+        self.log_data = LogStore()
+        self.snapshot_interval = SNAPSHOT_INTERVAL  # seconds between background saves of UpdatedValue
+        self.snapshot_mode = "snapshot"  # or "journal"
         self.signal_data = {}
         self.current_signal_index = 0
 
@@ -1242,6 +1019,7 @@ class IEC104client:
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.scrollbar.config(command=self.log_text.yview)
+        self.log_pump = LogPump(self.master, self.log_text)
 
         self.upload_button = tk.Button(master, text="Upload Excel File", command=self.upload_excel)
         self.upload_button.pack(pady=10)
@@ -1284,6 +1062,16 @@ class IEC104client:
         self.asdu_entry.insert(0,1)
         self.asdu_entry.pack(side=tk.LEFT, padx=(10, 0))
 
+        # optional backup servers, the selected IP and these form one redundancy group
+        self.backup_frame = tk.Frame(master)
+        self.backup_frame.pack(padx=20, pady=(0, 10))
+
+        self.backup_label = tk.Label(self.backup_frame, text="Backup IPs (ip[:port], ...) :", font=("Arial", 10))
+        self.backup_label.pack(side=tk.LEFT)
+
+        self.backup_entry = tk.Entry(self.backup_frame, font=("Arial", 10), width = 40, relief="sunken")
+        self.backup_entry.pack(side=tk.LEFT, padx=(10, 0))
+
         self.connect_button = tk.Button(master, text="Connect", command=self.connect)
         self.connect_button.pack(pady=10)
 
@@ -1306,33 +1094,19 @@ class IEC104client:
 
     def log(self, message):
         """Logs a message to the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.config(state='disabled')
-        self.log_text.see(tk.END)
-        self.master.update()
+        self.log_pump.put(message)
 
-        self.log_data.append({"Timestamp": datetime.datetime.now(), "Message": message})
+        self.log_data.append(message)
 
     def generate_report_txt(self):
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(report_filename, "w") as report_file:
-            report_file.write(f"IEC 104 Simulator Report\n")
-            report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
-            report_file.write(self.log_text.get("1.0", tk.END))
+        write_report_txt(self.log_data, report_filename)
 
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def generate_report_csv(self):
-        df = pd.DataFrame(self.log_data)
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        with pd.ExcelWriter(report_filename, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name="Log", index=False)
-
-            # Customize Excel sheet appearance (optional)
-            workbook = writer.book
-            worksheet = writer.sheets["Log"]
-            worksheet.set_column('A:B', 20)  # Adjust column width as needed
+        write_report_xlsx(self.log_data, report_filename)
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def upload_excel(self):
@@ -1352,7 +1126,7 @@ class IEC104client:
             messagebox.showwarning("Warning", "Please select a sheet first.")
             return
 
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         unique_ips = df['IP Address'].dropna().unique()
         ip_list = [str(ip).strip() for ip in unique_ips]
 
@@ -1369,30 +1143,30 @@ class IEC104client:
             messagebox.showwarning("Warning", "Please select a sheet and IP address.")
             return
         self.reset_client()
-        self.log(f"Setting up client for {ip_address}")
-        self.client = c104.Client()
-        self.connection = self.client.add_connection(ip=ip_address, port=int(port), init=c104.Init.ALL)
-        self.station = self.connection.add_station(common_address=int(asdu))
-        self.client.start()
+        backups = self.backup_entry.get().strip()
+        self.log(f"Setting up client for {ip_address}" + (f", backups {backups}" if backups else ""))
+        self.engine = IEC104ClientEngine(self.xls, selected_sheet, ip_address, port=int(port), asdu=int(asdu), log=self.log,
+                                         snapshot_interval=self.snapshot_interval, snapshot_mode=self.snapshot_mode,
+                                         backups=backups or None)
+        self.client = self.engine.start()
+        self.connection = self.engine.connection
+        self.station = self.engine.station
 
-        self.waiting_dots = 0
         self.log(f"Waiting for connection to {ip_address} ")
         self.check_connection()
 
-    def check_connection(self):
-        ip_address = self.ip_combo.get()
-        if self.client.has_active_connections:
-            self.log(f"{self.ip_combo.get()} Connected ")
-            self.choose_processing_mode()
-        else:
-            '''self.waiting_dots = (self.waiting_dots + 1) % 4
-            dots = "." * self.waiting_dots
-            self.log(f"Waiting for connection{dots}")
-            self.master.after(500, self.check_connection)
-            '''
-            self.log(f"Waiting for connection to {ip_address}")
-            time.sleep(2)
-            self.check_connection()
+    def check_connection(self, engine=None):
+        """Follow the connection state fed by the c104 callbacks, never blocks the Tk loop."""
+        engine = engine or self.engine
+        if engine is not self.engine or not engine.running:
+            return  # stopped or replaced by a new connect
+        for state, peer in engine.connection_events():
+            if state == CONNECTED:
+                self.log(f"{self.ip_combo.get()} Connected ")
+                self.choose_processing_mode()
+            elif state == DISCONNECTED:
+                self.log(f"Waiting for connection to {self.ip_combo.get()}")
+        self.master.after(CONNECTION_POLL_MS, self.check_connection, engine)
 
     # To display something in label
     def update_status(self, message):
@@ -1403,7 +1177,7 @@ class IEC104client:
         mode_dialog = tk.Toplevel(self.master)
         mode_dialog.title("Select Processing Mode")
 
-        mode_dialog.geometry("300x200+100+300")
+        mode_dialog.geometry("300x250+100+300")
 
         self.selected_mode = tk.StringVar(value="one")
 
@@ -1416,6 +1190,9 @@ class IEC104client:
         specific_ioa_radio = tk.Radiobutton(mode_dialog, text="Specific IOA", variable=self.selected_mode, value="specific_ioa", font=("Arial", 12))
         specific_ioa_radio.pack(pady=10)
 
+        burst_radio = tk.Radiobutton(mode_dialog, text="Command Burst", variable=self.selected_mode, value="burst", font=("Arial", 12))
+        burst_radio.pack(pady=10)
+
         confirm_button = tk.Button(mode_dialog, text="Confirm", command=lambda: self.process_selected_mode(mode_dialog))
         confirm_button.pack(pady=10)
 
@@ -1433,12 +1210,21 @@ class IEC104client:
             self.process_signals_one_by_one()
         elif self.mode== "all":
             self.process_signals_all_at_once()
+        elif self.mode== "burst":
+            self.process_command_burst()
         else:
             messagebox.showerror("Error", "Invalid mode selected")
 
+    def process_command_burst(self):
+        """Command burst runs in a worker thread, the latency report ends up in the log."""
+        rounds = simpledialog.askinteger("Command Burst", "Rounds over all command IOAs:", minvalue=1, initialvalue=10)
+        window = simpledialog.askinteger("Command Burst", "Commands in flight:", minvalue=1, initialvalue=DEFAULT_WINDOW)
+        if rounds and window:
+            threading.Thread(target=self.engine.burst, args=(rounds, window), daemon=True).start()
+
     def process_signals_one_by_one(self):
         selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         grouped = df.groupby('IP Address')
 
         for ip_address, group in grouped:
@@ -1473,84 +1259,8 @@ class IEC104client:
         self.stop_client()
 
     def process_signals_all_at_once(self):
-        selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
-
-        if 'UpdatedValue' in df.columns :
-            df = df.drop(columns=['UpdatedValue'])
-            df['UpdatedValue'] = df['value']
-        else:
-            df['UpdatedValue'] = df['value']
-
-        grouped = df.groupby('IP Address')
-        
-        for ip_address, group in grouped:
-            if not self.client.is_running or not self.client.has_active_connections :  # Check if stop button was pressed or client disconnects
-                self.log("Processing stopped either client stopped or client disconnected")
-                break
-
-            points={}
-
-            if str(ip_address).strip() == self.ip_combo.get().strip():
-                for _, row in group.iterrows():
-                    if not self.client.is_running or not self.client.has_active_connections :  # Check if stop button was pressed or client disconnects
-                        self.log("Processing stopped either client stopped or client disconnected")
-                        break
-                    point_type = iec104_type_ids[row['Type ID']]
-                    if row['Type ID'] in [1,13,30,36]:
-                        self.station.add_point(io_address=int(row['IOA']), type=point_type)
-                    elif row['Type ID'] in [45,50] :
-                        self.station.add_point(io_address=int(row['IOA']), type=point_type, command_mode = c104.CommandMode.SELECT_AND_EXECUTE)
-                self.log("All points created, Ready for update ")
-
-                self.log(f"Starting Continuous Value Updates for {ip_address}")
-
-                while self.client.is_running:
-                    for _, row in group.iterrows():
-                        if not self.client.is_running or not self.client.has_active_connections :  # Check if stop button was pressed or client disconnects
-                            self.log("Processing stopped either client stopped or client disconnected")
-                            break
-                        ioa = int(row['IOA'])
-                        type_id = row['Type ID']
-                        name = row['Object Text']
-                        point = self.station.get_point(io_address = ioa)
-                        value = df.loc[row.name, 'UpdatedValue'] if pd.notna(df.loc[row.name, 'UpdatedValue']) else 0
-
-                        if type_id == 45 :
-                            point.value = (bool(value))
-                            point.transmit(cause=c104.Cot.ACTIVATION)
-                            self.log(f"Set point IOA : {ioa} : {name} : {bool(value)}")
-                            value = not bool(value)
-                            df.loc[row.name, 'UpdatedValue'] = int(value)
-                        elif type_id == 50:
-                            point.value = (float(value))
-                            point.transmit(cause=c104.Cot.ACTIVATION)
-                            self.log(f"Set point IOA : {ioa} : {name} : {value} ")
-                            value = random.randint(10,100)
-                            df.loc[row.name, 'UpdatedValue'] = value
-                        elif type_id in [1,30]:
-                            value = point.value
-                            self.log(f"Received point IOA : {ioa} : {name} : {value}")
-                            df.loc[row.name, 'UpdatedValue'] = value
-                        elif type_id in [13,36]:
-                            val = point.value
-                            value = round(val,5)
-                            self.log(f"Received point IOA : {ioa} : {name} : {value}")
-                            df.loc[row.name, 'UpdatedValue'] = float(value)
-                        else:
-                            self.log(f"Invalid type id {type_id} for IOA {ioa}") 
-                        
-                        time.sleep(2)
-                    if not self.client.is_running or not self.client.has_active_connections:
-                        break
-                    df.to_excel(self.xls, sheet_name=selected_sheet, index=False)
-                    self.log("Saved updated values to Excel.")
-                    self.log ("Next set of Update is starting........")
-                    time.sleep(5)  # Sleep for 4 seconds before the next update loop
-
-                if not self.client.is_running or not self.client.has_active_connections :
-                    self.log("Stopped updates for All-at-Once mode.")
-                    break
+        """All-at-Once mode runs the engine's timer wheel in a worker thread, the GUI only shows its log."""
+        threading.Thread(target=self.engine.run, daemon=True).start()
 
     def update_signals(self, ip_address):
         for _, row in self.signal_data[ip_address]:
@@ -1587,7 +1297,7 @@ class IEC104client:
             messagebox.showwarning("Warning", "Please select a valid IP address.")
             return
 
-        df = pd.read_excel(self.xls, sheet_name=self.sheet_combo.get())
+        df = read_sheet(self.xls, sheet_name=self.sheet_combo.get())
         group = df[df['IP Address'].astype(str).str.strip() == selected_ip]
         if group.empty:
             messagebox.showinfo("Info", f"No signals found for IP : {selected_ip}. and IOA : {ioa_input}")
@@ -1783,6 +1493,7 @@ class IEC104client:
         """Stop all clients and close the main window."""
         if messagebox.askokcancel("Quit", "Do you want to stop all clients and close the simulator?"):
             self.stop_client()
+            self.log_data.close()
             self.master.destroy()
 
     def stop_client(self):
@@ -1792,7 +1503,7 @@ class IEC104client:
             self.current_dialog = None  # Clear the reference
 
         if self.client:
-            self.client.stop()
+            self.engine.stop()
             self.log("client stopped .")
             print("client stopped.")
             self.report_button_csv['state'] = "normal"
@@ -1807,10 +1518,11 @@ class Mbus_Master_Simulator:
     def __init__(self,master):
         self.master = master 
         self.client = None
+        self.engine = None
         self.current_dialog = None
         self.client_running = True
         self.signal_data = {}
-        self.log_data = []
+        self.log_data = LogStore()
         self.current_signal_index = 0
 
         master.title("Modbus Master Simulator")
@@ -1864,6 +1576,7 @@ class Mbus_Master_Simulator:
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.scrollbar.config(command=self.log_text.yview)
+        self.log_pump = LogPump(self.master, self.log_text)
 
         self.clear_button = tk.Button(self.log_frame, text="Clear Log", command=self.clear_log) 
         self.clear_button.pack(side = "bottom", pady = 10)
@@ -1887,6 +1600,20 @@ class Mbus_Master_Simulator:
         self.update_button = tk.Button(self.master, text="Update Values" , state= 'disabled',  command=self.process_data)
         self.update_button.pack(pady=10)
 
+        self.read_all_button = tk.Button(self.master, text="Read All" , state= 'disabled',  command=self.read_all)
+        self.read_all_button.pack(pady=5)
+
+        self.write_all_button = tk.Button(self.master, text="Write All" , state= 'disabled',  command=self.write_all)
+        self.write_all_button.pack(pady=5)
+
+        self.poll_button = tk.Button(self.master, text="Start Polling" , state= 'disabled',  command=self.start_polling)
+        self.poll_button.pack(pady=5)
+        self.poll_window = None
+
+        self.pool_button = tk.Button(self.master, text="Poll All Slaves", command=self.poll_all_slaves)
+        self.pool_button.pack(pady=5)
+        self.pool = None
+
         self.stop_button = tk.Button(self.master, text="STOP", fg="red", command=self.stop_client)
         self.stop_button.pack(pady=10)
 
@@ -1903,41 +1630,25 @@ class Mbus_Master_Simulator:
         
     def log(self, message):
         """Logs a message to the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.config(state='disabled')
-        self.log_text.see(tk.END)
-        self.master.update()
+        self.log_pump.put(message)
 
-        self.log_data.append({"Timestamp": datetime.datetime.now(), "Message": message})
+        self.log_data.append(message)
 
     def generate_report_txt(self):
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(report_filename, "w") as report_file:
-            report_file.write(f"IEC 104 Simulator Report\n")
-            report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
-            report_file.write(self.log_text.get("1.0", tk.END))
+        write_report_txt(self.log_data, report_filename)
 
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def generate_report_csv(self):
-        df = pd.DataFrame(self.log_data)
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        with pd.ExcelWriter(report_filename, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name="Log", index=False)
-
-            # Customize Excel sheet appearance (optional)
-            workbook = writer.book
-            worksheet = writer.sheets["Log"]
-            worksheet.set_column('A:B', 20)  # Adjust column width as needed
+        write_report_xlsx(self.log_data, report_filename)
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
 
     def clear_log(self):
         """Clears the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.delete('1.0', tk.END)
-        self.log_text.config(state='disabled')
+        self.log_pump.clear()
 
     def upload_excel(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
@@ -1958,7 +1669,9 @@ class Mbus_Master_Simulator:
             self.log("Invalid IP address format")
         else:
             self.reset_client()
-            self.client = ModbusClient(ip, port, slave_id,timeout = 30, auto_open=True, auto_close= False)
+            self.engine = ModbusMasterEngine(self.xls, self.sheet_combo.get(), ip, port=port, unit=slave_id,
+                                             timeout=REQUEST_TIMEOUT, depth=PIPELINE_DEPTH, log=self.log)
+            self.client = self.engine.start()
             self.log("Modbus Master is started....")
             self.validate_connection()
 
@@ -1978,6 +1691,9 @@ class Mbus_Master_Simulator:
             self.connect_button['state'] = "disabled"
             self.disconnect_button['state'] = "normal"
             self.update_button['state'] = "normal"
+            self.read_all_button['state'] = "normal"
+            self.write_all_button['state'] = "normal"
+            self.poll_button['state'] = "normal"
 
         else:
             self.log(f"Waiting for connection to IP: {self.ip_entry.get()}")
@@ -1986,7 +1702,7 @@ class Mbus_Master_Simulator:
 
     def process_data(self):
         selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         grouped = df.groupby('IP Address')
 
         for ip_address, group in grouped:
@@ -2000,6 +1716,102 @@ class Mbus_Master_Simulator:
         self.log("All points Updated")
         time.sleep(3)
         self.stop_client()
+
+    def read_all(self):
+        """Read every input row of the sheet with coalesced block requests."""
+        try:
+            steps = self.engine.read_all()
+        except Exception as e:
+            self.log(f"Error {str(e)}")
+            return
+        for step in steps:
+            self.log(f"Read FC{step.code} Index : {step.address} : {step.name} : {step.value}")
+
+    def write_all(self):
+        """Download the Value of every output row of the sheet in batched frames."""
+        try:
+            self.engine.write_all()
+        except Exception as e:
+            self.log(f"Error {str(e)}")
+
+    def start_polling(self):
+        """Scan the sheet continuously by scan class and show the values in a live table."""
+        if self.poll_window:
+            self.poll_window.lift()
+            return
+        try:
+            df, plan, blocks = self.engine.compile()
+        except Exception as e:
+            self.log(f"Error {str(e)}")
+            return
+
+        self.poll_window = tk.Toplevel(self.master)
+        self.poll_window.title("Polling")
+        self.poll_window.geometry("700x500+600+100")
+        self.poll_window.protocol("WM_DELETE_WINDOW", self.stop_polling)
+
+        columns = ("Index", "FC", "Name", "Scan", "Value")
+        self.poll_tree = ttk.Treeview(self.poll_window, columns=columns, show="headings")
+        for column in columns:
+            self.poll_tree.heading(column, text=column)
+            self.poll_tree.column(column, width=260 if column == "Name" else 80, anchor=tk.W)
+        poll_scrollbar = tk.Scrollbar(self.poll_window, command=self.poll_tree.yview)
+        self.poll_tree.configure(yscrollcommand=poll_scrollbar.set)
+        self.poll_status = tk.Label(self.poll_window, text="", font=("Arial", 9), justify=tk.LEFT, anchor=tk.W)
+        self.poll_status.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=5)
+        tk.Button(self.poll_window, text="Stop Polling", fg="red", command=self.stop_polling).pack(side=tk.BOTTOM, pady=5)
+        poll_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.poll_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.poll_rows = []
+        for block in blocks:
+            scan = scan_class_name(block.cycle or SCAN_CLASSES[DEFAULT_SCAN_CLASS])
+            for step in block.steps:
+                item = self.poll_tree.insert("", tk.END, values=(step.address, step.code, step.name, scan, step.value))
+                self.poll_rows.append((item, step, step.value))
+
+        threading.Thread(target=self.engine.poll, args=(blocks,), daemon=True).start()
+        self.poll_button['state'] = "disabled"
+        self.refresh_poll_table()
+
+    def refresh_poll_table(self):
+        """Copy the changed values into the live table, Tk thread only."""
+        if not self.poll_window:
+            return
+        rows = []
+        for item, step, shown in self.poll_rows:
+            value = step.value
+            if value != shown:
+                self.poll_tree.set(item, "Value", value)
+            rows.append((item, step, value))
+        self.poll_rows = rows
+        if self.engine.scheduler:
+            self.poll_status.config(text="\n".join(self.engine.scheduler.stats()))
+        self.master.after(LIVE_TABLE_MS, self.refresh_poll_table)
+
+    def stop_polling(self):
+        if self.engine:
+            self.engine.stop_polling()
+        if self.poll_window:
+            self.poll_window.destroy()
+            self.poll_window = None
+        self.poll_button['state'] = "normal" if self.client else "disabled"
+
+    def poll_all_slaves(self):
+        """Poll every IP / port / unit id of the sheet concurrently from one connection pool."""
+        if self.pool:
+            return
+        try:
+            self.pool = MasterPool(self.xls, self.sheet_combo.get(), port=int(self.port_entry.get()),
+                                   unit=int(self.slave_id_entry.get()), depth=PIPELINE_DEPTH, log=self.log)
+            self.pool.start()
+        except Exception as e:
+            self.log(f"Error {str(e)}")
+            self.pool = None
+            return
+        threading.Thread(target=self.pool.run, daemon=True).start()
+        self.pool_button['state'] = "disabled"
+
     
     def process_signals_for_ip(self,ip_address):
         for _, row in self.signal_data[ip_address]:
@@ -2183,50 +1995,18 @@ class Mbus_Master_Simulator:
         big_endian_c = self.big_endian_c_mode.get()
         dt_c  = self.selected_dt_c.get()
 
-        if dt_c == "Float":
-            if big_endian_c:
-                value = registers_to_float_be(registers)
-            else:
-                value = registers_to_float(registers)
-            value = round(value,4)
-            self.log(f"Read holding register {address}:  float value {value}")
-
-        elif dt_c == "Swapped Float":
-            registers_new = swap(registers)
-            if big_endian_c:
-                value = registers_to_float_be(registers_new)
-            else:
-                value = registers_to_float(registers_new)
+        if dt_c not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt_c, big_endian_c)
+        try:
+            value = codec.decode(registers)
+        except (ValueError, TypeError) as e:
+            self.log(f"Error {str(e)}")
+            return
+        if codec.is_float:
             value = round(value,4)
-            self.log(f"Read holding register {address} : swapped float value {value}")
-
-        elif dt_c == "32bit unsigned Integer":
-            if big_endian_c:
-                value = registers_to_unsigned_integer_be(registers)
-            else:
-                value = registers_to_unsigned_integer(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "32bit signed Integer":
-            if big_endian_c:
-                value = registers_to_signed_integer_be(registers)
-            else:
-                value = registers_to_signed_integer(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "16bit unsigned Integer":
-            if big_endian_c:
-                value = registers_to_unsigned_16bit_be(registers)
-            else:
-                value = registers_to_unsigned_16bit(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "16bit signed Integer":
-            if big_endian_c:
-                value = registers_to_signed_16bit_be(registers)
-            else:
-                value = registers_to_signed_16bit(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
+        self.log(f"Read holding register {address}: {dt_c} value {value}")
 
         self.display_text_c.delete('1.0',tk.END)
         self.display_text_c.insert('1.0', f"{value}")
@@ -2277,50 +2057,18 @@ class Mbus_Master_Simulator:
         big_endian_c = self.big_endian_c_mode.get()
         dt_c  = self.selected_dt_c.get()
 
-        if dt_c == "Float":
-            if big_endian_c:
-                value = registers_to_float_be(registers)
-            else:
-                value = registers_to_float(registers)
-            value = round(value,4)
-            self.log(f"Read holding register {address}:  float value {value}")
-
-        elif dt_c == "Swapped Float":
-            registers_new = swap(registers)
-            if big_endian_c:
-                value = registers_to_float_be(registers_new)
-            else:
-                value = registers_to_float(registers_new)
+        if dt_c not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt_c, big_endian_c)
+        try:
+            value = codec.decode(registers)
+        except (ValueError, TypeError) as e:
+            self.log(f"Error {str(e)}")
+            return
+        if codec.is_float:
             value = round(value,4)
-            self.log(f"Read holding register {address} : swapped float value {value}")
-
-        elif dt_c == "32bit unsigned Integer":
-            if big_endian_c:
-                value = registers_to_unsigned_integer_be(registers)
-            else:
-                value = registers_to_unsigned_integer(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "32bit signed Integer":
-            if big_endian_c:
-                value = registers_to_signed_integer_be(registers)
-            else:
-                value = registers_to_signed_integer(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "16bit unsigned Integer":
-            if big_endian_c:
-                value = registers_to_unsigned_16bit_be(registers)
-            else:
-                value = registers_to_unsigned_16bit(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "16bit signed Integer":
-            if big_endian_c:
-                value = registers_to_signed_16bit_be(registers)
-            else:
-                value = registers_to_signed_16bit(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
+        self.log(f"Read holding register {address}: {dt_c} value {value}")
 
         self.display_text_c.delete('1.0',tk.END)
         self.display_text_c.insert('1.0', f"{value}")
@@ -2361,7 +2109,7 @@ class Mbus_Master_Simulator:
 
     def set_bool_value(self, address, value, dialog=None):
         value_di = [bool(int(value))]
-        self.client.write_single_coil(address, value_di[0])
+        self.engine.writes.write_coil(address, value_di[0])
         self.log(f"Set Coil status at  Index : {address} , with value {value_di}")
 
     def break_loop_bb(self, binary_dialog):
@@ -2408,84 +2156,18 @@ class Mbus_Master_Simulator:
         big_endian = self.big_endian_mode.get()
         dt  = self.selected_dt.get()
         value = value_entry.get()
-        if dt == "Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            self.client.write_single_register( address  , registers[0])
-            self.log(f"Updated holding register {address} with float value {value}")
-
-        elif dt == "Swapped Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            registers_new = swap(registers)
-            self.client.write_single_register( address  , registers_new[0])
-            self.log(f"Updated holding register {address} with swapped float value {value}")
-
-        elif dt == "32bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_single_register(address, registers[0])
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "32bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_single_register(address, registers[0])
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
-
-        elif dt == "16bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_single_register(address, registers[0])
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "16bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_single_register(address, registers[0])
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
+        if dt not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt, big_endian)
+        try:
+            registers = codec.encode(value)
+        except ValueError as e:
+            self.log(f"Error {str(e)}")
+            return
+        # queue every register, a 32-bit value used to lose its second word here
+        self.engine.writes.write_registers(address, registers)
+        self.log(f"Updated holding register {address} with {dt} value {value}")
 
     def break_loop_aa(self, numeric_dialog):
         numeric_dialog.destroy()
@@ -2531,84 +2213,17 @@ class Mbus_Master_Simulator:
         big_endian = self.big_endian_mode.get()
         dt  = self.selected_dt.get()
         value = value_entry.get()
-        if dt == "Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            self.client.write_multiple_registers( address  , registers)
-            self.log(f"Updated holding register {address} with float value {value}")
-
-        elif dt == "Swapped Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            registers_new = swap(registers)
-            self.client.write_multiple_registers( address  , registers_new)
-            self.log(f"Updated holding register {address} with swapped float value {value}")
-
-        elif dt == "32bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_multiple_registers(address, registers)
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "32bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_multiple_registers(address, registers)
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
-
-        elif dt == "16bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_multiple_registers(address, registers)
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "16bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.client.write_multiple_registers(address, registers)
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
+        if dt not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt, big_endian)
+        try:
+            registers = codec.encode(value)
+        except ValueError as e:
+            self.log(f"Error {str(e)}")
+            return
+        self.engine.writes.write_registers(address, registers)
+        self.log(f"Updated holding register {address} with {dt} value {value}")
 
     def break_loop_aa_m(self, numeric_dialog_m):
         numeric_dialog_m.destroy()
@@ -2622,6 +2237,7 @@ class Mbus_Master_Simulator:
     def close_simulator(self):
         if messagebox.askokcancel("Quit", "Do you want to stop all servers and close the simulator?"):
             self.stop_client()
+            self.log_data.close()
             self.master.destroy()
     
     def stop_client(self):
@@ -2630,8 +2246,13 @@ class Mbus_Master_Simulator:
             self.current_dialog.destroy()
             self.current_dialog = None  # Clear the reference
 
+        if self.pool:
+            self.pool.stop()
+            self.pool = None
+            self.pool_button['state'] = "normal"
+
         if self.client:
-            self.client.close()
+            self.engine.stop()
             self.log("Modbus Master stopped .")
             print("Modbus Master stopped.")
             self.connect_button['state'] = "normal"
@@ -2660,9 +2281,12 @@ class Mbus_Slave_Single:
         self.label.pack(pady=10)
 
         self.server = None
+        self.engine = None
         self.xls = None
         self.all_points = {}  # Store all points with IOA keys for updates
-        self.log_data = []
+        self.snapshot_interval = SNAPSHOT_INTERVAL  # seconds between background saves of UpdatedValue
+        self.snapshot_mode = "snapshot"  # or "journal"
+        self.log_data = LogStore()
 
         self.log_frame = tk.Frame(self.master)
         self.log_frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
@@ -2674,6 +2298,7 @@ class Mbus_Slave_Single:
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.scrollbar.config(command=self.log_text.yview)
+        self.log_pump = LogPump(self.master, self.log_text)
 
         self.upload_button = tk.Button(master, text="Upload Excel File", command=self.upload_excel)
         self.upload_button.pack(pady=10)
@@ -2734,33 +2359,19 @@ class Mbus_Slave_Single:
 
     def log(self, message):
         """Logs a message to the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.config(state='disabled')
-        self.log_text.see(tk.END)
-        self.master.update()
+        self.log_pump.put(message)
 
-        self.log_data.append({"Timestamp": datetime.datetime.now(), "Message": message})
+        self.log_data.append(message)
 
     def generate_report_txt(self):
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(report_filename, "w") as report_file:
-            report_file.write(f"IEC 104 Simulator Report\n")
-            report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
-            report_file.write(self.log_text.get("1.0", tk.END))
+        write_report_txt(self.log_data, report_filename)
 
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def generate_report_csv(self):
-        df = pd.DataFrame(self.log_data)
         report_filename = f"iec104_simulator_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        with pd.ExcelWriter(report_filename, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name="Log", index=False)
-
-            # Customize Excel sheet appearance (optional)
-            workbook = writer.book
-            worksheet = writer.sheets["Log"]
-            worksheet.set_column('A:B', 20)  # Adjust column width as needed
+        write_report_xlsx(self.log_data, report_filename)
         messagebox.showinfo("Report Generated", f"Report saved as: {report_filename}")
 
     def upload_excel(self):
@@ -2780,7 +2391,7 @@ class Mbus_Slave_Single:
             messagebox.showwarning("Warning", "Please select a sheet first.")
             return
 
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         unique_ips = df['IP Address'].dropna().unique()
         ip_list = [str(ip).strip() for ip in unique_ips]
 
@@ -2797,9 +2408,9 @@ class Mbus_Slave_Single:
             return
         self.reset_server()
         self.log(f"Setting up server for IP: {ip_address}")
-        self.server = ModbusServer(ip_address, int(port), no_block=True)
-        #self.station = self.server.add_station(common_address=1)
-        self.server.start()
+        self.engine = ModbusSlaveEngine(self.xls, selected_sheet, ip_address, port=int(port), log=self.log,
+                                        snapshot_interval=self.snapshot_interval, snapshot_mode=self.snapshot_mode)
+        self.server = self.engine.start()
         self.log(f"Modbus Server started at IP : {ip_address}")
         time.sleep(2)
         self.update_button['state'] = "normal"
@@ -2844,7 +2455,7 @@ class Mbus_Slave_Single:
 
     def process_signals_one_by_one(self):
         selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         grouped = df.groupby('IP Address')
 
         for ip_address, group in grouped:
@@ -2954,7 +2565,7 @@ class Mbus_Slave_Single:
         confirm_button.pack(pady=10)
 
         selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
+        df = read_sheet(self.xls, sheet_name=selected_sheet)
         unique_point_type = df['Function Code'].dropna().unique()
         point_type_list = [str(pt).strip() for pt in unique_point_type]
         self.point_type_combo['values'] = point_type_list
@@ -2978,7 +2589,7 @@ class Mbus_Slave_Single:
             messagebox.showwarning("Warning", "Please select a valid IP address.")
             return
         
-        df = pd.read_excel(self.xls, sheet_name=self.sheet_combo.get())
+        df = read_sheet(self.xls, sheet_name=self.sheet_combo.get())
         group_ip = df[df['IP Address'].astype(str).str.strip() == selected_ip]
         if group_ip.empty:
             messagebox.showinfo("Info", f"No signals found for IP : {selected_ip}. and Index : {ioa_input}")
@@ -3019,352 +2630,8 @@ class Mbus_Slave_Single:
         self.choose_processing_mode()
  
     def process_signals_all_at_once(self):
-        selected_sheet = self.sheet_combo.get()
-        df = pd.read_excel(self.xls, sheet_name=selected_sheet)
-
-        if 'UpdatedValue' in df.columns :
-            df = df.drop(columns=['UpdatedValue'])
-            df['UpdatedValue'] = df['Value']
-        else:
-            df['UpdatedValue'] = df['Value']
-
-        grouped = df.groupby('IP Address')
-
-        for ip_address, group in grouped:
-            if str(ip_address).strip() == self.ip_combo.get().strip():
-                while self.server_running:
-                    for _, row in group.iterrows():
-                        if not self.server_running:  # Check if stop button was pressed
-                            self.log("Processing stopped by user.")
-                            break
-                        address = int(row['Index'])
-                        function_code = row['Function Code']
-                        value = df.loc[row.name, 'UpdatedValue'] if pd.notna(df.loc[row.name, 'UpdatedValue']) else 0
-                        mtype = row['Type']
-                        endian = row['Endian']
-
-                        if function_code ==1: # Coil Input
-                            value_DI =[bool(int(value))]
-                            self.server.data_bank.set_coils(address-1, value_DI)
-                            self.log(f"Updated Coil input {address} with value {value_DI}")
-                            value = not bool(value)
-                            df.loc[row.name, 'UpdatedValue'] = int(value)
-                            time.sleep(1)
-
-                        elif function_code == 2: # Binary Input signal
-                            value_DI = [bool(int(value))]
-                            self.server.data_bank.set_discrete_inputs(address - 1, value_DI)
-                            self.log(f"Updated Discrete input {address} with value {value_DI}")
-                            value = not bool(value)
-                            df.loc[row.name, 'UpdatedValue'] = int(value)
-                            time.sleep(1)
-
-                        elif function_code ==  5: # Binary Output signal
-                            for i in range(3):
-                                value = self.server.data_bank.get_coils(address - 1)
-                                value_b = bool(value)
-                                self.log(f" Read coil status at {address} value : {value}")
-                                time.sleep(2)
-
-                        elif function_code == 3: # Holding Register
-                            if mtype == 'Float':
-                                valuen = float(value)
-                                if endian == 'Big':
-                                    registers = float_to_registers_be(valuen)
-                                elif endian == 'Little':
-                                    registers = float_to_registers(valuen)
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_holding_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with float value {value}")
-
-                            elif mtype == 'Swapped Float':
-                                valuen = float(value)
-                                if endian == 'Big':
-                                    registers = float_to_registers_be(valuen)
-                                elif endian == 'Little':
-                                    registers = float_to_registers(valuen)
-                                else:
-                                    self.log("Invalid Endian Format")
-                                registers_new = swap(registers)
-                                self.server.data_bank.set_holding_registers(address - 1, registers_new)
-                                self.log(f"Updated Holding input {address} with Swapped float value {value}")
-
-                            elif mtype == '32bit unsigned Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = unsigned_integer_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = unsigned_integer_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_holding_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            elif mtype == '32bit signed Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = signed_integer_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = signed_integer_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_holding_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            elif mtype == '16bit unsigned Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = unsigned_16bit_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = unsigned_16bit_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_holding_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            elif mtype == '16bit signed Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = signed_16bit_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = signed_16bit_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_holding_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            time.sleep(1)
-                            value = random.randint(10,100)
-                            df.loc[row.name, 'UpdatedValue'] = value
-
-                        elif function_code == 4 : # Input register
-                            if mtype == 'Float':
-                                valuen = float(value)
-                                if endian == 'Big':
-                                    registers = float_to_registers_be(valuen)
-                                elif endian == 'Little':
-                                    registers = float_to_registers(valuen)
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_input_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with float value {value}")
-
-                            elif mtype == 'Swapped Float':
-                                valuen = float(value)
-                                if endian == 'Big':
-                                    registers = float_to_registers_be(valuen)
-                                elif endian == 'Little':
-                                    registers = float_to_registers(valuen)
-                                else:
-                                    self.log("Invalid Endian Format")
-                                registers_new = swap(registers)
-                                self.server.data_bank.set_input_registers(address - 1, registers_new)
-                                self.log(f"Updated Holding input {address} with Swapped float value {value}")
-
-                            elif mtype == '32bit unsigned Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = unsigned_integer_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = unsigned_integer_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_input_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            elif mtype == '32bit signed Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = signed_integer_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = signed_integer_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_input_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            elif mtype == '16bit unsigned Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = unsigned_16bit_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = unsigned_16bit_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_input_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            elif mtype == '16bit signed Integer':
-                                valuen = int(value)
-                                if endian == 'Big':
-                                    try:
-                                        registers = signed_16bit_to_register_be(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                elif endian == 'Little':
-                                    try:
-                                        registers = signed_16bit_to_register(valuen)
-                                    except ValueError as e:
-                                        self.log(f"Error {str(e)}")
-                                else:
-                                    self.log("Invalid Endian Format")
-                                self.server.data_bank.set_input_registers(address - 1, registers)
-                                self.log(f"Updated Holding input {address} with Integer value {value}")
-
-                            time.sleep(1)
-                            value = random.randint(10,100)
-                            df.loc[row.name, 'UpdatedValue'] = value
-
-                        elif function_code == 6: # Analog Output signal
-                            for i in range (3):
-                                registers = self.server.data_bank.get_holding_registers(address -1, number = 1)
-                                if mtype == 'Float':
-                                    if endian == 'Big':
-                                        try:
-                                            value = registers_to_float_be(registers)
-                                        except ValueError as e:
-                                            self.log(f"Error {str(e)}")
-                                    else :
-                                        try:
-                                            value = registers_to_float(registers)
-                                        except ValueError as e:
-                                            self.log(f"Error {str(e)}")
-                                    self.log(f"Read holding register {address}, float value: {round(value,4)}")
-                                    
-                                elif mtype == 'Swapped Float':
-                                    registers_new  = swap(registers)
-                                    if endian == 'Big':
-                                        value = registers_to_float_be(registers_new)
-                                    else:
-                                        value = registers_to_float(registers_new)
-                                    self.log(f"Read holding register {address}, Swapped float value: {round(value,4)}")
-
-                                elif mtype == '32bit unsigned Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_unsigned_integer_be(registers)
-                                    else:
-                                        value = registers_to_unsigned_integer(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-
-                                elif mtype == '32bit signed Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_signed_integer_be(registers)
-                                    else:
-                                        value = registers_to_signed_integer(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-
-                                elif mtype == '16bit unsigned Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_unsigned_16bit_be(registers)
-                                    else:
-                                        value = registers_to_unsigned_16bit(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-
-                                elif mtype == '16bit signed Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_signed_16bit_be(registers)
-                                    else:
-                                        value = registers_to_signed_16bit(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-                                
-                                time.sleep(1)
-                        
-                        elif function_code == 16: # Analog Output signal
-                            for i in range (3):
-                                registers = self.server.data_bank.get_holding_registers(address -1, number = 2)
-                                if mtype == 'Float':
-                                    if endian == 'Big':
-                                       value = registers_to_float_be(registers)
-                                    else :
-                                       value = registers_to_float(registers)
-                                    self.log(f"Read holding register {address}, float value: {round(value,4)}")
-                                    
-                                elif mtype == 'Swapped Float':
-                                    registers_new  = swap(registers)
-                                    if endian == 'Big':
-                                        value = registers_to_float_be(registers_new)
-                                    else:
-                                        value = registers_to_float(registers_new)
-                                    self.log(f"Read holding register {address}, Swapped float value: {round(value,4)}")
-
-                                elif mtype == '32bit unsigned Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_unsigned_integer_be(registers)
-                                    else:
-                                        value = registers_to_unsigned_integer(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-
-                                elif mtype == '32bit signed Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_signed_integer_be(registers)
-                                    else:
-                                        value = registers_to_signed_integer(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-
-                                elif mtype == '16bit unsigned Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_unsigned_16bit_be(registers)
-                                    else:
-                                        value = registers_to_unsigned_16bit(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-
-                                elif mtype == '16bit signed Integer':
-                                    if endian == 'Big':
-                                        value = registers_to_signed_16bit_be(registers)
-                                    else:
-                                        value = registers_to_signed_16bit(registers)
-                                    self.log(f"Read holding register {address}, Integer value: {value}")
-                                
-                                time.sleep(1)
-                        
-                        else:
-                            self.log(" Invalid Function code ")
-                    df.to_excel(self.xls, sheet_name=selected_sheet, index=False)
-                    self.log("Saved updated values to excel")
-                    time.sleep(5)
+        """All-at-Once mode runs the engine's timer wheel in a worker thread, the GUI only shows its log."""
+        threading.Thread(target=self.engine.run, daemon=True).start()
 
     def coil_dialog(self, address, name, ip_address):
         if not self.server_running:
@@ -3485,84 +2752,17 @@ class Mbus_Slave_Single:
         big_endian = self.big_endian_mode.get()
         dt  = self.selected_dt.get()
         value = value_entry.get()
-        if dt == "Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            self.server.data_bank.set_holding_registers( address - 1  , registers)
-            self.log(f"Updated holding register {address} with float value {value}")
-
-        elif dt == "Swapped Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            registers_new = swap(registers)
-            self.server.data_bank.set_holding_registers( address - 1  , registers_new)
-            self.log(f"Updated holding register {address} with swapped float value {value}")
-
-        elif dt == "32bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_holding_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "32bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_holding_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
-
-        elif dt == "16bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_holding_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "16bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_holding_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
+        if dt not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt, big_endian)
+        try:
+            registers = codec.encode(value)
+        except ValueError as e:
+            self.log(f"Error {str(e)}")
+            return
+        self.server.data_bank.set_holding_registers(address - 1, registers)
+        self.log(f"Updated holding register {address} with {dt} value {value}")
 
     def break_loop_h(self,numeric_dialog_h):
         numeric_dialog_h.destroy()
@@ -3608,85 +2808,18 @@ class Mbus_Slave_Single:
         big_endian = self.big_endian_mode.get()
         dt  = self.selected_dt.get()
         value = value_entry.get()
-        if dt == "Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            self.server.data_bank.set_input_registers( address - 1  , registers)
-            self.log(f"Updated holding register {address} with float value {value}")
-
-        elif dt == "Swapped Float":
-            valuen = float(value)
-            if big_endian:
-                registers = float_to_registers_be(valuen)
-            else:
-                registers = float_to_registers(valuen)
-            registers_new = swap(registers)
-            self.server.data_bank.set_input_registers( address - 1  , registers_new)
-            self.log(f"Updated holding register {address} with swapped float value {value}")
-
-        elif dt == "32bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_input_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "32bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_integer_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_integer_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_input_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
-
-        elif dt == "16bit unsigned Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = unsigned_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = unsigned_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_input_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Unsigned Integer value {value}")
-
-        elif dt == "16bit signed Integer":
-            valuen = int(value)
-            if big_endian:
-                try:
-                    registers = signed_16bit_to_register_be(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            else:
-                try:
-                    registers = signed_16bit_to_register(valuen)
-                except ValueError as e:
-                    self.log(f"Error {str(e)}")
-            self.server.data_bank.set_input_registers(address - 1, registers)
-            self.log(f"Updated holding register {address} with Signed Integer value {value}")
-    
+        if dt not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt, big_endian)
+        try:
+            registers = codec.encode(value)
+        except ValueError as e:
+            self.log(f"Error {str(e)}")
+            return
+        self.server.data_bank.set_input_registers(address - 1, registers)
+        self.log(f"Updated holding register {address} with {dt} value {value}")
+
     def break_loop_i(self,numeric_dialog_i):
         numeric_dialog_i.destroy()
 
@@ -3774,50 +2907,18 @@ class Mbus_Slave_Single:
         big_endian_c = self.big_endian_c_mode.get()
         dt_c  = self.selected_dt_c.get()
 
-        if dt_c == "Float":
-            if big_endian_c:
-                value = registers_to_float_be(registers)
-            else:
-                value = registers_to_float(registers)
-            value = round(value,4)
-            self.log(f"Read holding register {address}:  float value {value}")
-
-        elif dt_c == "Swapped Float":
-            registers_new = swap(registers)
-            if big_endian_c:
-                value = registers_to_float_be(registers_new)
-            else:
-                value = registers_to_float(registers_new)
+        if dt_c not in TYPE_CODES:
+            self.log("Please select a data type")
+            return
+        codec = scalar_codec(dt_c, big_endian_c)
+        try:
+            value = codec.decode(registers)
+        except (ValueError, TypeError) as e:
+            self.log(f"Error {str(e)}")
+            return
+        if codec.is_float:
             value = round(value,4)
-            self.log(f"Read holding register {address} : swapped float value {value}")
-
-        elif dt_c == "32bit unsigned Integer":
-            if big_endian_c:
-                value = registers_to_unsigned_integer_be(registers)
-            else:
-                value = registers_to_unsigned_integer(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "32bit signed Integer":
-            if big_endian_c:
-                value = registers_to_signed_integer_be(registers)
-            else:
-                value = registers_to_signed_integer(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "16bit unsigned Integer":
-            if big_endian_c:
-                value = registers_to_unsigned_16bit_be(registers)
-            else:
-                value = registers_to_unsigned_16bit(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
-
-        elif dt_c == "16bit signed Integer":
-            if big_endian_c:
-                value = registers_to_signed_16bit_be(registers)
-            else:
-                value = registers_to_signed_16bit(registers)
-            self.log(f"Read holding register {address}:  Integer value {value}")
+        self.log(f"Read holding register {address}: {dt_c} value {value}")
 
         self.display_text_c.delete('1.0',tk.END)
         self.display_text_c.insert('1.0', f"{value}")
@@ -3835,6 +2936,7 @@ class Mbus_Slave_Single:
         """Stop all servers and close the main window."""
         if messagebox.askokcancel("Quit", "Do you want to stop all servers and close the simulator?"):
             self.stop_server()
+            self.log_data.close()
             self.master.destroy()
 
     def stop_server(self):
@@ -3845,7 +2947,7 @@ class Mbus_Slave_Single:
             self.current_dialog = None  # Clear the reference
 
         if self.server:
-            self.server.stop()
+            self.engine.stop()
             self.log("Server stopped .")
             print("Server stopped.")
             self.report_button_csv['state'] = "normal"
@@ -3864,6 +2966,7 @@ class Mbus_Slave_Multiple:
         self.master = master
         self.current_dialog = None
         self.server_running = True
+        self.farm = None
 
         self.master.title(" Modbus Slave Simulator ")
         self.master.geometry("700x450+20+20")
@@ -3885,6 +2988,7 @@ class Mbus_Slave_Multiple:
 
         # Configure the scrollbar to scroll the Text widget
         self.log_scrollbar.config(command=self.log_text.yview)
+        self.log_pump = LogPump(self.master, self.log_text)
 
         self.start_servers_button = tk.Button(self.master, text="Start Servers", command=self.process_signals_all_at_once)
         self.start_servers_button.pack(pady=5)
@@ -3896,54 +3000,31 @@ class Mbus_Slave_Multiple:
 
     def log(self, message):
         """Logs a message to the log text area."""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.config(state='disabled')
-        self.log_text.see(tk.END)
-        self.master.update()
+        self.log_pump.put(message)
 
     def process_signals_all_at_once(self):
-        thread = threading.Thread(target=self.run_bat_file)
-        thread.start()
-
-    def run_bat_file(self):
-        """Run a .bat file selected by the user."""
+        """Serve every device of the selected workbooks from one asyncio slave farm."""
+        file_paths = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx;*.xls")])
+        if not file_paths:
+            self.log("No file selected.")
+            return
+        self.log(f"Selected files: {list(file_paths)}")
         try:
-            # Create a hidden root window for the file dialog
-            bat_file_path = filedialog.askopenfilename(
-            title="Select BAT File",
-            filetypes=[("Batch Files", "*.bat"), ("All Files", "*.*")])
-
-            # If the user cancels the dialog, exit the function            
-            if not bat_file_path:
-                self.log("No file selected.")
-                messagebox.showinfo("Info", "No file selected. Operation canceled.")
-                return
-
-            # Log the file path for debugging
-            self.log(f"Selected BAT file: {bat_file_path}")
-
-            # Execute the selected BAT file
-            result = subprocess.run([bat_file_path], capture_output=True, text=True, shell=True)
-
-            # Check for success or failure
-            if result.returncode == 0:
-                self.log(f"Successfully executed the BAT file: {bat_file_path}")
-            else:
-                self.log(f"Error while executing the BAT file: {bat_file_path}")
-                self.log(f"Error Output:\n{result.stderr}")
-                messagebox.showerror("Execution Error", f"Error while running BAT file:\n{result.stderr}")
-
-        except subprocess.SubprocessError as e:
-            self.log(f"Error running BAT file: {e}")
-            messagebox.showerror("Error", f"An error occurred while running the BAT file:\n{e}")
+            if self.farm:
+                self.farm.stop()
+            self.farm = SlaveFarm(file_paths, log=self.log)
         except Exception as e:
             self.log(f"Unexpected error: {e}")
             messagebox.showerror("Error", f"An unexpected error occurred:\n{e}")
+            return
+        thread = threading.Thread(target=self.farm.run, daemon=True)
+        thread.start()
 
     def close_simulator(self):
         """Stop all servers and close the main window."""
         if messagebox.askokcancel("Quit", "Do you want to stop all servers and close the simulator?"):
+            if self.farm:
+                self.farm.stop()
             self.master.destroy()
 
 root = tk.Tk()
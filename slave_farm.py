@@ -0,0 +1,456 @@
+import sys
+import time
+import struct
+import asyncio
+import argparse
+import datetime
+import multiprocessing
+from register_bank import RegisterBank, COILS, DISCRETE_INPUTS, HOLDING_REGISTERS, INPUT_REGISTERS
+from signal_plan import SignalPlan
+from sheet_cache import read_sheet
+from snapshot_writer import SnapshotWriter, SNAPSHOT_INTERVAL
+from write_events import WriteEventBus
+from waveforms import WaveformGenerator
+
+# asyncio Modbus TCP slave farm. Every IP/port of every workbook gets one
+# listening socket in a single event loop, every unit id behind it gets its own
+# RegisterBank. Requests are parsed straight from the MBAP frames and served
+# from the bank, and one update task per device runs the All-at-Once signal
+# updates of the sheet. Optional sheet columns: 'Port' (default --port) and
+# 'Unit ID' (default 1).
+#
+#   python slave_farm.py 1.xlsx 2.xlsx
+#   python slave_farm.py 1.xlsx --bind 127.0.0.1 --base-port 5020
+#   python slave_farm.py --bench 200 --duration 10
+
+MBAP = struct.Struct(">HHHB")
+READ_REQUEST = struct.Struct(">BHH")
+WRITE_MULTIPLE = struct.Struct(">BHHB")
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+ILLEGAL_DATA_VALUE = 3
+GATEWAY_TARGET_FAILED = 11
+
+_BIT_TABLES = {1: COILS, 2: DISCRETE_INPUTS}
+_WORD_TABLES = {3: HOLDING_REGISTERS, 4: INPUT_REGISTERS}
+
+def _exception(function_code, code):
+    return bytes((function_code | 0x80, code))
+
+def handle_pdu(bank, pdu):
+    """Serve one request PDU from bank, return the response PDU."""
+    function_code = pdu[0]
+    try:
+        if function_code in (1, 2, 3, 4):
+            _, address, count = READ_REQUEST.unpack_from(pdu)
+            if function_code <= 2:
+                if not 1 <= count <= 2000:
+                    return _exception(function_code, ILLEGAL_DATA_VALUE)
+                if not bank.in_range(address, count):
+                    return _exception(function_code, ILLEGAL_DATA_ADDRESS)
+                data = bank.get_bits_bytes(_BIT_TABLES[function_code], address, count)
+            else:
+                if not 1 <= count <= 125:
+                    return _exception(function_code, ILLEGAL_DATA_VALUE)
+                if not bank.in_range(address, count):
+                    return _exception(function_code, ILLEGAL_DATA_ADDRESS)
+                data = bank.get_words_bytes(_WORD_TABLES[function_code], address, count)
+            return bytes((function_code, len(data))) + data
+
+        if function_code == 5:
+            _, address, value = READ_REQUEST.unpack_from(pdu)
+            if value not in (0xFF00, 0x0000):
+                return _exception(function_code, ILLEGAL_DATA_VALUE)
+            if not bank.in_range(address, 1):
+                return _exception(function_code, ILLEGAL_DATA_ADDRESS)
+            bank.set_bits(COILS, address, [value])
+            bank.notify(5, COILS, address, 1)
+            return pdu[:5]
+
+        if function_code == 6:
+            address = READ_REQUEST.unpack_from(pdu)[1]
+            if not bank.in_range(address, 1):
+                return _exception(function_code, ILLEGAL_DATA_ADDRESS)
+            bank.set_words_bytes(HOLDING_REGISTERS, address, pdu[3:5])
+            bank.notify(6, HOLDING_REGISTERS, address, 1)
+            return pdu[:5]
+
+        if function_code in (15, 16):
+            _, address, count, byte_count = WRITE_MULTIPLE.unpack_from(pdu)
+            data = pdu[6:6 + byte_count]
+            if function_code == 15:
+                valid = 1 <= count <= 1968 and byte_count == (count + 7) // 8
+            else:
+                valid = 1 <= count <= 123 and byte_count == 2 * count
+            if not valid or len(data) != byte_count:
+                return _exception(function_code, ILLEGAL_DATA_VALUE)
+            if not bank.in_range(address, count):
+                return _exception(function_code, ILLEGAL_DATA_ADDRESS)
+            if function_code == 15:
+                bank.set_bits_bytes(COILS, address, count, data)
+                bank.notify(15, COILS, address, count)
+            else:
+                bank.set_words_bytes(HOLDING_REGISTERS, address, data)
+                bank.notify(16, HOLDING_REGISTERS, address, count)
+            return pdu[:5]
+    except struct.error:
+        return _exception(function_code, ILLEGAL_DATA_VALUE)
+    return _exception(function_code, ILLEGAL_FUNCTION)
+
+class ModbusTCPProtocol(asyncio.Protocol):
+    """One client connection of an endpoint, answers every complete frame in the buffer."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.buffer = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.endpoint.connections += 1
+
+    def connection_lost(self, exc):
+        self.endpoint.connections -= 1
+
+    def data_received(self, data):
+        buffer = self.buffer
+        buffer += data
+        responses = []
+        offset = 0
+        while len(buffer) - offset >= 7:
+            transaction_id, protocol_id, length, unit_id = MBAP.unpack_from(buffer, offset)
+            if protocol_id != 0 or not 2 <= length <= 254:
+                self.transport.close()  # not Modbus TCP, drop the connection
+                return
+            end = offset + 6 + length
+            if end > len(buffer):
+                break
+            pdu = bytes(buffer[offset + 7:end])
+            offset = end
+
+            bank = self.endpoint.bank(unit_id)
+            if bank is None:
+                response = _exception(pdu[0], GATEWAY_TARGET_FAILED)
+            else:
+                response = handle_pdu(bank, pdu)
+            responses.append(MBAP.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+        del buffer[:offset]
+        if responses:
+            self.endpoint.requests += len(responses)
+            self.transport.write(b"".join(responses))
+
+class Endpoint:
+    """Listening IP/port with the RegisterBank of each unit id behind it."""
+
+    def __init__(self, ip_address, port):
+        self.ip_address = ip_address
+        self.port = port
+        self.banks = {}
+        self.requests = 0
+        self.connections = 0
+        self.server = None
+
+    def bank(self, unit_id):
+        bank = self.banks.get(unit_id)
+        if bank is None and len(self.banks) == 1:
+            # a single device answers every unit id, like a plain Modbus TCP slave
+            bank = next(iter(self.banks.values()))
+        return bank
+
+class Device:
+    """Rows of one IP/port/unit of a workbook and their update cycle."""
+
+    def __init__(self, endpoint, unit_id, group, values, writer=None, events=None, seed=None, log=print):
+        self.endpoint = endpoint
+        self.unit_id = unit_id
+        self.log = log
+        self.out_of_range = set()  # rows already reported, the error is logged once per row
+        self.bank = endpoint.banks.setdefault(unit_id, RegisterBank())
+        self.plan = SignalPlan(group, {}, values=values)
+        self.writer = writer
+        self.events = events
+        self.bank.on_write = self.written
+        self.inputs = [step for step in self.plan if step.code in (1, 2, 3, 4)]
+        self.integer = [step.codec is not None and not step.codec.is_float for step in self.inputs]
+        self.generator = WaveformGenerator(self.inputs, group, [step.code in (1, 2) for step in self.inputs],
+                                           self.integer, seed=seed)
+        self.batch_index = [self.generator.index[step.row] for step in self.plan.batch_steps]
+
+    @property
+    def name(self):
+        return f"{self.endpoint.ip_address}:{self.endpoint.port}/{self.unit_id}"
+
+    def update(self):
+        """One All-at-Once pass: inputs get the next generated values in one bank update."""
+        values = self.generator.sample(toggle=True)
+        try:
+            registers = self.plan.layout.encode(values[self.batch_index]).tolist()
+        except ValueError:
+            # a Min/Max outside the type range: only the rows out of range keep their registers
+            registers = self.encode_rows(values)
+
+        changes = []
+        for step, value, integer in zip(self.inputs, values.tolist(), self.integer):
+            address = step.address - 1
+            code = step.code
+            if code in (1, 2):
+                step.value = int(value)
+                changes.append((COILS if code == 1 else DISCRETE_INPUTS, address, [bool(value)]))
+            elif registers[step.span][0] is not None:
+                step.value = int(value) if integer else value
+                changes.append((HOLDING_REGISTERS if code == 3 else INPUT_REGISTERS, address, registers[step.span]))
+        self.bank.update(changes)
+
+        if self.writer:
+            self.writer.update(self.plan.steps)
+
+    def encode_rows(self, values):
+        """Registers of the batched rows encoded one by one, None for the rows out of their type range."""
+        registers = [None] * self.plan.layout.size
+        for step, value in zip(self.plan.batch_steps, values[self.batch_index].tolist()):
+            try:
+                registers[step.span] = step.codec.encode(value)
+            except ValueError as e:
+                if step.row not in self.out_of_range:
+                    self.out_of_range.add(step.row)
+                    self.log(f"Error {self.name} Index {step.address} {step.name}: {str(e)}")
+        return registers
+
+    def written(self, unit, function, table, address, values):
+        """Master write: the output rows it touched take the new value right away."""
+        bank = self.bank
+        steps = self.plan.written(table, address, len(values))
+        for step in steps:
+            start = step.address - 1
+            if step.code == 5:
+                step.value = bank.coils[start]
+            else:
+                value = step.codec.decode(bank.get_words(HOLDING_REGISTERS, start, step.count))
+                step.value = round(value,4) if step.codec.is_float else value
+        if self.events:
+            self.events.publish(self.unit_id, function, address, values, steps, self)
+
+class SlaveFarm:
+    """All devices of a set of workbooks served from one event loop."""
+
+    def __init__(self, workbooks=(), sheet_name=0, port=502, bind=None, base_port=None, cycle=5.0,
+                 report_interval=10.0, snapshot_interval=SNAPSHOT_INTERVAL, snapshot_mode="snapshot", log=print,
+                 log_writes=False, seed=None):
+        self.port = port
+        self.bind = bind
+        self.base_port = base_port
+        self.cycle = cycle
+        self.report_interval = report_interval
+        self.log = log
+        self.seed = seed
+        self.endpoints = {}
+        self.devices = []
+        self.writers = []
+        self.loop = None
+        self._stop = None
+        # master writes leave the event loop right away, the bus thread saves and logs them
+        self.events = WriteEventBus(on_error=lambda e: self.log(f"Error {str(e)}"))
+        self.events.subscribe(self.save_written)
+        if log_writes:
+            self.events.subscribe(lambda event: self.log(f"{event.source.name}: {event}"))
+        for workbook in workbooks:
+            self.add_workbook(workbook, sheet_name, snapshot_interval, snapshot_mode)
+
+    def endpoint(self, ip_address, port):
+        key = (ip_address, port)
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            if self.bind:
+                # serve every device on one local address, one port each
+                listen = (self.bind, self.base_port + len(self.endpoints) if self.base_port else port)
+            else:
+                listen = key
+            endpoint = self.endpoints[key] = Endpoint(*listen)
+        return endpoint
+
+    def add_workbook(self, workbook, sheet_name=0, snapshot_interval=SNAPSHOT_INTERVAL, snapshot_mode="snapshot"):
+        df = read_sheet(workbook, sheet_name=sheet_name)
+        df = df[df['IP Address'].astype(str).str.strip() != '-']
+        df['UpdatedValue'] = df['Value']
+        if 'Port' not in df.columns:
+            df['Port'] = self.port
+        if 'Unit ID' not in df.columns:
+            df['Unit ID'] = 1
+        df['Port'] = df['Port'].fillna(self.port).astype(int)
+        df['Unit ID'] = df['Unit ID'].fillna(1).astype(int)
+
+        writer = SnapshotWriter(workbook, df, sheet_name, interval=snapshot_interval, mode=snapshot_mode,
+                                on_error=lambda e: self.log(f"Error {str(e)}"))
+        self.writers.append(writer)
+        for (ip_address, port, unit_id), group in df.groupby(['IP Address', 'Port', 'Unit ID']):
+            endpoint = self.endpoint(str(ip_address).strip(), int(port))
+            seed = None if self.seed is None else [self.seed, len(self.devices)]
+            device = Device(endpoint, int(unit_id), group, df['UpdatedValue'], writer, self.events, seed, self.log)
+            for step in device.plan.invalid:
+                self.log(f"{device.name}: Invalid Type/Endian {step.mtype}/{step.endian} for Index {step.address}")
+            self.devices.append(device)
+
+    def save_written(self, event):
+        if event.steps and event.source.writer:
+            event.source.writer.update(event.steps)
+
+    async def _updates(self):
+        while True:
+            started = time.perf_counter()
+            for device in self.devices:
+                device.update()
+            await asyncio.sleep(max(0.0, self.cycle - (time.perf_counter() - started)))
+
+    async def _reports(self):
+        last_requests = 0
+        last_time = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            requests = sum(endpoint.requests for endpoint in self.endpoints.values())
+            now = time.perf_counter()
+            rate = (requests - last_requests) / (now - last_time)
+            connections = sum(endpoint.connections for endpoint in self.endpoints.values())
+            devices = sum(len(endpoint.banks) for endpoint in self.endpoints.values())
+            self.log(f"Devices: {devices}, endpoints: {len(self.endpoints)}, "
+                     f"connections: {connections}, requests/s: {rate:.0f}")
+            last_requests, last_time = requests, now
+
+    async def serve(self):
+        """Open every endpoint and run until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for endpoint in self.endpoints.values():
+            try:
+                endpoint.server = await self.loop.create_server(lambda endpoint=endpoint: ModbusTCPProtocol(endpoint),
+                                                                endpoint.ip_address, endpoint.port, reuse_address=True)
+            except OSError as e:
+                self.log(f"Error {endpoint.ip_address}:{endpoint.port} {str(e)}")
+        serving = [endpoint for endpoint in self.endpoints.values() if endpoint.server]
+        self.log(f"Serving {sum(len(endpoint.banks) for endpoint in serving)} devices on {len(serving)} endpoints")
+
+        tasks = [asyncio.create_task(self._reports())]
+        if self.cycle:
+            tasks.append(asyncio.create_task(self._updates()))
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            for endpoint in serving:
+                endpoint.server.close()
+            self.events.close()
+            for line in self.events.stats():
+                self.log(line)
+            for writer in self.writers:
+                writer.close()
+            self.log("Slave farm stopped.")
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    def stop(self):
+        """Stop the farm, callable from any thread."""
+        if self.loop and self._stop:
+            self.loop.call_soon_threadsafe(self._stop.set)
+
+#***************Benchmark*************************************************
+
+def _bench_client(host, ports, duration, depth, count, result):
+    """Load process: pipelined FC3 reads against every port, puts the answered request count in result."""
+    async def client(port, deadline, totals):
+        reader, writer = await asyncio.open_connection(host, port)
+        request = READ_REQUEST.pack(3, 0, count)
+        transaction_id = 0
+        answered = 0
+        while time.perf_counter() < deadline:
+            frames = []
+            for _ in range(depth):
+                transaction_id = (transaction_id + 1) & 0xFFFF
+                frames.append(MBAP.pack(transaction_id, 0, len(request) + 1, 1) + request)
+            writer.write(b"".join(frames))
+            for _ in range(depth):
+                header = await reader.readexactly(7)
+                await reader.readexactly(MBAP.unpack(header)[2] - 1)
+            answered += depth
+        totals.append(answered)
+        writer.close()
+
+    async def run():
+        totals = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client(port, deadline, totals) for port in ports), return_exceptions=True)
+        result.put(sum(totals))
+
+    asyncio.run(run())
+
+def bench(devices=100, duration=10.0, depth=8, count=10, clients=1, host="127.0.0.1", base_port=15020):
+    """Serve `devices` synthetic devices on one core and load them from `clients` other processes."""
+    farm = SlaveFarm(cycle=0, report_interval=max(1.0, duration / 5), bind=host, base_port=base_port)
+    for n in range(devices):
+        endpoint = farm.endpoint(f"bench-{n}", 502)
+        endpoint.banks[1] = RegisterBank()
+
+    async def run():
+        serve = asyncio.create_task(farm.serve())
+        await asyncio.sleep(0.5)
+        ports = [endpoint.port for endpoint in farm.endpoints.values()]
+        result = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_bench_client, args=(host, ports[k::clients], duration, depth, count, result))
+                   for k in range(clients)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            await asyncio.sleep(0.2)
+        elapsed = time.perf_counter() - started
+        answered = sum(result.get() for _ in workers)
+        farm.stop()
+        await serve
+        return answered, elapsed
+
+    answered, elapsed = asyncio.run(run())
+    rate = answered / elapsed if elapsed else 0
+    print(f"Devices: {devices}, requests: {answered}, seconds: {elapsed:.1f}, requests/s on one core: {rate:.0f}")
+    return rate
+
+#***************Command line**********************************************
+
+def console_log(message):
+    print(f"{datetime.datetime.now()} {message}", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="asyncio Modbus TCP slave farm")
+    parser.add_argument("workbooks", nargs="*", help="Excel workbooks with the signal list")
+    parser.add_argument("--sheet", default=0, help="sheet name, first sheet by default")
+    parser.add_argument("--port", type=int, default=502, help="port of rows without a 'Port' column")
+    parser.add_argument("--bind", help="serve every device on this local address instead of its own IP")
+    parser.add_argument("--base-port", type=int, help="with --bind, first port of the consecutive device ports")
+    parser.add_argument("--cycle", type=float, default=5.0, help="seconds between signal updates, 0 to disable")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="seconds between throughput reports")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL)
+    parser.add_argument("--snapshot-mode", choices=["snapshot", "journal"], default="snapshot")
+    parser.add_argument("--seed", type=int, help="seed of the simulated values, random by default")
+    parser.add_argument("--log-writes", action="store_true", help="log every master write")
+    parser.add_argument("--bench", type=int, metavar="DEVICES", help="benchmark DEVICES synthetic devices instead")
+    parser.add_argument("--duration", type=float, default=10.0, help="benchmark length in seconds")
+    parser.add_argument("--clients", type=int, default=1, help="benchmark load processes")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        bench(args.bench, args.duration, clients=args.clients, base_port=args.base_port or 15020)
+        return 0
+    if not args.workbooks:
+        parser.error("at least one workbook is required")
+
+    farm = SlaveFarm(args.workbooks, args.sheet, args.port, args.bind, args.base_port, args.cycle,
+                     args.report_interval, args.snapshot_interval, args.snapshot_mode, log=console_log,
+                     log_writes=args.log_writes, seed=args.seed)
+    try:
+        farm.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import os
+import time
+import shutil
+import threading
+import pandas as pd
+from sheet_cache import workbook_path
+
+# Background writer for the 'UpdatedValue' column of a sheet. The update loops
+# hand over their signal table once per pass, only the rows whose value changed
+# are queued and coalesced (last value wins), and a daemon thread writes them
+# every `interval` seconds. In 'snapshot' mode the sheet is rewritten with the
+# merged values, in 'journal' mode the changes are appended to a
+# <workbook>.journal file and compacted into the workbook every `compact_every`
+# flushes and on close; a journal left behind by a crashed run is compacted
+# into the workbook when the next writer starts, before its first save. The
+# update loop itself never touches the disk. The workbook is saved to a
+# temporary file next to it and swapped in with os.replace, so a save cut short
+# by the process exit leaves the old workbook.
+
+SNAPSHOT_INTERVAL = 5.0
+
+def _journal_value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return {"True": True, "False": False}.get(text, text)
+
+class SnapshotWriter:
+    """Debounced writer of one sheet, fed with dirty rows from the update loop."""
+
+    def __init__(self, xls, df, sheet_name=0, interval=SNAPSHOT_INTERVAL, mode="snapshot",
+                 compact_every=12, column="UpdatedValue", on_error=None):
+        if mode not in ("snapshot", "journal"):
+            raise ValueError(f"Invalid snapshot mode {mode}")
+        self.path = workbook_path(xls)
+        if isinstance(sheet_name, int):
+            sheet_name = pd.ExcelFile(self.path).sheet_names[sheet_name] if os.path.exists(self.path) else "Sheet1"
+        self.sheet_name = sheet_name
+        self.interval = interval
+        self.mode = mode
+        self.compact_every = compact_every
+        self.column = column
+        self.on_error = on_error
+        self.journal_path = self.path + ".journal"
+        self.writes = 0
+
+        self._df = df.copy()
+        self._df[column] = self._df[column].astype(object)
+        self._last = {}
+        self._pending = {}
+        self._flushes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def update(self, table):
+        """Queue the rows of table whose value changed since the last call."""
+        dirty = {}
+        # called from the update loop and the write event dispatcher
+        with self._lock:
+            last = self._last
+            for signal in table:
+                value = signal.value
+                if signal.row not in last or last[signal.row] != value:
+                    last[signal.row] = value
+                    dirty[signal.row] = value
+            self._pending.update(dirty)
+        return len(dirty)
+
+    def flush(self):
+        """Ask the writer thread to write the pending rows now."""
+        self._wake.set()
+
+    def close(self, timeout=None):
+        """Write the pending rows, compact the journal and stop the thread."""
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self._recover()
+        except Exception as e:  # the journal stays for the next start
+            if self.on_error:
+                self.on_error(e)
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            stopping = self._stop
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            try:
+                if pending:
+                    self._write(pending)
+                if stopping and self.mode == "journal" and self._flushes:
+                    self._compact()
+            except Exception as e:  # keep the thread alive, the next flush retries
+                with self._lock:
+                    pending.update(self._pending)
+                    self._pending = pending
+                if self.on_error:
+                    self.on_error(e)
+            if stopping:
+                break
+
+    def _write(self, pending):
+        self._df.loc[list(pending), self.column] = list(pending.values())
+        if self.mode == "snapshot":
+            self._save(self._df)
+            return
+
+        stamp = time.time_ns()
+        with open(self.journal_path, "a") as f:
+            f.writelines(f"{stamp},{self.sheet_name},{row},{value}\n" for row, value in pending.items())
+        self._flushes += 1
+        if self._flushes >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        self._save(self._df)
+        with open(self.journal_path, "w"):
+            pass
+        self._flushes = 0
+
+    def _recover(self):
+        """Write the changes of a leftover journal of this sheet into the workbook."""
+        if not os.path.exists(self.journal_path) or not os.path.exists(self.path):
+            return
+        changes = {}
+        others = []
+        with open(self.journal_path) as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    continue  # cut short by the crash
+                try:
+                    _, entry = line.split(",", 1)
+                    sheet, row, value = entry.rsplit(",", 2)
+                    row = int(row)
+                except ValueError:
+                    continue
+                if sheet == str(self.sheet_name):
+                    changes[row] = _journal_value(value[:-1])
+                else:
+                    others.append(line)  # rows of the writer of another sheet
+        if changes:
+            df = pd.read_excel(self.path, sheet_name=self.sheet_name)
+            if self.column not in df.columns:
+                df[self.column] = None
+            df[self.column] = df[self.column].astype(object)
+            rows = [row for row in changes if row in df.index]
+            df.loc[rows, self.column] = [changes[row] for row in rows]
+            self._save(df)
+        with open(self.journal_path, "w") as f:
+            f.writelines(others)
+
+    def _save(self, df):
+        root, ext = os.path.splitext(self.path)
+        temp_path = f"{root}.saving{ext}"
+        try:
+            if os.path.exists(self.path):
+                # replace only this sheet, the other sheets of the workbook stay as they are
+                shutil.copyfile(self.path, temp_path)
+                with pd.ExcelWriter(temp_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+                    df.to_excel(writer, sheet_name=self.sheet_name, index=False)
+            else:
+                df.to_excel(temp_path, sheet_name=self.sheet_name, index=False)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.writes += 1
+
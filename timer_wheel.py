@@ -0,0 +1,118 @@
+import time
+
+# Hierarchical timer wheel used to fire every point at its own period. Time is
+# counted in ticks of tick_ms; level 0 has one slot per tick, each higher level
+# has one slot per full turn of the level below, and timers cascade down as
+# their slot comes up. Scheduling and firing are O(1) per timer, so the cost of
+# a pass no longer depends on how many points share the wheel.
+
+WHEEL_BITS = 8
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+LEVELS = 3
+
+class Timer:
+    __slots__ = ('expires', 'period', 'callback', 'args', 'cancelled')
+
+    def __init__(self, expires, period, callback, args):
+        self.expires = expires
+        self.period = period
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerWheel:
+    """Periodic and one-shot timers with tick_ms resolution."""
+
+    def __init__(self, tick_ms=10, clock=time.monotonic):
+        self.tick_ms = tick_ms
+        self.clock = clock
+        self.start = clock()
+        self.tick = 0
+        self.levels = [[[] for _ in range(WHEEL_SIZE)] for _ in range(LEVELS)]
+        self.overflow = []
+        self.fired = 0
+        self.late = 0  # periods skipped because the wheel fell behind
+
+    def __len__(self):
+        return sum(len(slot) for level in self.levels for slot in level) + len(self.overflow)
+
+    def ticks(self, ms):
+        return max(1, int(round(ms / self.tick_ms)))
+
+    def call_later(self, delay_ms, callback, *args):
+        """Fire callback(*args) once after delay_ms."""
+        timer = Timer(self.tick + self.ticks(delay_ms), 0, callback, args)
+        self._add(timer)
+        return timer
+
+    def call_every(self, period_ms, callback, *args, phase_ms=0):
+        """Fire callback(*args) every period_ms, the first time after phase_ms."""
+        timer = Timer(self.tick + (self.ticks(phase_ms) if phase_ms else 1), self.ticks(period_ms), callback, args)
+        self._add(timer)
+        return timer
+
+    def _add(self, timer):
+        delta = timer.expires - self.tick
+        for level in range(LEVELS):
+            if delta < WHEEL_SIZE << (WHEEL_BITS * level):
+                slot = (timer.expires >> (WHEEL_BITS * level)) & WHEEL_MASK
+                self.levels[level][slot].append(timer)
+                return
+        self.overflow.append(timer)
+
+    def _cascade(self, level):
+        slot = (self.tick >> (WHEEL_BITS * level)) & WHEEL_MASK
+        timers = self.levels[level][slot]
+        self.levels[level][slot] = []
+        for timer in timers:
+            if not timer.cancelled:
+                self._add(timer)
+
+    def advance(self, now=None):
+        """Run every timer due up to now, return the number fired."""
+        if now is None:
+            now = self.clock()
+        target = int((now - self.start) * 1000 / self.tick_ms)
+        fired = 0
+        while self.tick < target:
+            self.tick += 1
+            tick = self.tick
+            if not tick & WHEEL_MASK:
+                for level in range(1, LEVELS):
+                    self._cascade(level)
+                    if (tick >> (WHEEL_BITS * level)) & WHEEL_MASK:
+                        break
+                else:
+                    overflow, self.overflow = self.overflow, []
+                    for timer in overflow:
+                        self._add(timer)
+
+            slot = tick & WHEEL_MASK
+            timers = self.levels[0][slot]
+            if not timers:
+                continue
+            self.levels[0][slot] = []
+            for timer in timers:
+                if timer.cancelled:
+                    continue
+                timer.callback(*timer.args)
+                fired += 1
+                if timer.period and not timer.cancelled:
+                    timer.expires += timer.period
+                    if timer.expires <= target:
+                        # the wheel fell behind, skip the periods missed up to now instead of firing them in a burst
+                        skipped = (target - timer.expires) // timer.period + 1
+                        self.late += skipped
+                        timer.expires += skipped * timer.period
+                    self._add(timer)
+        self.fired += fired
+        return fired
+
+    def sleep_time(self):
+        """Seconds until the next tick boundary."""
+        elapsed = (self.clock() - self.start) * 1000 / self.tick_ms
+        return max(0.0, (int(elapsed) + 1 - elapsed) * self.tick_ms / 1000)
@@ -0,0 +1,169 @@
+import time
+import numpy as np
+import pandas as pd
+
+# Simulated input values. Every row of a sheet gets a profile from the optional
+# 'Profile' column (sine, ramp, walk, step, noise), bounded by 'Min' / 'Max' and
+# repeating every 'Period s' seconds. Rows without a profile keep the original
+# behaviour: analog rows draw a random integer between Min and Max (10 and 100 by
+# default) and binary rows toggle on every update. A row is computed at most
+# once per tick and only when it is asked for: value() computes the row of the
+# point whose timer fired, sample() every row as one NumPy batch for the passes
+# that update them all. A seed makes a run reproducible.
+
+PROFILE_COLUMN = 'Profile'
+MIN_COLUMN = 'Min'
+MAX_COLUMN = 'Max'
+PERIOD_COLUMN = 'Period s'
+
+DEFAULT_MIN = 10
+DEFAULT_MAX = 100
+DEFAULT_PERIOD = 60.0
+WALK_STEP = 0.02   # standard deviation of one random walk step, share of Max - Min
+NOISE_SIGMA = 0.1  # standard deviation of the noise profile, share of Max - Min
+
+RANDOM = 0
+TOGGLE = 1
+SINE = 2
+RAMP = 3
+WALK = 4
+STEP = 5
+NOISE = 6
+
+PROFILES = {
+    'random': RANDOM,
+    'toggle': TOGGLE,
+    'sine': SINE,
+    'ramp': RAMP,
+    'walk': WALK,
+    'random walk': WALK,
+    'step': STEP,
+    'square': STEP,
+    'noise': NOISE,
+}
+
+def _column(group, column, default):
+    if column not in group.columns:
+        return np.full(len(group), default, dtype=np.float64)
+    values = pd.to_numeric(group[column], errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isnan(values), default, values)
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if value == value else 0.0
+
+def profile_codes(group, binary):
+    """Profile code of every row, unknown or empty cells fall back to random / toggle."""
+    codes = np.where(binary, TOGGLE, RANDOM).astype(np.int8)
+    if PROFILE_COLUMN in group.columns:
+        for i, profile in enumerate(group[PROFILE_COLUMN].to_numpy()):
+            if isinstance(profile, str):
+                codes[i] = PROFILES.get(profile.strip().lower(), codes[i])
+    return codes
+
+class WaveformGenerator:
+    """Vectorized value source of a list of signals, one sample per resolution seconds.
+
+    group holds the sheet rows of signals (matched by Signal.row), binary and
+    integer are per signal masks: binary rows give 0/1, integer rows are rounded.
+    """
+
+    def __init__(self, signals, group, binary=None, integer=None, seed=None, clock=time.monotonic, resolution=0.01):
+        n = len(signals)
+        self.index = {signal.row: i for i, signal in enumerate(signals)}
+        self.binary = np.zeros(n, dtype=bool) if binary is None else np.asarray(binary, dtype=bool)
+        self.integer = np.zeros(n, dtype=bool) if integer is None else np.asarray(integer, dtype=bool)
+        rows = group.loc[[signal.row for signal in signals]]
+        self.codes = profile_codes(rows, self.binary)
+        self.low = _column(rows, MIN_COLUMN, DEFAULT_MIN)
+        self.high = np.maximum(_column(rows, MAX_COLUMN, DEFAULT_MAX), self.low)
+        self.period = _column(rows, PERIOD_COLUMN, DEFAULT_PERIOD)
+        self.period[self.period <= 0] = DEFAULT_PERIOD
+        self.rng = np.random.default_rng(seed)
+        self.phase = self.rng.uniform(0.0, 1.0, n)
+        # the last values are the state of toggle and walk rows
+        self.values = np.array([_number(signal.value) for signal in signals], dtype=np.float64)
+        self.values[self.binary] = self.values[self.binary] != 0
+        walk = self.codes == WALK
+        self.values[walk] = np.clip(self.values[walk], self.low[walk], self.high[walk])
+        self.clock = clock
+        self.resolution = resolution
+        self.start = clock()
+        self.ticks = np.full(n, -1, dtype=np.int64)  # tick each row was last computed in
+        self.samples = 0  # rows computed so far
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _tick(self, now):
+        if now is None:
+            now = self.clock()
+        return now, int((now - self.start) / self.resolution)
+
+    def sample(self, now=None, toggle=False):
+        """Values of every signal at now, each row computed once per tick; toggle flips every toggle row."""
+        now, tick = self._tick(now)
+        stale = self.ticks != tick
+        if stale.all():
+            self._compute(slice(None), now, tick)
+        elif stale.any():
+            self._compute(np.flatnonzero(stale), now, tick)
+        if toggle:
+            self._toggle(self.codes == TOGGLE)
+        return self.values
+
+    def _compute(self, rows, now, tick):
+        """Next values of rows (a slice or an index array) at now."""
+        t = now - self.start
+        codes = self.codes[rows]
+        low = self.low[rows]
+        high = self.high[rows]
+        span = high - low
+        values = self.values[rows]  # toggle rows keep their value, walk rows step from it
+        cycle = (t / self.period[rows] + self.phase[rows]) % 1.0
+
+        for code in np.unique(codes).tolist():
+            selected = codes == code
+            if code == RANDOM:
+                values[selected] = self.rng.integers(low[selected].astype(np.int64), high[selected].astype(np.int64) + 1)
+            elif code == SINE:
+                values[selected] = low[selected] + span[selected] * (0.5 + 0.5 * np.sin(2 * np.pi * cycle[selected]))
+            elif code == RAMP:
+                values[selected] = low[selected] + span[selected] * cycle[selected]
+            elif code == STEP:
+                values[selected] = np.where(cycle[selected] < 0.5, low[selected], high[selected])
+            elif code == WALK:
+                steps = self.rng.normal(0.0, WALK_STEP, selected.sum()) * span[selected]
+                values[selected] = np.clip(values[selected] + steps, low[selected], high[selected])
+            elif code == NOISE:
+                noise = self.rng.normal(0.5, NOISE_SIGMA, selected.sum()) * span[selected]
+                values[selected] = np.clip(low[selected] + noise, low[selected], high[selected])
+
+        # binary rows are on in the upper half of their range
+        selected = self.binary[rows] & (codes != TOGGLE)
+        values[selected] = values[selected] >= (low[selected] + high[selected]) / 2
+        integer = self.integer[rows]
+        values[integer] = np.round(values[integer])
+        self.values[rows] = values
+        self.ticks[rows] = tick
+        self.samples += len(values)
+
+    def _toggle(self, selected):
+        self.values[selected] = 1.0 - self.values[selected]
+
+    def value(self, signal):
+        """Next value of one signal, a Python int for binary / integer rows."""
+        i = self.index[signal.row]
+        now, tick = self._tick(None)
+        if self.ticks[i] != tick:
+            self._compute(slice(i, i + 1), now, tick)
+        values = self.values
+        if self.codes[i] == TOGGLE:
+            values[i] = 1.0 - values[i]
+        value = values[i]
+        if self.binary[i] or self.integer[i]:
+            return int(value)
+        return float(value)
@@ -0,0 +1,115 @@
+import threading
+
+# Write coalescing of the Modbus master. Coil and register writes are only
+# queued; a flush sorts the pending addresses, merges contiguous ones into
+# FC15 / FC16 frames (FC5 / FC6 for a lone address) within the protocol limits
+# and sends them. A flush happens when max_pending addresses are queued or delay
+# seconds after the first queued write, whichever comes first, so a bulk
+# setpoint download costs a few frames instead of one per row. A later write to
+# the same address replaces the queued one. A run is only cut in front of the
+# first register of a value, a 32-bit value never ends up split over two frames.
+
+MAX_WRITE_COILS = 1968
+MAX_WRITE_REGISTERS = 123
+FLUSH_SIZE = 256
+FLUSH_DELAY = 0.05
+
+def _runs(pending, limit, starts):
+    """Contiguous (address, values) runs of an address -> value dict, at most limit long.
+
+    starts are the first addresses of the queued values, a run is only cut in front of one.
+    """
+    values = []
+    for address in sorted(pending):
+        if values and address == values[-1][0] + len(values[-1][1]) and address not in starts:
+            values[-1][1].append(pending[address])
+        else:
+            values.append((address, [pending[address]]))
+    runs = []
+    for address, value in values:
+        if runs and address == runs[-1][0] + len(runs[-1][1]) and len(runs[-1][1]) + len(value) <= limit:
+            runs[-1][1].extend(value)
+        else:
+            runs.append((address, value))
+    return runs
+
+class WriteBatcher:
+    """Queued coil / register writes of one client, flushed as multi-write frames."""
+
+    def __init__(self, client, max_pending=FLUSH_SIZE, delay=FLUSH_DELAY, log=None):
+        self.client = client
+        self.max_pending = max_pending
+        self.delay = delay
+        self.log = log
+        self.writes = 0
+        self.frames = 0
+        self.failures = 0
+        self._coils = {}
+        self._registers = {}
+        self._starts = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._coils) + len(self._registers)
+
+    def write_coil(self, address, value):
+        self._queue(self._coils, {address: bool(value)})
+
+    def write_registers(self, address, registers):
+        """Queue every register of a value, 32-bit types included."""
+        self._queue(self._registers, {address + i: int(register) for i, register in enumerate(registers)}, address)
+
+    def _queue(self, pending, values, start=None):
+        with self._lock:
+            pending.update(values)
+            if start is not None:
+                self._starts.add(start)
+            self.writes += 1
+            full = len(self._coils) + len(self._registers) >= self.max_pending
+            if not full and self._timer is None and self.delay is not None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Send everything queued, return the number of frames sent."""
+        with self._flush_lock:
+            with self._lock:
+                coils, self._coils = self._coils, {}
+                registers, self._registers = self._registers, {}
+                starts, self._starts = self._starts, set()
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+            frames = 0
+            for address, values in _runs(coils, MAX_WRITE_COILS, coils):
+                if len(values) == 1:
+                    result = self.client.write_single_coil(address, values[0])
+                else:
+                    result = self.client.write_multiple_coils(address, values)
+                frames += self._sent(result, "coil", address, values)
+            for address, values in _runs(registers, MAX_WRITE_REGISTERS, starts):
+                if len(values) == 1:
+                    result = self.client.write_single_register(address, values[0])
+                else:
+                    result = self.client.write_multiple_registers(address, values)
+                frames += self._sent(result, "register", address, values)
+            self.frames += frames
+            return frames
+
+    def _sent(self, result, kind, address, values):
+        """1 for a frame the slave accepted, 0 for a failed one."""
+        if result:
+            return 1
+        self.failures += 1
+        if self.log:
+            self.log(f"Write of {len(values)} {kind}s at Index {address} failed")
+        return 0
+
+    def close(self):
+        self.flush()
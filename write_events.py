@@ -0,0 +1,112 @@
+import time
+import threading
+import collections
+
+# Master write notifications of the Modbus slaves. The request handler publishes
+# one WriteEvent per write request the moment it is stored in the bank; inline
+# subscribers run right there in the server thread (a few microseconds), the
+# others (log, snapshot writer) get the event from one dispatcher thread so a
+# slow subscriber never holds up the server. The bus keeps the publish to
+# delivery latency of both paths.
+
+class WriteEvent:
+    """One master write: unit id, function code, protocol address, raw values and the rows it changed."""
+
+    __slots__ = ('unit', 'function', 'address', 'values', 'timestamp', 'steps', 'source', 'ns')
+
+    def __init__(self, unit, function, address, values, steps=(), source=None):
+        self.unit = unit
+        self.function = function
+        self.address = address
+        self.values = values
+        self.steps = steps
+        self.source = source
+        self.timestamp = time.time()
+        self.ns = time.perf_counter_ns()
+
+    def __str__(self):
+        return f"Master write unit {self.unit} FC{self.function} Index {self.address + 1}: {self.values}"
+
+class LatencyStats:
+    __slots__ = ('count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def __str__(self):
+        mean = self.total_ns / self.count / 1000 if self.count else 0.0
+        return f"{self.count} events, mean {mean:.1f} us, max {self.max_ns / 1000:.1f} us"
+
+class WriteEventBus:
+    """Fan-out of WriteEvents to inline and dispatched subscribers."""
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self.inline = []
+        self.queued = []
+        self.inline_latency = LatencyStats()
+        self.queued_latency = LatencyStats()
+        self._events = collections.deque()
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = None
+
+    def subscribe(self, callback, inline=False):
+        """callback(event), inline ones run in the publishing thread."""
+        if inline:
+            self.inline.append(callback)
+        else:
+            self.queued.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, daemon=True)
+                self._thread.start()
+
+    def publish(self, unit, function, address, values, steps=(), source=None):
+        event = WriteEvent(unit, function, address, values, steps, source)
+        for callback in self.inline:
+            self._call(callback, event)
+        if self.inline:
+            self.inline_latency.add(time.perf_counter_ns() - event.ns)
+        if self.queued:
+            self._events.append(event)
+            self._wake.set()
+        return event
+
+    def _call(self, callback, event):
+        try:
+            callback(event)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+
+    def _dispatch(self):
+        while self._running or self._events:
+            self._wake.wait(0.5)
+            self._wake.clear()
+            while self._events:
+                event = self._events.popleft()
+                self.queued_latency.add(time.perf_counter_ns() - event.ns)
+                for callback in self.queued:
+                    self._call(callback, event)
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(5)
+
+    def stats(self):
+        lines = []
+        if self.inline:
+            lines.append(f"Inline write subscribers: {self.inline_latency}")
+        if self.queued:
+            lines.append(f"Queued write subscribers: {self.queued_latency}")
+        return lines